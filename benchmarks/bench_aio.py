@@ -0,0 +1,49 @@
+"""Measure the cost that an AsyncRunner adds to runs in a ScriptExecutor,
+and how long submitting a run blocks the caller.
+
+usage: python benchmarks/bench_aio.py [RUNS]
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ltdexec.dialect import Dialect
+from ltdexec.executor import ScriptExecutor
+from ltdexec import aio
+
+class BenchDialect(Dialect):
+    pass
+
+SCRIPT = """\
+value = x * 2 + 1
+"""
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    script = BenchDialect.compile(SCRIPT, 'bench')
+    inputs = [{'x': i} for i in xrange(count)]
+    expected = [g['x'] * 2 + 1 for g in inputs]
+
+    with ScriptExecutor(max_workers=4) as executor:
+        start = time.time()
+        values = [r.globals['value'] for r in executor.map(script, inputs)]
+        executor_time = time.time() - start
+    assert values == expected
+
+    with aio.AsyncRunner(ScriptExecutor(max_workers=4),
+                         max_concurrency=16, timeout=60) as runner:
+        start = time.time()
+        futures = [script.run_async(g, runner=runner) for g in inputs]
+        submit_time = time.time() - start
+        values = [f.result().globals['value'] for f in futures]
+        runner_time = time.time() - start
+    assert values == expected
+
+    print 'runs:        {0}'.format(count)
+    print 'executor:    {0:8.2f} us/run'.format(executor_time / count * 1e6)
+    print 'runner:      {0:8.2f} us/run'.format(runner_time / count * 1e6)
+    print 'submit:      {0:8.2f} us/call'.format(submit_time / count * 1e6)
+
+main()
@@ -0,0 +1,57 @@
+"""Compare running a script with the default EnvironmentFactory and with
+the PooledEnvironmentFactory, for a dialect whose objects are costly to
+construct.
+
+usage: python benchmarks/bench_env_pool.py [RUNS]
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ltdexec.dialect import Dialect
+from ltdexec.environment import PooledEnvironmentFactory
+from ltdexec import wrapper
+
+class Table(object):
+    """A lookup table that takes a while to build, and is never changed."""
+    def __init__(self, size):
+        self.rates = dict((i, 1.0 + i / 1000.0) for i in xrange(size))
+
+    def rate(self, i):
+        return self.rates[i % len(self.rates)]
+
+OBJECTS = {
+    'table': wrapper.defname(Table, args=[2000], reusable=True),
+    'double': wrapper.deffunc(lambda v: v * 2),
+}
+
+class PlainDialect(Dialect):
+    objects = OBJECTS
+
+class PooledDialect(Dialect):
+    objects = OBJECTS
+    EnvironmentFactory = PooledEnvironmentFactory
+
+SCRIPT = 'value = double(table.rate(x))'
+
+def time_runs(dialect, inputs):
+    script = dialect.compile(SCRIPT, 'bench')
+    start = time.time()
+    values = [script.run(g).globals['value'] for g in inputs]
+    return time.time() - start, values
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    inputs = [{'x': i} for i in xrange(count)]
+    plain_time, expected = time_runs(PlainDialect(), inputs)
+    pooled_time, values = time_runs(PooledDialect(), inputs)
+    assert values == expected
+
+    print 'runs:        {0}'.format(count)
+    print 'plain:       {0:8.2f} us/run'.format(plain_time / count * 1e6)
+    print 'pooled:      {0:8.2f} us/run'.format(pooled_time / count * 1e6)
+    print PooledDialect().env_factory.stats()
+
+main()
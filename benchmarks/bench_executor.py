@@ -0,0 +1,49 @@
+"""Compare running scripts one after another with running them in a
+ScriptExecutor, for a dialect whose objects wait on I/O.
+
+usage: python benchmarks/bench_executor.py [RUNS] [WORKERS]
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ltdexec.dialect import Dialect
+from ltdexec.executor import ScriptExecutor
+from ltdexec import wrapper
+
+def fetch(x):
+    """Stands in for a call to a remote service."""
+    time.sleep(0.001)
+    return x * 2
+
+class BenchDialect(Dialect):
+    objects = {'fetch': wrapper.deffunc(fetch)}
+
+SCRIPT = """\
+value = fetch(x) + 1
+"""
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    script = BenchDialect.compile(SCRIPT, 'bench')
+    inputs = [{'x': i} for i in xrange(count)]
+
+    start = time.time()
+    expected = [script.run(g).globals['value'] for g in inputs]
+    serial_time = time.time() - start
+
+    with ScriptExecutor(max_workers=workers) as executor:
+        start = time.time()
+        values = [r.globals['value'] for r in executor.map(script, inputs)]
+        pool_time = time.time() - start
+    assert values == expected
+
+    print 'runs:        {0}'.format(count)
+    print 'serial:      {0:8.2f} us/run'.format(serial_time / count * 1e6)
+    print 'executor:    {0:8.2f} us/run ({1} threads)'.format(
+        pool_time / count * 1e6, workers)
+
+main()
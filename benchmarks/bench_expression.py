@@ -0,0 +1,35 @@
+"""Compare the time taken to evaluate a formula as an expression with the
+time taken to run it as a script.
+
+usage: python benchmarks/bench_expression.py [CALLS]
+"""
+import sys
+import os
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ltdexec.dialect import Dialect
+
+FORMULA = 'price * qty * (1 - discount)'
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    dialect = Dialect()
+    row = {'price': 2.5, 'qty': 4, 'discount': 0.1}
+
+    script = dialect.compile('value = ' + FORMULA, 'formula')
+    expression = dialect.compile_expression(FORMULA)
+    assert script.run(row).globals['value'] == expression.evaluate(row)
+
+    script_time = timeit.timeit(lambda: script.run(row), number=calls)
+    expression_time = timeit.timeit(lambda: expression.evaluate(row),
+                                    number=calls)
+
+    print 'calls:               {0}'.format(calls)
+    print 'Script.run:          {0:8.2f} us/call'.format(
+        script_time / calls * 1e6)
+    print 'Expression.evaluate: {0:8.2f} us/call'.format(
+        expression_time / calls * 1e6)
+
+main()
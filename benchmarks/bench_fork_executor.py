@@ -0,0 +1,51 @@
+"""Compare running each script in a new process forked from a preloaded
+zygote (ForkExecutor) with retiring a pool worker after every run
+(ProcessScriptExecutor with max_runs_per_worker=1), and report the time from
+fork to result.
+
+usage: python benchmarks/bench_fork_executor.py [RUNS]
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ltdexec.dialect import Dialect
+from ltdexec.executor import ForkExecutor, ProcessScriptExecutor
+
+class BenchDialect(Dialect):
+    pass
+
+SCRIPT = """\
+total = 0
+for i in range(n):
+    total += i
+"""
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    script = BenchDialect.compile(SCRIPT, 'bench')
+    inputs = [{'n': 1000 + i} for i in xrange(count)]
+    expected = [sum(range(g['n'])) for g in inputs]
+
+    with ProcessScriptExecutor(max_runs_per_worker=1) as executor:
+        start = time.time()
+        values = [r.globals['total'] for r in executor.map(script, inputs)]
+        recycle_time = time.time() - start
+    assert values == expected
+
+    with ForkExecutor() as executor:
+        start = time.time()
+        values = [r.globals['total'] for r in executor.map(script, inputs)]
+        fork_time = time.time() - start
+        stats = executor.stats()
+    assert values == expected
+
+    print 'runs:        {0}'.format(count)
+    print 'recycled:    {0:8.2f} ms/run'.format(recycle_time / count * 1e3)
+    print 'forked:      {0:8.2f} ms/run'.format(fork_time / count * 1e3)
+    print 'latency:     {0:8.2f} ms mean, {1:.2f} ms max'.format(
+        stats.mean_latency * 1e3, stats.max_latency * 1e3)
+
+main()
@@ -0,0 +1,78 @@
+"""Report the memory held by each cached script and each run result.
+
+Sizes are measured by walking the objects each one refers to, counting
+objects shared with the dialect, such as the environment factory, once
+rather than per script.
+
+usage: python benchmarks/bench_memory.py [SCRIPTS]
+"""
+import gc
+import sys
+import os
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ltdexec.dialect import Dialect
+
+SCRIPT = """\
+total_{0} = 0
+for i in range({0} % 7 + 3):
+    if i % 2:
+        total_{0} += i * {0}
+    else:
+        total_{0} -= i
+result = [total_{0}, 'script {0}']
+"""
+
+_shared_types = (type, types.ModuleType, types.FunctionType,
+                 types.BuiltinFunctionType, types.ClassType)
+
+def deep_size(obj, seen):
+    """Return the size of *obj* and the objects it refers to, leaving out
+    those already in *seen*."""
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _shared_types):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, types.CodeType):
+            # Code objects do not report their referents.
+            stack.extend([obj.co_code, obj.co_consts, obj.co_names,
+                          obj.co_varnames, obj.co_freevars, obj.co_cellvars,
+                          obj.co_filename, obj.co_name, obj.co_lnotab])
+        else:
+            stack.extend(gc.get_referents(obj))
+    return size
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    class BenchDialect(Dialect):
+        script_cache_size = count
+
+    dialect = BenchDialect()
+    # Objects reachable from the dialect before any script is compiled are
+    # shared by all of its scripts.
+    shared = set()
+    deep_size(dialect, shared)
+    deep_size(__builtins__, shared)
+
+    scripts = [dialect.compiler(SCRIPT.format(i), 'script_{0}'.format(i))
+               for i in xrange(count)]
+    results = [script.run() for script in scripts]
+
+    seen = set(shared)
+    script_bytes = sum(deep_size(script, seen) for script in scripts)
+    seen = set(shared)
+    seen.update(id(script) for script in scripts)
+    result_bytes = sum(deep_size(result, seen) for result in results)
+
+    print 'scripts:           {0}'.format(count)
+    print 'bytes per script:  {0:8.0f}'.format(script_bytes / float(count))
+    print 'bytes per result:  {0:8.0f}'.format(result_bytes / float(count))
+
+main()
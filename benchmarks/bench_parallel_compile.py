@@ -0,0 +1,60 @@
+"""Compare compiling a large script in one process against compiling its
+chunks in a process pool.
+
+usage: python benchmarks/bench_parallel_compile.py [FUNCTIONS [PROCESSES]]
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ltdexec.dialect import Dialect
+from ltdexec import compiler
+
+FUNCTION = """\
+def func_{0}(items, scale={0}):
+    total = 0
+    for i, item in enumerate(items):
+        if item.value > scale and not item.hidden:
+            total += item.value * scale - len(item.name)
+        else:
+            total -= [x.weight for x in item.parts if x.ok][0]
+    return {{'total': total, 'count': i}}
+
+"""
+
+def main():
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    class SerialDialect(Dialect):
+        chunk_cache_size = 0
+    class ParallelDialect(Dialect):
+        Compiler = compiler.ParallelSplitSourceCompiler
+        chunk_cache_size = 0
+        parallel_compile_processes = processes
+
+    src = ''.join(FUNCTION.format(i) for i in xrange(functions))
+    serial = SerialDialect().compiler
+    parallel = ParallelDialect().compiler
+    parallel.get_pool()
+
+    def timed(comp):
+        times = []
+        for i in range(3):
+            start = time.time()
+            comp.do_compile(src, 'bench')
+            times.append(time.time() - start)
+        return min(times)
+
+    one = timed(serial)
+    many = timed(parallel)
+    parallel.close()
+
+    print 'lines: {0}'.format(len(src.splitlines()))
+    print 'one process:  {0:8.4f} s'.format(one)
+    print 'process pool: {0:8.4f} s'.format(many)
+    print 'speedup:      {0:8.2f} x'.format(one / many)
+
+main()
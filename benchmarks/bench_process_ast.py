@@ -0,0 +1,60 @@
+"""Compare processing an AST in one fused walk against one walk per pass.
+
+usage: python benchmarks/bench_process_ast.py [FUNCTIONS]
+"""
+import ast
+import sys
+import os
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ltdexec.dialect import Dialect
+
+FUNCTION = """\
+def func_{0}(items, scale={0}):
+    import math
+    from string import upper as up
+    total = 0
+    for i, item in enumerate(items):
+        if item.value > scale and not item.hidden:
+            total += math.sqrt(item.value * scale) - len(item.name)
+        else:
+            total -= [x.weight for x in item.parts if x.ok][0]
+    return {{'total': total, 'count': i, 'name': up(item.name)}}
+
+"""
+
+class BenchDialect(Dialect):
+    allow_statement_import = True
+    allow_statement_import_from = True
+
+def sequential(processor, tree):
+    validator = processor.AstValidator(processor.dialect)
+    transform = processor.AstTransform(processor.dialect)
+    tree = transform.precheck_transform(tree)
+    validator(tree)
+    return transform.postcheck_transform(tree)
+
+def main():
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    src = ''.join(FUNCTION.format(i) for i in xrange(functions))
+    processor = BenchDialect().compiler.processor
+
+    def timed(func):
+        trees = [ast.parse(src) for i in range(5)]
+        times = []
+        for tree in trees:
+            times.append(min(timeit.repeat(lambda: func(tree),
+                                           number=1, repeat=1)))
+        return min(times)
+
+    separate = timed(lambda tree: sequential(processor, tree))
+    fused = timed(processor.process_ast)
+
+    print 'lines: {0}'.format(len(src.splitlines()))
+    print 'one walk per pass: {0:8.4f} s'.format(separate)
+    print 'fused walk:        {0:8.4f} s'.format(fused)
+    print 'speedup:           {0:8.2f} x'.format(separate / fused)
+
+main()
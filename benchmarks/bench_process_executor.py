@@ -0,0 +1,53 @@
+"""Compare running CPU-bound scripts one after another, in a ScriptExecutor
+and in a ProcessScriptExecutor.
+
+usage: python benchmarks/bench_process_executor.py [RUNS] [WORKERS]
+"""
+import sys
+import os
+import multiprocessing
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ltdexec.dialect import Dialect
+from ltdexec.executor import ScriptExecutor, ProcessScriptExecutor
+
+class BenchDialect(Dialect):
+    pass
+
+SCRIPT = """\
+total = 0
+for i in range(n):
+    total += i * i % 7
+"""
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    workers = (int(sys.argv[2]) if len(sys.argv) > 2
+               else multiprocessing.cpu_count())
+    script = BenchDialect.compile(SCRIPT, 'bench')
+    inputs = [{'n': 20000 + i} for i in xrange(count)]
+
+    start = time.time()
+    expected = [script.run(g).globals['total'] for g in inputs]
+    serial_time = time.time() - start
+
+    with ScriptExecutor(max_workers=workers) as executor:
+        start = time.time()
+        values = [r.globals['total'] for r in executor.map(script, inputs)]
+        thread_time = time.time() - start
+    assert values == expected
+
+    with ProcessScriptExecutor(max_workers=workers) as executor:
+        start = time.time()
+        values = [r.globals['total'] for r in executor.map(script, inputs)]
+        process_time = time.time() - start
+    assert values == expected
+
+    print 'runs:        {0} ({1} workers)'.format(count, workers)
+    print 'serial:      {0:8.2f} ms/run'.format(serial_time / count * 1e3)
+    print 'threads:     {0:8.2f} ms/run'.format(thread_time / count * 1e3)
+    print 'processes:   {0:8.2f} ms/run'.format(process_time / count * 1e3)
+
+main()
@@ -0,0 +1,39 @@
+"""Compare running a script over a batch of rows with Script.run_batch with
+calling Script.run once per row.
+
+usage: python benchmarks/bench_run_batch.py [ROWS]
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ltdexec.dialect import Dialect
+
+SCRIPT = """\
+total = price * qty * (1 - discount)
+if total > 100:
+    total -= 5
+"""
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    script = Dialect.compile(SCRIPT, 'bench')
+    rows = [{'price': i % 50, 'qty': i % 7, 'discount': 0.1}
+            for i in xrange(count)]
+
+    start = time.time()
+    totals = [script.run(row).globals['total'] for row in rows]
+    run_time = time.time() - start
+
+    start = time.time()
+    result = script.run_batch(rows, ['total'])
+    batch_time = time.time() - start
+    assert result.outputs['total'] == totals
+
+    print 'rows:        {0}'.format(count)
+    print 'run:         {0:8.2f} us/row'.format(run_time / count * 1e6)
+    print 'run_batch:   {0:8.2f} us/row'.format(batch_time / count * 1e6)
+
+main()
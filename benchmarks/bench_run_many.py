@@ -0,0 +1,61 @@
+"""Compare Script.run_many with calling Script.run once for each input, for
+a dialect whose objects are costly to construct.
+
+usage: python benchmarks/bench_run_many.py [RUNS]
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ltdexec.dialect import Dialect
+from ltdexec import wrapper
+
+class Table(object):
+    """A lookup table that takes a while to build, and is never changed."""
+    def __init__(self, size):
+        self.rates = dict((i, 1.0 + i / 1000.0) for i in xrange(size))
+
+    def rate(self, i):
+        return self.rates[i % len(self.rates)]
+
+class Counter(object):
+    """Per-run state."""
+    def __init__(self):
+        self.count = 0
+
+    def add(self, n):
+        self.count += n
+
+class BenchDialect(Dialect):
+    objects = {
+        'table': wrapper.defname(Table, args=[2000], reusable=True),
+        'counter': wrapper.defname(Counter),
+        'double': wrapper.deffunc(lambda v: v * 2),
+    }
+
+SCRIPT = """\
+counter.add(x)
+value = double(table.rate(x)) * counter.count
+"""
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    script = BenchDialect.compile(SCRIPT, 'bench')
+    inputs = [{'x': i} for i in xrange(count)]
+
+    start = time.time()
+    expected = [script.run(g).globals['value'] for g in inputs]
+    run_time = time.time() - start
+
+    start = time.time()
+    values = [r.globals['value'] for r in script.run_many(inputs)]
+    many_time = time.time() - start
+    assert values == expected
+
+    print 'runs:        {0}'.format(count)
+    print 'run:         {0:8.2f} us/run'.format(run_time / count * 1e6)
+    print 'run_many:    {0:8.2f} us/run'.format(many_time / count * 1e6)
+
+main()
@@ -0,0 +1,48 @@
+"""Compare the table-driven AST validator against ast.NodeVisitor dispatch.
+
+usage: python benchmarks/bench_validator.py [FUNCTIONS]
+"""
+import ast
+import sys
+import os
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ltdexec.dialect import Dialect
+
+FUNCTION = """\
+def func_{0}(items, scale={0}):
+    total = 0
+    for i, item in enumerate(items):
+        if item.value > scale and not item.hidden:
+            total += item.value * scale - len(item.name)
+        else:
+            total -= [x.weight for x in item.parts if x.ok][0]
+    return {{'total': total, 'count': i, 'name': item.name.upper()}}
+
+"""
+
+def make_source(functions):
+    return ''.join(FUNCTION.format(i) for i in xrange(functions))
+
+def main():
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    src = make_source(functions)
+    tree = ast.parse(src)
+    dialect = Dialect()
+    validator = dialect.AstValidator(dialect)
+    nodes = sum(1 for node in ast.walk(tree))
+
+    repeat = 5
+    visitor = min(timeit.repeat(lambda: validator.visit(tree),
+                                number=1, repeat=repeat))
+    table = min(timeit.repeat(lambda: validator(tree),
+                              number=1, repeat=repeat))
+
+    print 'lines: {0}, nodes: {1}'.format(len(src.splitlines()), nodes)
+    print 'NodeVisitor dispatch: {0:8.4f} s'.format(visitor)
+    print 'table-driven walk:    {0:8.4f} s'.format(table)
+    print 'speedup:              {0:8.2f} x'.format(visitor / table)
+
+main()
@@ -0,0 +1,39 @@
+"""Compare evaluating a formula over columns of NumPy arrays with evaluating
+it once per row.
+
+usage: python benchmarks/bench_vectorize.py [ROWS]
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy
+
+from ltdexec.dialect import Dialect
+from ltdexec import vectorize
+
+FORMULA = 'price * qty * (1 - discount)'
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    expression = Dialect.compile_expression(FORMULA)
+    columns = {'price': numpy.random.uniform(1, 100, rows),
+               'qty': numpy.random.randint(1, 10, rows)}
+    globals = {'discount': 0.1}
+
+    start = time.time()
+    values = expression.evaluate_columns(columns, globals)
+    vectorized_time = time.time() - start
+
+    start = time.time()
+    expected = vectorize.evaluate_rows(expression, columns, globals, rows)
+    row_time = time.time() - start
+    assert numpy.allclose(values, expected)
+
+    print 'rows:        {0}'.format(rows)
+    print 'vectorized:  {0:8.3f} s'.format(vectorized_time)
+    print 'per row:     {0:8.3f} s'.format(row_time)
+
+main()
@@ -0,0 +1,264 @@
+"""
+ltdexec.aio
+===========
+
+Compilation and runs of scripts that do not block the caller.  Each call
+returns at once with a :class:`~ltdexec.executor.Future`, while the work is
+done by an executor: in threads, or, with a
+:class:`~ltdexec.executor.ProcessScriptExecutor` or
+:class:`~ltdexec.executor.ForkExecutor`, in other processes.
+
+Python 2 has no :mod:`asyncio`, so there is nothing to ``await``.  An event
+loop is instead told of the outcome through
+:meth:`~ltdexec.executor.Future.add_done_callback`, which is called in the
+executor's thread, so should hand the Future over to the loop, for instance
+with Tornado's ``IOLoop.add_callback``.
+
+"""
+
+import collections
+import heapq
+import itertools
+import sys
+import threading
+import time
+
+from . import config, exceptions
+from .executor import Future, ScriptExecutor
+
+#==============================================================================#
+class _Call(object):
+    # A call made through an AsyncRunner: *start* submits it to an executor,
+    # returning the executor's Future, which is kept as *inner*.
+    __slots__ = ('start', 'future', 'inner')
+
+    def __init__(self, start):
+        self.start = start
+        self.future = Future()
+        self.inner = None
+
+
+class _Deadlines(object):
+    # Times out calls, from a single thread that is started on first use.
+    def __init__(self, expire):
+        self.expire = expire
+        self.heap = []
+        self.order = itertools.count()
+        self.condition = threading.Condition()
+        self.thread = None
+        self.stopped = False
+
+    def add(self, timeout, call):
+        with self.condition:
+            heapq.heappush(self.heap, (time.time() + timeout,
+                                       next(self.order), call))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run)
+                self.thread.daemon = True
+                self.thread.start()
+            elif self.heap[0][2] is call:
+                self.condition.notify()
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.heap = []
+            self.condition.notify()
+            thread = self.thread
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.heap and not self.stopped:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                deadline, order, call = self.heap[0]
+                if call.future.done():
+                    heapq.heappop(self.heap)
+                    continue
+                now = time.time()
+                if now < deadline:
+                    self.condition.wait(deadline - now)
+                    continue
+                heapq.heappop(self.heap)
+            self.expire(call)
+
+
+class AsyncRunner(object):
+    """ Compiles and runs scripts in the background.
+
+        Scripts run in *executor* (by default, a
+        :class:`~ltdexec.executor.ScriptExecutor`); compilation is done by
+        *compile_executor* (by default, a ScriptExecutor with
+        ``max_concurrency`` threads), which must accept calls.  At most
+        *max_concurrency* calls run at once; later ones wait, without
+        blocking the caller, until one finishes.
+
+        A call not done within its *timeout*, or the runner's, in seconds,
+        raises :class:`~ltdexec.exceptions.TimeoutError`.  A call that times
+        out, or whose Future is cancelled, is cancelled in its executor too:
+        process executors stop the process running it, while a thread runs
+        its call to the end, and keeps its place among the running calls
+        until then.
+    """
+    def __init__(self, executor=None, compile_executor=None,
+                 max_concurrency=config.misc.DEFAULT_ASYNC_MAX_CONCURRENCY,
+                 timeout=None):
+        if max_concurrency <= 0:
+            raise ValueError('max_concurrency must be greater than 0.')
+        self.executor = executor or ScriptExecutor()
+        self.compile_executor = (compile_executor or
+                                 ScriptExecutor(max_workers=max_concurrency))
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._running = 0
+        self._waiting = collections.deque()
+        self._deadlines = _Deadlines(self._expire)
+
+    def compile_async(self, src, filename, dialect, timeout=None):
+        """ Compile *src* with the given dialect, and return a Future of the
+            :class:`~ltdexec.script.Script`.  The arguments are as for
+            :func:`ltdexec.compiler.compile`.
+        """
+        from .dialect import util as dialect_util
+        dialect = dialect_util.get_dialect_object(dialect)
+        def start():
+            return self.compile_executor.submit_call(dialect.compile, src,
+                                                     filename)
+        return self._schedule(start, timeout)
+
+    def run_async(self, script, globals=None, outputs=None, timeout=None):
+        """ Run the script, and return a Future of its Result, or of the
+            result type of a process executor.
+        """
+        def start():
+            if outputs is None:
+                return self.executor.submit(script, globals)
+            return self.executor.submit(script, globals, outputs=outputs)
+        return self._schedule(start, timeout)
+
+    def shutdown(self, wait=True):
+        """ Shut down both executors.  Calls that are not done no longer time
+            out.
+        """
+        self._deadlines.stop()
+        self.executor.shutdown(wait)
+        if self.compile_executor is not self.executor:
+            self.compile_executor.shutdown(wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown(wait=True)
+
+    def _schedule(self, start, timeout):
+        call = _Call(start)
+        call.future.add_done_callback(lambda future: self._done(call))
+        if timeout is None:
+            timeout = self.timeout
+        if timeout is not None:
+            self._deadlines.add(timeout, call)
+        with self._lock:
+            start_now = self._running < self.max_concurrency
+            if start_now:
+                self._running += 1
+            else:
+                self._waiting.append(call)
+        if start_now and not self._start(call):
+            self._release()
+        return call.future
+
+    def _start(self, call):
+        # Called with a place among the running calls taken for *call*.
+        # Returns False if the call was not submitted, so the place is free.
+        if call.future.done():
+            return False
+        try:
+            inner = call.start()
+        except:
+            call.future.set_exc_info(sys.exc_info())
+            return False
+        call.inner = inner
+        inner.add_done_callback(lambda inner: self._finish(call))
+        if call.future.done():
+            # Timed out, or cancelled, while it was being submitted.
+            inner.cancel()
+        return True
+
+    def _finish(self, call):
+        # The executor is done with the call.
+        inner = call.inner
+        if inner.cancelled():
+            call.future.cancel()
+        else:
+            try:
+                call.future.set_result(inner.result())
+            except:
+                call.future.set_exc_info(sys.exc_info())
+        self._release()
+
+    def _release(self):
+        # Hand a place among the running calls to the next waiting call.
+        while True:
+            with self._lock:
+                if not self._waiting:
+                    self._running -= 1
+                    return
+                call = self._waiting.popleft()
+            if self._start(call):
+                return
+
+    def _expire(self, call):
+        m = 'The call did not finish within its timeout.'
+        call.future.set_exc_info((exceptions.TimeoutError,
+                                  exceptions.TimeoutError(m), None))
+
+    def _done(self, call):
+        # The caller's Future is done: the call may have finished, timed out
+        # or been cancelled.  In the last two cases, the executor stops it.
+        if call.inner is not None:
+            call.inner.cancel()
+
+
+#==============================================================================#
+_default_runner = None
+_default_lock = threading.Lock()
+
+def get_runner():
+    """ Return the AsyncRunner used by :func:`compile_async` and
+        :func:`run_async`, creating one with the default settings if
+        :func:`configure` was not called.
+    """
+    global _default_runner
+    with _default_lock:
+        if _default_runner is None:
+            _default_runner = AsyncRunner()
+        return _default_runner
+
+def configure(*args, **kwargs):
+    """ Replace the AsyncRunner used by :func:`compile_async` and
+        :func:`run_async` with one created with the given arguments.  The
+        previous runner is shut down once its calls are done.
+    """
+    global _default_runner
+    runner = AsyncRunner(*args, **kwargs)
+    with _default_lock:
+        previous, _default_runner = _default_runner, runner
+    if previous is not None:
+        previous.shutdown(wait=False)
+    return runner
+
+def compile_async(src, filename, dialect, timeout=None):
+    """ See :meth:`AsyncRunner.compile_async`. """
+    return get_runner().compile_async(src, filename, dialect, timeout)
+
+def run_async(script, globals=None, outputs=None, timeout=None):
+    """ See :meth:`AsyncRunner.run_async`. """
+    return get_runner().run_async(script, globals, outputs, timeout)
+
+#==============================================================================#
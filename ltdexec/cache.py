@@ -0,0 +1,345 @@
+"""
+ltdexec.cache
+=============
+
+Caches that allow the compiler to skip work it has already performed.
+
+"""
+import collections
+import errno
+import hashlib
+import hmac
+import imp
+import marshal
+import os
+import sys
+import tempfile
+import threading
+
+#==============================================================================#
+CacheStats = collections.namedtuple('CacheStats',
+                                    'hits misses evictions entries size')
+DiskCacheStats = collections.namedtuple('DiskCacheStats',
+                                        'hits misses corrupt evictions size')
+
+#==============================================================================#
+class LRUCache(object):
+    """ A bounded, thread-safe mapping.  Once it holds more than *max_entries*
+        entries, or more than *max_size* units as measured by :meth:`sizeof`,
+        the least recently used entries are discarded.
+    """
+    def __init__(self, max_entries, max_size=None):
+        assert max_entries > 0
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def sizeof(self, value):
+        """ The size charged against *max_size* for the given value.  The
+            default charges nothing.
+        """
+        return 0
+
+    def get(self, key, default=None):
+        """ Return the value stored under *key*, or *default*.  A successful
+            lookup marks the entry as most recently used.
+        """
+        with self._lock:
+            try:
+                value, size = self._entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries[key] = (value, size)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """ Store *value* under *key*, evicting old entries as needed. """
+        size = self.sizeof(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[1]
+            self._entries[key] = (value, size)
+            self._size += size
+            self._evict()
+
+    def invalidate(self, key):
+        """ Discard the entry stored under *key*.  Returns True if there was
+            such an entry.
+        """
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is None:
+                return False
+            self._size -= old[1]
+            return True
+
+    def clear(self):
+        """ Discard all entries.  The hit and miss counters are kept. """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return CacheStats(self.hits, self.misses, self.evictions,
+                              len(self._entries), self._size)
+
+    def _evict(self):
+        # Must be called with the lock held.  The most recently stored entry
+        # is never evicted, even if it alone exceeds max_size.
+        entries = self._entries
+        while len(entries) > 1 and (len(entries) > self.max_entries or
+              (self.max_size is not None and self._size > self.max_size)):
+            key, (value, size) = entries.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+
+#==============================================================================#
+def source_key(src, filename, dialect, mode='exec'):
+    """ Compute a key identifying the result of compiling *src* with the given
+        dialect.  Two calls produce the same key only if the source text,
+        filename, compilation mode, dialect fingerprint and Python version all
+        agree.
+    """
+    h = hashlib.sha1()
+    if isinstance(src, unicode):
+        h.update('u')
+        src = src.encode('utf-8')
+    else:
+        h.update('s')
+    for part in (repr(sys.version_info[:3]), dialect.fingerprint, mode,
+                 filename):
+        h.update(part.encode('utf-8') if isinstance(part, unicode) else part)
+        h.update('\0')
+    h.update(src)
+    return h.hexdigest()
+
+
+class ScriptCache(LRUCache):
+    """ An in-memory cache of compiled scripts, keyed by :func:`source_key`.
+        When *max_size* is given, it limits the total number of source
+        characters held by the cached scripts.
+    """
+    def sizeof(self, script):
+        return script.source.size
+
+    def key(self, src, filename, dialect, mode='exec'):
+        return source_key(src, filename, dialect, mode)
+
+
+#==============================================================================#
+class DiskCodeCache(object):
+    """ A persistent store of validated code objects, shared between processes
+        that use the same *directory*.
+
+        Each entry is written to its own file as a marshalled record holding
+        the Python version, the dialect fingerprint, the filename, the source
+        text and the code object, prefixed by a checksum.  Files are written under a
+        temporary name and renamed into place, so readers never see a partial
+        entry.  Entries that fail the checksum, or that were written by another
+        Python version or dialect, are discarded.  Once the files exceed
+        *max_bytes*, the least recently used ones are removed.
+
+        Loaded code objects are not validated again, and a checksum only
+        detects corruption: anyone who can write to the directory can have
+        their own code run.  The directory must therefore be writable only by
+        trusted users, unless a *secret* string is given.  Entries are then
+        signed with an HMAC keyed with the secret, and entries without a valid
+        signature are discarded.
+    """
+    MAGIC = 'LXC1' + imp.get_magic()
+    SUFFIX = '.lxc'
+
+    def __init__(self, directory, max_bytes=None, secret=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.secret = secret
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.corrupt = 0
+        self.evictions = 0
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        self._size = sum(size for path, mtime, size in self._entries())
+
+    def key(self, src, filename, dialect, mode='exec'):
+        return source_key(src, filename, dialect, mode)
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + self.SUFFIX)
+
+    def load(self, key, src, filename, dialect):
+        """ Return the code object stored under *key*, or None.  The stored
+            record must match the given source, filename and dialect.
+        """
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except IOError:
+            self._count('misses')
+            return None
+        record = self._decode(data)
+        expected = (tuple(sys.version_info[:3]),
+                    dialect.fingerprint, filename, src)
+        if record is None or record[:4] != expected:
+            self._count('corrupt')
+            if self._remove(path):
+                with self._lock:
+                    self._size -= len(data)
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        self._count('hits')
+        return record[4]
+
+    def store(self, key, src, filename, dialect, code):
+        """ Store the code object compiled from *src*.  Failures to write are
+            ignored; the cache is only an optimization.
+        """
+        record = (tuple(sys.version_info[:3]), dialect.fingerprint,
+                  filename, src, code)
+        payload = marshal.dumps(record)
+        data = self.MAGIC + self._checksum(payload) + payload
+        path = self.path(key)
+        dirname = os.path.dirname(path)
+        try:
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            fd, tmppath = tempfile.mkstemp(dir=dirname, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                # An entry being replaced no longer counts towards the size.
+                try:
+                    replaced = os.path.getsize(path)
+                except OSError:
+                    replaced = 0
+                if os.name == 'nt' and replaced:
+                    os.remove(path)
+                os.rename(tmppath, path)
+            except:
+                self._remove(tmppath)
+                raise
+        except (IOError, OSError):
+            return
+        with self._lock:
+            self._size += len(data) - replaced
+            evict = self.max_bytes is not None and self._size > self.max_bytes
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """ Remove the least recently used entries until the cache is below
+            90% of *max_bytes*.
+        """
+        entries = list(self._entries())
+        size = sum(entry[2] for entry in entries)
+        limit = self.max_bytes * 9 // 10
+        evictions = 0
+        for path, mtime, entry_size in sorted(entries, key=lambda e: e[1]):
+            if size <= limit:
+                break
+            if self._remove(path):
+                evictions += 1
+            size -= entry_size
+        with self._lock:
+            self._size = size
+            self.evictions += evictions
+
+    def invalidate(self, key):
+        """ Remove the entry stored under *key*.  Returns True if there was
+            such an entry.
+        """
+        path = self.path(key)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return False
+        if not self._remove(path):
+            return False
+        with self._lock:
+            self._size -= size
+        return True
+
+    def clear(self):
+        """ Remove every entry. """
+        for path, mtime, size in self._entries():
+            self._remove(path)
+        with self._lock:
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return DiskCacheStats(self.hits, self.misses, self.corrupt,
+                                  self.evictions, self._size)
+
+    def _decode(self, data):
+        magic = self.MAGIC
+        header = len(magic) + 40
+        if len(data) < header or not data.startswith(magic):
+            return None
+        payload = data[header:]
+        if not hmac.compare_digest(self._checksum(payload),
+                                   data[len(magic):header]):
+            return None
+        try:
+            record = marshal.loads(payload)
+        except (EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(record, tuple) or len(record) != 5:
+            return None
+        return record
+
+    def _checksum(self, payload):
+        if self.secret is None:
+            return hashlib.sha1(payload).hexdigest()
+        return hmac.new(self.secret, payload, hashlib.sha1).hexdigest()
+
+    def _entries(self):
+        # Yields (path, mtime, size) for each entry file.
+        for dirpath, dirnames, filenames in os.walk(self.directory):
+            for name in filenames:
+                if not name.endswith(self.SUFFIX):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_mtime, st.st_size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+#==============================================================================#
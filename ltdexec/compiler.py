@@ -1,10 +1,16 @@
 import ast
+import collections
+import copy
+import hashlib
+import multiprocessing
 import sys
+import threading
 import __builtin__
 
-from . import exceptions, config
+from . import exceptions, config, cache
+from .processor import split
 from .source import Source
-from .script import Script
+from .script import Script, Expression
 
 #==============================================================================#
 def compile(source, filename, dialect):
@@ -17,6 +23,15 @@ def compile(source, filename, dialect):
     dialect = dialect_util.get_dialect_object(dialect)
     return dialect.compile(source, filename)
 
+def compile_expression(source, filename, dialect):
+    """Compile a single expression using the given dialect, returning an
+       :class:`~ltdexec.script.Expression`.  The arguments are as for
+       :func:`compile`.
+       """
+    from .dialect import util as dialect_util
+    dialect = dialect_util.get_dialect_object(dialect)
+    return dialect.compile_expression(source, filename)
+
 #==============================================================================#
 class BaseCompiler(object):
     """Base class for all compiler objects."""
@@ -24,14 +39,92 @@ class BaseCompiler(object):
     def __init__(self, dialect):
         from .dialect import util as dialect_util
         self.dialect = dialect_util.get_dialect_object(dialect)
-        self.processor = dialect.Processor(dialect)
+        self.processor = self.create_processor()
+        self.script_cache = self.create_script_cache()
+        self.code_cache = self.create_code_cache()
+
+    def create_processor(self):
+        """Create the processor used to check and transform scripts."""
+        return self.dialect.Processor(self.dialect)
+
+    def create_script_cache(self):
+        """Create the cache of compiled scripts, or return None if the
+           dialect disables caching."""
+        size = self.dialect.script_cache_size
+        if not size:
+            return None
+        return cache.ScriptCache(size, self.dialect.script_cache_max_bytes)
+
+    def create_code_cache(self):
+        """Create the on-disk cache of code objects, or return None if the
+           dialect does not name a cache directory."""
+        directory = self.dialect.code_cache_dir
+        if not directory:
+            return None
+        return cache.DiskCodeCache(directory,
+                                   self.dialect.code_cache_max_bytes,
+                                   self.dialect.code_cache_secret)
+
+    def invalidate(self, src=None, filename=None):
+        """Remove the script or expression compiled from the given source
+           and filename from the caches.  If no source is given, the caches
+           are cleared.  Entries are keyed by both, so a source cannot be
+           invalidated without its filename."""
+        if src is not None and filename is None:
+            raise TypeError('invalidate() needs the filename the source was '
+                            'compiled with.')
+        for c in (self.script_cache, self.code_cache):
+            if c is None:
+                continue
+            if src is None:
+                c.clear()
+            else:
+                for mode in ('exec', 'eval'):
+                    c.invalidate(c.key(src, filename, self.dialect, mode))
 
     def __call__(self, src, filename):
-        """Compile the given source using this compiler's dialect."""
+        """Compile the given source using this compiler's dialect.  If the
+           same source and filename were compiled before, the cached Script is
+           returned instead."""
+        return self.cached_compile(src, filename, 'exec')
+
+    def compile_expression(self, src, filename='<expression>'):
+        """Compile a single expression using this compiler's dialect.  The
+           returned :class:`~ltdexec.script.Expression` evaluates to the
+           value of the expression.  Expressions are cached as scripts are."""
+        return self.cached_compile(src, filename, 'eval')
+
+    def cached_compile(self, src, filename, mode):
         assert isinstance(src, basestring)
-        source = Source(src, filename)
+        script_cache = self.script_cache
+        if script_cache is not None:
+            key = script_cache.key(src, filename, self.dialect, mode)
+            script = script_cache.get(key)
+            if script is not None:
+                return script
+        script = self.compile_script(src, filename, mode)
+        if script_cache is not None:
+            script_cache.put(key, script)
+        return script
+
+    def compile_script(self, src, filename, mode='exec'):
+        """Compile the given source, bypassing the in-memory cache.  In
+           'eval' mode, the source must be an expression, and an Expression
+           is returned rather than a Script."""
+        source = Source(src, filename, self.dialect.compress_source)
+        if mode == 'exec':
+            do_compile, factory = self.do_compile, self.script_factory
+        else:
+            do_compile = self.do_compile_expression
+            factory = self.expression_factory
+        code_cache = self.code_cache
+        if code_cache is not None:
+            key = code_cache.key(src, filename, self.dialect, mode)
+            code = code_cache.load(key, src, filename, self.dialect)
+            if code is not None:
+                return factory(source, code)
         try:
-            code = self.do_compile(src, filename)
+            code = do_compile(src, filename)
         except SyntaxError:
             typ, e, tb = sys.exc_info()
             if e.filename == config.misc.DEFAULT_SCRIPT_FILE_NAME:
@@ -42,7 +135,9 @@ class BaseCompiler(object):
         except:
             raise exceptions.CompilationError(sys.exc_info(), source,
                                               sanitize=False)
-        return self.script_factory(source, code)
+        if code_cache is not None:
+            code_cache.store(key, src, filename, self.dialect, code)
+        return factory(source, code)
 
     def do_compile(self, src, filename):
         """Compilation entry-point for derived classes.  The returned value is
@@ -50,6 +145,30 @@ class BaseCompiler(object):
            this method """
         raise NotImplementedError()
 
+    def do_compile_ast(self, src, filename):
+        """Return the processed abstract syntax tree of the given source, as
+           :meth:`do_compile` would compile it."""
+        src = self.processor.process_source(src)
+        ast_tree = self.compile_to_ast(src, filename)
+        return self.processor.process_ast(ast_tree)
+
+    def compile_batch(self, src, filename):
+        """Compile the given source, which has already been compiled as a
+           script, as the body of a loop over a batch of rows.  See
+           :meth:`~ltdexec.script.Script.run_batch`."""
+        from .processor import transform
+        ast_tree = self.do_compile_ast(src, filename)
+        ast_tree = transform.wrap_in_row_loop(ast_tree)
+        return self.compile_to_code(ast_tree, filename)
+
+    def do_compile_expression(self, src, filename):
+        """Compile an expression to a code object for evaluation."""
+        src = self.processor.process_source(src)
+        ast_tree = self.compile_to_ast(src, filename, 'eval')
+
+        ast_tree = self.processor.process_ast(ast_tree)
+        return self.compile_to_code(ast_tree, filename)
+
     def compile_to_ast(self, src, filename, mode='exec'):
         """Compile a string to an abstract syntax tree."""
         return __builtin__.compile(src, filename, mode,
@@ -68,6 +187,9 @@ class BaseCompiler(object):
     def script_factory(self, source, code):
         return Script(code, source, self.dialect)
 
+    def expression_factory(self, source, code):
+        return Expression(code, source, self.dialect)
+
 
 #==============================================================================#
 class Compiler(BaseCompiler):
@@ -76,10 +198,7 @@ class Compiler(BaseCompiler):
         super(Compiler, self).__init__(dialect)
 
     def do_compile(self, src, filename):
-        src = self.processor.process_source(src)
-        ast_tree = self.compile_to_ast(src, filename)
-
-        ast_tree = self.processor.process_ast(ast_tree)
+        ast_tree = self.do_compile_ast(src, filename)
         code = self.compile_to_code(ast_tree, filename)
 
         return code
@@ -87,26 +206,211 @@ class Compiler(BaseCompiler):
 
 #==============================================================================#
 class SplitSourceCompiler(BaseCompiler):
+    """A compiler that splits each script into chunks of top-level
+       statements, which are processed separately and merged before the
+       script is compiled.  The processed tree of each chunk is cached by the
+       chunk's text, so that a script made of previously seen chunks, or an
+       edited script, only has its new chunks processed.
+
+       The dialect's processor must provide the split and merge hooks of
+       :class:`~ltdexec.processor.processor.SplitSourceProcessor`; if it does
+       not, a SplitSourceProcessor is used instead.
+    """
 
     def __init__(self, dialect):
         super(SplitSourceCompiler, self).__init__(dialect)
+        self.chunk_cache = self.create_chunk_cache()
+
+    def create_processor(self):
+        from .processor import processor
+        cls = self.dialect.Processor
+        if not issubclass(cls, processor.SplitSourceProcessor):
+            cls = processor.SplitSourceProcessor
+        return cls(self.dialect)
+
+    def create_chunk_cache(self):
+        """Create the cache of processed chunk trees, or return None if the
+           dialect disables it."""
+        size = self.dialect.chunk_cache_size
+        if not size:
+            return None
+        return cache.LRUCache(size)
+
+    def invalidate(self, src=None, filename=None):
+        super(SplitSourceCompiler, self).invalidate(src, filename)
+        if src is None and self.chunk_cache is not None:
+            self.chunk_cache.clear()
 
     def do_compile(self, src, filename):
-        src = processor.process_whole_source(src)
-        sources = processor.split_source(src)
+        src = self.processor.process_whole_source(src)
+        chunks = self.processor.split_source(src)
 
-        trees = [self.do_single_compile(src, filename) for src in sources]
+        trees = self.compile_chunks(chunks, filename)
 
-        ast_tree = self.processor.merge_asts(trees)
-        ast_tree = self.processor.process_merged_ast(ast_tree)
+        return self.merge_chunks(src, chunks, trees, filename)
 
-        code = self.compile_to_code(ast_tree, filename)
+    def chunk_key(self, chunk):
+        text = chunk.text
+        if isinstance(text, unicode):
+            text = text.encode('utf-8')
+        return hashlib.sha1(text).hexdigest()
 
-        return code
+    def compile_chunks(self, chunks, filename):
+        """Return, for each chunk, its processed tree, or None if processing
+           left the chunk unchanged.  Line numbers in the trees are relative
+           to each chunk.  The trees may be shared with the chunk cache, and
+           must not be modified.  Only the chunks missing from the cache are
+           passed to :meth:`process_chunks`."""
+        chunk_cache = self.chunk_cache
+        keys = [self.chunk_key(chunk) for chunk in chunks]
+        trees = {}
+        pending = collections.OrderedDict()
+        for key, chunk in zip(keys, chunks):
+            if chunk_cache is not None:
+                entry = chunk_cache.get(key)
+                if entry is not None:
+                    trees[key] = entry[0]
+                    continue
+            pending.setdefault(key, chunk)
+        processed = self.process_chunks(pending.values(), filename)
+        for key, tree in zip(pending, processed):
+            trees[key] = tree
+            if chunk_cache is not None:
+                # Wrapped, since a tree of None is a valid entry.
+                chunk_cache.put(key, (tree,))
+        return [trees[key] for key in keys]
+
+    def process_chunks(self, chunks, filename):
+        """Process the given chunks, returning the result of
+           :meth:`do_chunk_compile` for each, in order."""
+        return [self.do_chunk_compile(chunk, filename) for chunk in chunks]
+
+    def do_chunk_compile(self, chunk, filename):
+        """Process one chunk, returning its processed tree, or None if it was
+           left unchanged.  Line numbers in the tree are relative to the
+           chunk, while those of any SyntaxError raised are relative to the
+           whole script."""
+        try:
+            tree, modified = self.process_chunk(chunk.text, filename)
+        except SyntaxError as e:
+            split.shift_syntax_error(e, chunk.lineno - 1)
+            raise
+        return tree if modified else None
+
+    def merge_chunks(self, src, chunks, trees, filename):
+        """Compile the processed chunks of *src* into one code object.  If
+           processing changed none of the chunks, and the merged tree needs
+           no processing of its own, *src* is compiled directly; this spares
+           the conversion of the trees back for the bytecode compiler."""
+        if (not self.processor.processes_merged_ast() and
+            all(tree is None for tree in trees)):
+            return __builtin__.compile(src, filename, 'exec')
+        ast_tree = self.merge_chunk_trees(chunks, trees, filename)
+        return self.compile_to_code(ast_tree, filename)
+
+    def merge_chunk_trees(self, chunks, trees, filename):
+        """Merge the processed trees of the chunks, as returned by
+           :meth:`compile_chunks`, into the processed tree of the script."""
+        processor = self.processor
+        placed = []
+        for chunk, tree in zip(chunks, trees):
+            if tree is None:
+                tree = self.compile_to_ast(chunk.text, filename)
+            else:
+                # The tree may be shared, so a copy is renumbered.
+                tree = copy.deepcopy(tree)
+            if chunk.lineno != 1:
+                ast.increment_lineno(tree, chunk.lineno - 1)
+            placed.append(tree)
+
+        ast_tree = processor.merge_asts(placed)
+        return processor.process_merged_ast(ast_tree)
+
+    def do_compile_ast(self, src, filename):
+        src = self.processor.process_whole_source(src)
+        chunks = self.processor.split_source(src)
+        trees = self.compile_chunks(chunks, filename)
+        return self.merge_chunk_trees(chunks, trees, filename)
+
+    def process_chunk(self, src, filename):
+        """Process the source of one chunk, returning its tree and whether
+           processing may have changed it."""
+        processed = self.processor.process_source(src)
+        tree = self.compile_to_ast(processed, filename)
+        tree, modified = self.processor.process_ast_modified(tree)
+        return tree, modified or processed != src
 
     def do_single_compile(self, src, filename):
-        src = self.processor.process_source(src)
-        tree = self.compile_to_ast(src, filename)
-        return self.processor.process_ast(tree)
+        return self.process_chunk(src, filename)[0]
+
+#==============================================================================#
+def _process_chunk(job):
+    """Process one chunk in a worker process of a
+       ParallelSplitSourceCompiler.  Returns a (tree, exception) pair, so
+       that errors can be matched with their chunks.  As in
+       :meth:`SplitSourceCompiler.do_chunk_compile`, the tree is None if the
+       chunk was left unchanged."""
+    from .dialect import registry
+    dialect_name, text, filename = job
+    dialect = registry.dialects[dialect_name]
+    comp = dialect.compiler
+    if not isinstance(comp, SplitSourceCompiler):
+        comp = SplitSourceCompiler(dialect)
+    try:
+        tree, modified = comp.process_chunk(text, filename)
+    except Exception as e:
+        return None, e
+    # Trees are costly to send back, so unchanged ones are left out.
+    return (tree if modified else None), None
+
+
+class ParallelSplitSourceCompiler(SplitSourceCompiler):
+    """A SplitSourceCompiler that processes the chunks of large scripts in a
+       pool of worker processes.
+
+       The pool is started on first use and lasts until :meth:`close` is
+       called.  Scripts with fewer unprocessed chunks than the dialect's
+       ``parallel_compile_threshold`` are processed in the calling process.
+       Workers find the dialect by name in the registry, so the dialect must
+       be registered before the pool starts, or, where processes are not
+       forked, be importable by the workers.
+    """
+
+    def __init__(self, dialect):
+        super(ParallelSplitSourceCompiler, self).__init__(dialect)
+        self.pool = None
+        self._pool_lock = threading.Lock()
+
+    def get_pool(self):
+        """Return the pool of worker processes, starting it if needed."""
+        with self._pool_lock:
+            if self.pool is None:
+                self.pool = multiprocessing.Pool(
+                    self.dialect.parallel_compile_processes)
+            return self.pool
+
+    def close(self):
+        """Stop the worker processes.  A later compilation starts them
+           again."""
+        with self._pool_lock:
+            pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    def process_chunks(self, chunks, filename):
+        if len(chunks) < self.dialect.parallel_compile_threshold:
+            return super(ParallelSplitSourceCompiler, self).process_chunks(
+                chunks, filename)
+        jobs = [(self.dialect.name, chunk.text, filename) for chunk in chunks]
+        results = self.get_pool().map(_process_chunk, jobs)
+        trees = []
+        for chunk, (tree, error) in zip(chunks, results):
+            if error is not None:
+                if isinstance(error, SyntaxError):
+                    split.shift_syntax_error(error, chunk.lineno - 1)
+                raise error
+            trees.append(tree)
+        return trees
 
 #==============================================================================#
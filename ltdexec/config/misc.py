@@ -1,3 +1,13 @@
 
 DEFAULT_SCRIPT_FILE_NAME = '<ltdexec_script>'
 DEFAULT_SCRIPT_TEXT_LINE = '<unknown>'
+
+DEFAULT_SCRIPT_CACHE_SIZE = 256
+DEFAULT_CODE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_CHUNK_CACHE_SIZE = 1024
+DEFAULT_PARALLEL_COMPILE_THRESHOLD = 64
+DEFAULT_ENVIRONMENT_POOL_SIZE = 8
+DEFAULT_EXECUTOR_THREADS_PER_CPU = 5
+DEFAULT_WORKER_RETRIES = 1
+DEFAULT_ASYNC_MAX_CONCURRENCY = 64
+DEFAULT_VECTORIZED_FUNCTIONS = {'abs': 'absolute'}
@@ -14,6 +14,49 @@ class _DialectBase(object):
     forbidden_imports = []
     objects = {}
 
+    # Compiled scripts are cached by their source text.  A size of zero
+    # disables the cache; script_cache_max_bytes optionally bounds the total
+    # length of the cached source text.
+    script_cache_size = config.misc.DEFAULT_SCRIPT_CACHE_SIZE
+    script_cache_max_bytes = None
+
+    # If set, validated code objects are also stored in this directory so
+    # that other processes, or later runs, need not compile them again.  The
+    # directory must be writable only by trusted users, unless
+    # code_cache_secret is set, in which case entries are signed with it.
+    code_cache_dir = None
+    code_cache_max_bytes = config.misc.DEFAULT_CODE_CACHE_MAX_BYTES
+    code_cache_secret = None
+
+    # If True, compiled scripts keep their source text zlib-compressed.  The
+    # text is only read to format tracebacks.
+    compress_source = False
+
+    # The SplitSourceCompiler caches the processed tree of each chunk of a
+    # script by the chunk's text.  A size of zero disables the cache.
+    chunk_cache_size = config.misc.DEFAULT_CHUNK_CACHE_SIZE
+
+    # The ParallelSplitSourceCompiler processes chunks in a pool of this many
+    # processes (by default, one per CPU), once a script has at least
+    # parallel_compile_threshold chunks to process.
+    parallel_compile_processes = None
+    parallel_compile_threshold = config.misc.DEFAULT_PARALLEL_COMPILE_THRESHOLD
+
+    # The names that runs may be given as ltdexec.shared.SharedInputs.
+    # Scripts may not assign to them.
+    shared_names = []
+
+    # If set, an ltdexec.outputs.OutputSchema declaring the outputs that
+    # runs keep.
+    output_schema = None
+
+    # The PooledEnvironmentFactory keeps up to this many idle environments.
+    environment_pool_size = config.misc.DEFAULT_ENVIRONMENT_POOL_SIZE
+
+    # Expressions evaluated over columns may call these functions, which map
+    # the names used by scripts to the names of their NumPy equivalents.
+    vectorized_functions = config.misc.DEFAULT_VECTORIZED_FUNCTIONS
+
     def __setattr__(self, name, val):
         if getattr(self, '_locked_inst', False):
             m = ('A Dialect class instance is immutable.  '
@@ -70,6 +113,33 @@ class Dialect(_DialectBase):
     #: set, a default is chosen.
     AstTransform = None
 
+    #: The :class:`~ltdexec.processor.validator.SourceValidator` applied to
+    #: the whole script before it is split, when the
+    #: :class:`~ltdexec.compiler.SplitSourceCompiler` is used.  If not set, a
+    #: default is chosen.
+    WholeSourceValidator = None
+
+    #: The :class:`~ltdexec.processor.transform.SourceTransform` applied to
+    #: the whole script before it is split.  If not set, a default is chosen.
+    WholeSourceTransform = None
+
+    #: The :class:`~ltdexec.processor.split.SourceSplitter` that splits a
+    #: script into separately processed chunks.  If not set, a default is
+    #: chosen.
+    SourceSplitter = None
+
+    #: The :class:`~ltdexec.processor.split.AstMerger` that reassembles the
+    #: processed chunks.  If not set, a default is chosen.
+    AstMerger = None
+
+    #: The :class:`~ltdexec.processor.validator.MergedAstValidator` applied
+    #: to the reassembled tree.  If not set, a default is chosen.
+    MergedAstValidator = None
+
+    #: The :class:`~ltdexec.processor.transform.MergedAstTransform` applied
+    #: to the reassembled tree.  If not set, a default is chosen.
+    MergedAstTransform = None
+
     #: The :class:`~ltdexec.environment.EnvironmentFactory` to use.  If not
     #: set, a default is chosen.
     EnvironmentFactory = None
@@ -79,7 +149,7 @@ class Dialect(_DialectBase):
     Compiler = None
 
     def __init__(self):
-        from ..processor import validator, transform, processor
+        from ..processor import validator, transform, processor, split
         from .. import compiler, environment
 
         self._locked_inst = False
@@ -88,10 +158,18 @@ class Dialect(_DialectBase):
         self.SourceTransform = self.SourceTransform or transform.SourceTransform
         self.AstValidator = self.AstValidator or validator.create_ast_validator_class(self)
         self.AstTransform = self.AstTransform or transform.AstTransform
+        self.WholeSourceValidator = self.WholeSourceValidator or validator.SourceValidator
+        self.WholeSourceTransform = self.WholeSourceTransform or transform.SourceTransform
+        self.SourceSplitter = self.SourceSplitter or split.SourceSplitter
+        self.AstMerger = self.AstMerger or split.AstMerger
+        self.MergedAstValidator = self.MergedAstValidator or validator.MergedAstValidator
+        self.MergedAstTransform = self.MergedAstTransform or transform.MergedAstTransform
         self.EnvironmentFactory = self.EnvironmentFactory or environment.EnvironmentFactory
         compiler_cls = self.Compiler or compiler.Compiler
         self.compiler = compiler_cls(self)
         self.objects = self.objects.copy()
+        # One factory serves every script of the dialect.
+        self.env_factory = self.EnvironmentFactory(self)
 
     @classmethod
     def compile(cls, src, filename):
@@ -100,6 +178,13 @@ class Dialect(_DialectBase):
         dialect = registry.dialects[cls.name]
         return dialect.compiler(src, filename)
 
+    @classmethod
+    def compile_expression(cls, src, filename='<expression>'):
+        """ Compile a single expression using the Dialect's compiler class.
+            The result is an :class:`~ltdexec.script.Expression`. """
+        dialect = registry.dialects[cls.name]
+        return dialect.compiler.compile_expression(src, filename)
+
 
     @classmethod
     def getattr(cls, obj, name, *args):
@@ -1,5 +1,7 @@
 import sys
 import collections
+import hashlib
+import types
 
 
 from . import registry
@@ -22,6 +24,7 @@ class Builder(object):
         self.unassignable_names()
         self.unassignable_attrs()
         self.initialize_objects()
+        self.fingerprint()
         return self.attrs
 
     #--------------------------------------------------------------------------#
@@ -68,6 +71,12 @@ class Builder(object):
     def check_attribute_flag(self, flag, name):
         self.check_flag(flag, name, 'forbidden_attrs')
 
+    def effective_value(self, attrname, default=None):
+        """ The value of an attribute as the new class will see it. """
+        if attrname in self.attrs:
+            return self.attrs[attrname]
+        return self.inherit_value(attrname, default)
+
     def set_flag(self, traits):
         """ Scans the parent flags for a value.  Note: this is different than
             checking base classes. """
@@ -90,6 +99,8 @@ class Builder(object):
         assert 'forbidden_attrs_set' not in self.attrs
         assert 'unassignable_names_set' not in self.attrs
         assert 'unassignable_attrs_set' not in self.attrs
+        assert 'shared_names_set' not in self.attrs
+        assert 'fingerprint' not in self.attrs
 
     def set_defaults(self):
         """ Set class default values if they are not defined. """
@@ -150,6 +161,11 @@ class Builder(object):
         if objects:
             self.attrs['unassignable_names'].extend(objects.keys())
 
+        # Shared inputs must not be rebound by scripts.
+        shared_names = self.effective_value('shared_names', [])
+        self.attrs['shared_names_set'] = frozenset(shared_names)
+        self.attrs['unassignable_names'].extend(shared_names)
+
         self.attrs['unassignable_names_set'] = \
                 set(self.attrs['unassignable_names'])
         ALWAYS_UNASSIGNABLE_NAMES = config.names.ALWAYS_UNASSIGNABLE_NAMES
@@ -169,7 +185,68 @@ class Builder(object):
         if 'builtin_objects' not in self.attrs:
             self.attrs['builtin_objects'] = {}
 
+    def fingerprint(self):
+        """ Summarize the effective settings of the dialect in a digest.
+
+            Dialects whose digests are equal enforce the same rules and create
+            the same objects, so compiled scripts may be shared between them.
+            The dialect's name is deliberately not included.
+        """
+        flags = [(name, self.effective_value(name))
+                 for name in sorted(config.flags.leafflag_traits)]
+        sets = [(name, sorted(self.attrs[name])) for name in
+                ('forbidden_names_set', 'forbidden_attrs_set',
+                 'unassignable_names_set', 'unassignable_attrs_set')]
+        others = [(name, describe_setting(self.effective_value(name)))
+                  for name in FINGERPRINT_SETTINGS]
+        summary = repr((flags, sets, others))
+        self.attrs['fingerprint'] = hashlib.sha1(summary).hexdigest()
 
+#==============================================================================#
+#: Dialect attributes, besides flags and name sets, that are included in the
+#: dialect fingerprint.
+FINGERPRINT_SETTINGS = (
+    'allowed_imports', 'forbidden_imports', 'objects', 'builtin_objects',
+    'Processor', 'SourceValidator', 'SourceTransform', 'AstValidator',
+    'AstTransform', 'WholeSourceValidator', 'WholeSourceTransform',
+    'SourceSplitter', 'AstMerger', 'MergedAstValidator', 'MergedAstTransform',
+    'EnvironmentFactory', 'Compiler',
+)
+
+_literal_types = (basestring, int, long, float, bool, types.NoneType)
+_named_types = (type, types.ClassType, types.FunctionType,
+                types.BuiltinFunctionType, types.ModuleType)
+
+def describe_setting(value):
+    """ Return a description of a dialect setting that is stable between
+        processes.  Objects without a stable representation are described by
+        their type.
+    """
+    from ..wrapper import defname
+
+    if isinstance(value, _literal_types):
+        return value
+    elif isinstance(value, (list, tuple)):
+        return tuple(describe_setting(v) for v in value)
+    elif isinstance(value, (set, frozenset)):
+        return tuple(sorted(describe_setting(v) for v in value))
+    elif isinstance(value, dict):
+        return tuple(sorted((describe_setting(k), describe_setting(v))
+                            for k, v in value.iteritems()))
+    elif isinstance(value, defname):
+        return (describe_setting(type(value)),
+                describe_setting(value.callable),
+                describe_setting(value.args),
+                describe_setting(value.kwargs),
+                value.method_on_close, value.reusable)
+    elif isinstance(value, types.MethodType):
+        return (describe_setting(value.im_self or value.im_class),
+                value.im_func.__name__)
+    elif isinstance(value, _named_types):
+        return '{0}.{1}'.format(getattr(value, '__module__', None),
+                                value.__name__)
+    else:
+        return '<{0}>'.format(describe_setting(type(value)))
 
 #==============================================================================#
 class DialectMeta(type):
@@ -1,28 +1,42 @@
 
-
+import threading
 
 #==============================================================================#
 class DialectRegistry(object):
+    """ Maps dialect names to their classes, and to their single instances,
+        which are constructed when first requested.  The registry may be used
+        from several threads; each instance is constructed only once.
+    """
     def __init__(self):
         self.dialects = {}
         self.dialect_classes = {}
+        # Reentrant, since constructing a dialect may look up others.
+        self._lock = threading.RLock()
 
     def register(self, dialect_cls):
         assert isinstance(dialect_cls, type)
         name = dialect_cls.name
-        if name not in self.dialect_classes and name not in self.dialects:
-            self.dialect_classes[name] = dialect_cls
+        with self._lock:
+            if name not in self.dialect_classes and name not in self.dialects:
+                self.dialect_classes[name] = dialect_cls
 
     def unregister(self, name):
-        self.dialects.pop(name, None)
-        self.dialect_classes.pop(name)
+        with self._lock:
+            self.dialects.pop(name, None)
+            self.dialect_classes.pop(name)
 
     def __getitem__(self, name):
         try:
             return self.dialects[name]
         except KeyError:
-            self.dialects[name] = self.dialect_classes[name]._construct()
-            return self.dialects[name]
+            pass
+        with self._lock:
+            try:
+                return self.dialects[name]
+            except KeyError:
+                dialect = self.dialect_classes[name]._construct()
+                self.dialects[name] = dialect
+                return dialect
 
     def get_class(self, name):
         return self.dialect_classes[name]
@@ -1,7 +1,9 @@
+import collections
 import uuid
 import sys
+import threading
 
-from . import wrapper
+from . import wrapper, exceptions
 from .dialect import util as dialect_util
 
 #==============================================================================#
@@ -13,15 +15,12 @@ class Environment(object):
         assert isinstance(objects, dict)
         assert isinstance(globals, dict)
 
+        self.objects = objects
         self.startup_objects = []
         self.key = wrapper.create_envkey()
         _globals = {}
         try:
-            for name, objdef in objects.iteritems():
-                _globals[name] = objdef.construct()
-                self.startup_objects.append(
-                    (_globals[name], {'method_on_close': objdef.method_on_close,},)
-                    )
+            self._construct_startup_objects(objects, _globals)
         except:
             exc = sys.exc_info()
             try:
@@ -31,6 +30,12 @@ class Environment(object):
             wrapper.pop_envkey(self.key)
             raise exc[0], exc[1], exc[2]
 
+        self.modules = {}
+        self.module_settings = {}
+
+        self._set_globals(_globals, globals)
+
+    def _set_globals(self, _globals, globals):
         _globals.update(globals)
 
         # locals and globals must refer to the same dict.  Otherwise,
@@ -39,11 +44,48 @@ class Environment(object):
         self.globals = _globals
         self.locals = self.globals
 
-        self.modules = {}
-        self.module_settings = {}
-
         self.globals['_LX_import_module'] = self.import_module
 
+    def _construct_startup_objects(self, objects, _globals):
+        for name, objdef in objects.iteritems():
+            _globals[name] = objdef.construct()
+            self.startup_objects.append(
+                (_globals[name], {'method_on_close': objdef.method_on_close,
+                                  'name': name,
+                                  'reusable': objdef.reusable,},)
+                )
+
+    def reset(self, globals):
+        """ Prepare the environment for another run, as though it had just
+            been created with the given globals.  Objects whose definitions
+            are reusable are kept; the others are closed and constructed
+            again.  Loaded modules are kept, although scripts must still
+            import them.
+        """
+        self._close_unreusable_objects()
+        self._restore(globals)
+
+    def _close_unreusable_objects(self):
+        # Close the startup objects that are not reusable, keeping the others.
+        reused, discarded = [], []
+        for obj, info in self.startup_objects:
+            (reused if info['reusable'] else discarded).append((obj, info))
+        self.startup_objects = discarded
+        try:
+            self._close_startup_objects()
+        finally:
+            self.startup_objects = reused
+
+    def _restore(self, globals):
+        # Construct the startup objects that are missing, and rebuild the
+        # globals around them.
+        _globals = dict((info['name'], obj)
+                        for obj, info in self.startup_objects)
+        self._construct_startup_objects(
+            dict((name, objdef) for name, objdef in self.objects.iteritems()
+                 if name not in _globals), _globals)
+        self._set_globals(_globals, globals)
+
     def _close_startup_object(self, obj, info):
         try:
             obj._LX_unlock(self.key)
@@ -73,7 +115,7 @@ class Environment(object):
             self._close_startup_objects()
         except:
             exc = sys.exc_info()
-        self.globals.pop('_LX_import_module')  # _LX_import_module is an implementation detail
+        self.globals.pop('_LX_import_module', None)  # _LX_import_module is an implementation detail
         wrapper.pop_envkey(key)
         if exc:
             raise exc[0], exc[1], exc[2]
@@ -134,10 +176,211 @@ class EnvironmentFactory(object):
             self.objects = {}
         self.objects.update(dialect.builtin_objects)
 
-    def __call__(self, globals=None):
-        """ Create an Environment object. """
+    def __call__(self, globals=None, names=None):
+        """ Create an Environment object.  If *names* is given, only the
+            objects with those names are constructed.
+        """
         globals = globals or {}
-        return self.Environment(self.objects, globals)
+        objects = self.objects
+        if names is not None:
+            objects = dict((name, objdef) for name, objdef
+                           in objects.iteritems() if name in names)
+        return self.Environment(objects, globals)
+
+    def shared_namespace(self):
+        """ Return a dict of the dialect's objects, constructed once, which
+            may be shared between evaluations that need no Environment.  This
+            requires every object to be reusable and to need no closing, as
+            functions are; if the dialect has other objects, None is returned.
+        """
+        try:
+            return self._shared_namespace
+        except AttributeError:
+            pass
+        namespace = None
+        if all(objdef.reusable and not objdef.method_on_close
+               for objdef in self.objects.itervalues()):
+            namespace = dict((name, objdef.construct())
+                             for name, objdef in self.objects.iteritems())
+        self._shared_namespace = namespace
+        return namespace
+
+
+#==============================================================================#
+PoolStats = collections.namedtuple('PoolStats',
+                                   'hits misses discards idle leased')
+
+class PooledEnvironment(Environment):
+    """ An Environment that a :class:`PooledEnvironmentFactory` lends to one
+        run at a time.  Closing it returns it to the pool.
+
+        While idle, it holds no environment key; a key is taken when it is
+        lent, and given up when it is returned, within the thread that runs
+        the script.  Objects that are not reusable are closed when it is
+        returned, and constructed again when it is next lent.
+    """
+    def __init__(self, objects, factory):
+        super(PooledEnvironment, self).__init__(objects, {})
+        wrapper.pop_envkey(self.key)
+        self.factory = factory
+        self.runs = 0
+
+    def lend(self, globals):
+        """ Prepare the environment for a run with the given globals.  The
+            first run uses the environment as constructed; later ones reset
+            it first.
+        """
+        self.key = wrapper.create_envkey()
+        try:
+            if self.runs:
+                # Validated before the globals are added, as they may
+                # override the names of objects.
+                self._restore({})
+                if not self.validate():
+                    m = 'The environment was not restored by its reset.'
+                    raise exceptions.InternalError(m)
+            self._set_globals(self.globals, globals)
+        except:
+            exc = sys.exc_info()
+            wrapper.pop_envkey(self.key)
+            raise exc[0], exc[1], exc[2]
+        self.runs += 1
+
+    def validate(self):
+        """ Return True if the globals hold exactly the startup objects, as
+            they do after construction.
+        """
+        get = self.globals.get
+        for obj, info in self.startup_objects:
+            if get(info['name']) is not obj:
+                return False
+        return get('_LX_import_module') == self.import_module
+
+    def close(self):
+        """ Close the objects that are not reusable, and return the
+            environment to its pool.  The globals of the run are dropped; only
+            the reusable objects are kept until the next run.  If an object
+            fails to close, the environment is discarded, and the exception
+            propagates.
+        """
+        try:
+            self._close_unreusable_objects()
+        except:
+            exc = sys.exc_info()
+            wrapper.pop_envkey(self.key)
+            self.factory._discard(self, leased=True)
+            raise exc[0], exc[1], exc[2]
+        self.globals = self.locals = dict(
+            (info['name'], obj) for obj, info in self.startup_objects)
+        wrapper.pop_envkey(self.key)
+        self.factory.release(self)
+
+    def discard(self):
+        """ Close the environment's startup objects for good. """
+        self.key = wrapper.create_envkey()
+        super(PooledEnvironment, self).close()
+
+
+class PooledEnvironmentFactory(EnvironmentFactory):
+    """ An EnvironmentFactory that keeps up to the dialect's
+        `environment_pool_size` idle environments, and lends them out again
+        rather than constructing new ones.  Environments may be lent to runs
+        in several threads at once; when none is idle, a new one is
+        constructed.
+
+        When an environment is returned, the objects that are not reusable
+        are closed and the globals of the run are dropped.  Before it is lent
+        again, those objects are constructed again and its globals are
+        rebuilt, as by :meth:`Environment.reset`.  An environment whose
+        reset fails, or does not restore the startup objects, is discarded
+        and replaced.
+    """
+    Environment = PooledEnvironment
+
+    def __init__(self, dialect):
+        super(PooledEnvironmentFactory, self).__init__(dialect)
+        dialect = dialect_util.get_dialect_object(dialect)
+        self.pool_size = dialect.environment_pool_size
+        self._idle = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.discards = 0
+        self.leased = 0
+
+    def __call__(self, globals=None, names=None):
+        """ Lend out an Environment, constructing one if none is idle.  Since
+            environments are shared by all scripts, they always hold every
+            object, and *names* is ignored.
+        """
+        globals = globals or {}
+        while True:
+            with self._lock:
+                env = self._idle.pop() if self._idle else None
+            if env is None:
+                break
+            try:
+                env.lend(globals)
+            except:
+                self._discard(env)
+                continue
+            with self._lock:
+                self.hits += 1
+                self.leased += 1
+            return env
+        env = self.Environment(self.objects, self)
+        try:
+            env.lend(globals)
+        except:
+            exc = sys.exc_info()
+            self._discard(env)
+            raise exc[0], exc[1], exc[2]
+        with self._lock:
+            self.misses += 1
+            self.leased += 1
+        return env
+
+    def release(self, env):
+        """ Take back an environment that was lent out. """
+        with self._lock:
+            self.leased -= 1
+            keep = len(self._idle) < self.pool_size
+            if keep:
+                self._idle.append(env)
+        if not keep:
+            self._discard(env)
+
+    def fill(self):
+        """ Construct environments until the pool is full. """
+        while True:
+            with self._lock:
+                if len(self._idle) >= self.pool_size:
+                    return
+            env = self.Environment(self.objects, self)
+            with self._lock:
+                self._idle.append(env)
+
+    def close(self):
+        """ Discard the idle environments. """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for env in idle:
+            env.discard()
+
+    def stats(self):
+        with self._lock:
+            return PoolStats(self.hits, self.misses, self.discards,
+                             len(self._idle), self.leased)
+
+    def _discard(self, env, leased=False):
+        with self._lock:
+            self.discards += 1
+            if leased:
+                self.leased -= 1
+        try:
+            env.discard()
+        except Exception:
+            pass
 
 
 #==============================================================================#
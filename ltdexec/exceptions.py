@@ -46,6 +46,13 @@ class SyntaxError(exceptions.SyntaxError, Exception):
     def __str__(self):
         return self.args[0]
 
+    def __reduce__(self):
+        # The builtin reduction would call the constructor with the builtin
+        # SyntaxError's arguments.
+        filename,lineno,offset,text = self.args[1]
+        return (self.__class__,
+                (self.args[0], filename, lineno, offset, text, self.reason))
+
 #==============================================================================#
 class InternalError(Exception):
     """ A library-internal invariant was violated, likely by a library-internal
@@ -67,6 +74,35 @@ class UnregisteredDialectError(Exception):
     """
     pass
 
+class IncompatibleScriptError(Exception):
+    """ A pickled Script was loaded by a different Python version, or where
+        its Dialect has different settings.
+    """
+    pass
+
+class OutputError(Exception):
+    """ A script did not assign one of its declared outputs, or assigned it a
+        value of the wrong type.  *name* is the name of the output.
+    """
+    def __init__(self, msg, name=None):
+        super(OutputError, self).__init__(msg)
+        self.name = name
+
+    def __reduce__(self):
+        return (self.__class__, (self.args[0], self.name))
+
+class TimeoutError(Exception):
+    """ A call submitted to an executor did not finish in the time given. """
+    pass
+
+class CancelledError(Exception):
+    """ A call submitted to an executor was cancelled. """
+    pass
+
+class WorkerError(Exception):
+    """ A worker process of an executor exited while running a script. """
+    pass
+
 #==============================================================================#
 class LXPrivateObjectError(Exception):
     """ An attempt was made to retrieve a LimitedExec internal variable at
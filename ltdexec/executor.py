@@ -0,0 +1,924 @@
+"""
+ltdexec.executor
+================
+
+Executors run scripts in the background, in a pool of worker threads or
+processes, and return a :class:`Future` for each run.
+
+"""
+
+import collections
+import cPickle
+import gc
+import importlib
+import itertools
+import multiprocessing
+import os
+import Queue
+import select
+import signal
+import sys
+import threading
+import time
+import traceback
+
+from . import config, exceptions
+
+#==============================================================================#
+class Future(object):
+    """ The eventual outcome of a call made by an executor.  Its interface
+        follows that of :class:`concurrent.futures.Future`, which Python 2
+        does not provide.
+    """
+    _PENDING, _RUNNING, _CANCELLED, _FINISHED = range(4)
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._state = self._PENDING
+        self._result = None
+        self._exc_info = None
+        self._callbacks = []
+        self._canceller = None
+
+    def cancel(self):
+        """ Cancel the call unless it is finished, or is running and its
+            executor cannot stop it.  Returns True if the call is cancelled.
+        """
+        with self._condition:
+            if self._state == self._FINISHED:
+                return False
+            canceller = None
+            if self._state == self._RUNNING:
+                if self._canceller is None:
+                    return False
+                canceller, self._canceller = self._canceller, None
+            if self._state != self._CANCELLED:
+                self._state = self._CANCELLED
+                self._condition.notify_all()
+        # The executor checks the state once the call stops, so it is set
+        # first.
+        if canceller is not None:
+            canceller()
+        self._invoke_callbacks()
+        return True
+
+    def cancelled(self):
+        return self._state == self._CANCELLED
+
+    def running(self):
+        return self._state == self._RUNNING
+
+    def done(self):
+        return self._state in (self._CANCELLED, self._FINISHED)
+
+    def result(self, timeout=None):
+        """ Return the value of the call, waiting up to *timeout* seconds for
+            it.  If the call raised an exception, it is raised again here.
+        """
+        self._wait(timeout)
+        if self._exc_info is not None:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+        return self._result
+
+    def exception(self, timeout=None):
+        """ Return the exception the call raised, or None. """
+        self._wait(timeout)
+        return None if self._exc_info is None else self._exc_info[1]
+
+    def add_done_callback(self, fn):
+        """ Call *fn* with the future once it is done.  Exceptions raised by
+            *fn* are ignored.
+        """
+        with self._condition:
+            if not self.done():
+                self._callbacks.append(fn)
+                return
+        self._call(fn)
+
+    def set_running_or_notify_cancel(self):
+        """ Called by the executor before running the call.  Returns False if
+            the call was cancelled, and should not be run.
+        """
+        with self._condition:
+            if self._state == self._CANCELLED:
+                return False
+            self._state = self._RUNNING
+            return True
+
+    def set_canceller(self, fn):
+        """ Called by the executor while the call runs, with a function that
+            stops it, or None once it can no longer be stopped.  The function
+            is called at most once, after the future is marked as cancelled.
+        """
+        with self._condition:
+            self._canceller = fn
+
+    def set_result(self, result):
+        """ Set the value of the call.  Returns False, and does nothing, if
+            the future is already done, for instance cancelled.
+        """
+        with self._condition:
+            if self.done():
+                return False
+            self._result = result
+            self._state = self._FINISHED
+            self._canceller = None
+            self._condition.notify_all()
+        self._invoke_callbacks()
+        return True
+
+    def set_exc_info(self, exc_info):
+        """ Set the exception raised by the call, as for :meth:`set_result`.
+        """
+        with self._condition:
+            if self.done():
+                return False
+            self._exc_info = exc_info
+            self._state = self._FINISHED
+            self._canceller = None
+            self._condition.notify_all()
+        self._invoke_callbacks()
+        return True
+
+    def _wait(self, timeout):
+        with self._condition:
+            if timeout is None:
+                while not self.done():
+                    self._condition.wait()
+            else:
+                deadline = time.time() + timeout
+                while not self.done():
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+            if self._state == self._CANCELLED:
+                raise exceptions.CancelledError('The call was cancelled.')
+            if self._state != self._FINISHED:
+                raise exceptions.TimeoutError('The call did not finish in '
+                                              'time.')
+
+    def _invoke_callbacks(self):
+        with self._condition:
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            self._call(fn)
+
+    def _call(self, fn):
+        try:
+            fn(self)
+        except Exception:
+            pass
+
+
+#==============================================================================#
+class BaseExecutor(object):
+    """ Subclasses provide :meth:`submit` and :meth:`shutdown`. """
+
+    def submit(self, script, globals=None, **kwargs):
+        raise NotImplementedError()
+
+    def shutdown(self, wait=True):
+        raise NotImplementedError()
+
+    def map(self, script, globals_iterable, **kwargs):
+        """ Run the script once for each globals dict, and return an iterator
+            of the Results, in order.
+        """
+        futures = [self.submit(script, globals, **kwargs)
+                   for globals in globals_iterable]
+        def results():
+            for future in futures:
+                yield future.result()
+        return results()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown(wait=True)
+
+
+#==============================================================================#
+class ScriptExecutor(BaseExecutor):
+    """ Run scripts in a pool of up to *max_workers* threads (by default,
+        ``config.misc.DEFAULT_EXECUTOR_THREADS_PER_CPU`` per CPU).  Threads
+        are started as calls are submitted.
+
+        Each run uses its own Environment, as :meth:`Script.run
+        <ltdexec.script.Script.run>` does.  Since scripts hold the global
+        interpreter lock while they run, threads help most when scripts wait
+        on their dialect's objects, for instance for I/O.
+    """
+    def __init__(self, max_workers=None):
+        if max_workers is None:
+            max_workers = (multiprocessing.cpu_count() *
+                           config.misc.DEFAULT_EXECUTOR_THREADS_PER_CPU)
+        if max_workers <= 0:
+            raise ValueError('max_workers must be greater than 0.')
+        self.max_workers = max_workers
+        self._queue = Queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def submit(self, script, globals=None, **kwargs):
+        """ Schedule ``script.run(globals, **kwargs)`` and return a
+            :class:`Future` of its Result.
+        """
+        return self.submit_call(script.run, globals, **kwargs)
+
+    def submit_call(self, fn, *args, **kwargs):
+        """ Schedule ``fn(*args, **kwargs)`` and return a :class:`Future` of
+            its value.
+        """
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('The executor has been shut down.')
+            self._queue.put((future, fn, args, kwargs))
+            self._adjust_threads()
+        return future
+
+    def shutdown(self, wait=True):
+        """ Stop accepting calls.  The calls already submitted are still run;
+            if *wait* is True, this waits until they are.
+        """
+        with self._lock:
+            if not self._shutdown:
+                self._shutdown = True
+                for t in self._threads:
+                    self._queue.put(None)
+            threads = list(self._threads)
+        if wait:
+            for t in threads:
+                t.join()
+
+    def _adjust_threads(self):
+        # Must be called with the lock held.
+        if len(self._threads) < self.max_workers:
+            t = threading.Thread(target=self._work)
+            t.daemon = True
+            t.start()
+            self._threads.append(t)
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, fn, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn(*args, **kwargs)
+            except:
+                future.set_exc_info(sys.exc_info())
+            else:
+                future.set_result(result)
+            del item, future, fn, args, kwargs
+
+#==============================================================================#
+class ProcessResult(object):
+    """ The outcome of a run in a worker process of a
+        :class:`ProcessScriptExecutor`.
+
+        The traceback of an exception cannot leave the worker, so a run that
+        raised one has *exception* set, and *traceback* holds its text,
+        formatted as for an :class:`~ltdexec.exceptions.ExecutionError`.
+        *exception_type* is the name of the exception's class.  *latency* is
+        the time, in seconds, from the fork of the process that ran a script
+        to the arrival of its result, when run by a :class:`ForkExecutor`.
+
+        The values of the namespace, and the outputs, arrive pickled, and are
+        loaded when first used.  The dialect's objects, and other values that
+        cannot be pickled, such as modules, are left out of the namespace.
+    """
+    __slots__ = ('exception', 'exception_type', 'traceback', '_globals_data',
+                 '_outputs_data', '_globals', '_outputs', 'latency')
+
+    def __init__(self, exception=False, exception_type=None, traceback=None,
+                 globals_data=None, outputs_data=None, latency=None):
+        self.exception = exception
+        self.exception_type = exception_type
+        self.traceback = traceback
+        self._globals_data = globals_data
+        self._outputs_data = outputs_data
+        self._globals = None
+        self._outputs = None
+        self.latency = latency
+
+    @property
+    def globals(self):
+        if self._globals is None:
+            if self._globals_data is None:
+                self._globals = {}
+            else:
+                self._globals = cPickle.loads(self._globals_data)
+        return self._globals
+
+    locals = globals
+
+    @property
+    def outputs(self):
+        if self._outputs is None and self._outputs_data is not None:
+            self._outputs = cPickle.loads(self._outputs_data)
+        return self._outputs
+
+    def __reduce__(self):
+        return (ProcessResult, (self.exception, self.exception_type,
+                                self.traceback, self._globals_data,
+                                self._outputs_data, self.latency))
+
+
+def _dumps(value):
+    return cPickle.dumps(value, cPickle.HIGHEST_PROTOCOL)
+
+def _dumps_namespace(namespace, excluded):
+    namespace = dict((name, value) for name, value in namespace.iteritems()
+                     if name not in excluded)
+    try:
+        return _dumps(namespace)
+    except Exception:
+        pass
+    # Leave out the values that cannot be pickled.
+    picklable = {}
+    for name, value in namespace.iteritems():
+        try:
+            _dumps(value)
+        except Exception:
+            continue
+        picklable[name] = value
+    return _dumps(picklable)
+
+def _process_result(script, result):
+    # Convert a Result into a ProcessResult, in a worker process.
+    exc_type, exc_value = result.exc_info[:2]
+    exception_type = traceback_text = None
+    if result.exception:
+        exception_type = exc_type.__name__
+        traceback_text = str(exceptions.ExecutionError(result.exc_info,
+                                                       script.source))
+    outputs_data = None
+    if result.outputs is not None:
+        try:
+            outputs_data = _dumps(result.outputs)
+        except Exception as e:
+            return ProcessResult(True, type(e).__name__, ''.join(
+                traceback.format_exception_only(type(e), e)))
+    excluded = set(script.env_factory.objects)
+    excluded.add('__builtins__')
+    globals_data = _dumps_namespace(result.globals, excluded)
+    return ProcessResult(result.exception, exception_type, traceback_text,
+                         globals_data, outputs_data)
+
+#: Scripts loaded by a worker process, by their pickled form.
+_worker_scripts = {}
+
+def _initialize_worker(modules, dialect_names):
+    """ Prepare a worker process of a :class:`ProcessScriptExecutor`, by
+        importing the given modules, and constructing the named dialects.
+    """
+    from .dialect import registry
+    for name in modules:
+        importlib.import_module(name)
+    for name in dialect_names:
+        if name in registry.dialects:
+            registry.dialects[name]
+
+def _load_script(script_data):
+    script = _worker_scripts.get(script_data)
+    if script is None:
+        script = cPickle.loads(script_data)
+        if len(_worker_scripts) >= config.misc.DEFAULT_SCRIPT_CACHE_SIZE:
+            _worker_scripts.clear()
+        _worker_scripts[script_data] = script
+    return script
+
+def _run_in_worker(job):
+    """ Run a script in a worker process of a :class:`ProcessScriptExecutor`.
+        Returns a (ProcessResult, exception) pair, so that an error raised
+        while setting up the run reaches the Future without ending the
+        worker.
+    """
+    script_data, args_data = job
+    try:
+        script = _load_script(script_data)
+        globals, outputs = cPickle.loads(args_data)
+        return _process_result(script, script.run(globals, outputs)), None
+    except Exception as e:
+        try:
+            _dumps(e)
+        except Exception:
+            e = RuntimeError(''.join(traceback.format_exception_only(
+                type(e), e)))
+        return None, e
+
+
+#: Why a worker process retired.
+_RETIRE_RUNS, _RETIRE_RSS = 'runs', 'rss'
+
+def resident_memory():
+    """ Return the resident set size of this process, in bytes, read from
+        ``/proc/self/statm``, or None where it is not available.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    except (EnvironmentError, IndexError, ValueError, AttributeError):
+        return None
+
+def _worker_main(conn, modules, dialect_names, max_runs, max_rss):
+    """ The main loop of a worker process of a
+        :class:`ProcessScriptExecutor`.  After each run, the worker replies
+        with the run's value and, if it is retiring, the reason, and then
+        exits.
+    """
+    _initialize_worker(modules, dialect_names)
+    runs = 0
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        value = _run_in_worker(job)
+        runs += 1
+        retire = None
+        if max_runs is not None and runs >= max_runs:
+            retire = _RETIRE_RUNS
+        elif max_rss is not None:
+            rss = resident_memory()
+            if rss is not None and rss > max_rss:
+                retire = _RETIRE_RSS
+        conn.send((value, retire))
+        if retire is not None:
+            return
+
+
+class _Worker(object):
+    # The parent's handle on a worker process.
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except EnvironmentError:
+            pass
+        self.join()
+
+    def join(self):
+        self.conn.close()
+        self.process.join()
+
+
+class _PicklingExecutor(BaseExecutor):
+    # Sends scripts and their arguments to other processes, pickled.
+    _last_script = (None, None)
+
+    def _dump_job(self, script, globals, outputs):
+        # Consecutive runs of a script are common, so its pickled form is
+        # kept.  Pickling here raises errors in the caller, rather than in
+        # the thread that sends the job.
+        last_script, script_data = self._last_script
+        if last_script is not script:
+            script_data = _dumps(script)
+            self._last_script = (script, script_data)
+        return script_data, _dumps((globals, outputs))
+
+
+WorkerStats = collections.namedtuple(
+    'WorkerStats',
+    'runs started retired_runs retired_rss crashes retries cancelled')
+
+#: Held while a worker process is started, so that no other worker inherits
+#: its end of the pipe, which would hide the worker's exit from the parent.
+_start_lock = threading.Lock()
+
+class ProcessScriptExecutor(_PicklingExecutor):
+    """ Run scripts in *max_workers* worker processes (by default, one per
+        CPU), so that scripts that compute, rather than wait, run in
+        parallel.  Each run returns a :class:`Future` of a
+        :class:`ProcessResult`.
+
+        The workers start with the executor.  Each imports the given
+        *modules*, and constructs the dialects named in *dialects* (by
+        default, every registered dialect), once.  Scripts are sent to the
+        workers pickled, so their dialects must be registered in the
+        workers: dialects registered before the executor is created are
+        inherited where processes are forked; elsewhere, they must be
+        defined by one of the *modules*.  Globals must be picklable.
+
+        A worker is retired, and replaced, after *max_runs_per_worker* runs,
+        or after a run leaves its resident memory above *max_worker_rss*
+        bytes.  A run whose worker exits is retried on a new worker, up to
+        *max_retries* times; after that, its Future raises a
+        :class:`~ltdexec.exceptions.WorkerError`.  Cancelling the Future of
+        a running script terminates its worker.  :meth:`stats` counts these
+        events.
+    """
+    def __init__(self, max_workers=None, dialects=None, modules=(),
+                 max_runs_per_worker=None, max_worker_rss=None,
+                 max_retries=config.misc.DEFAULT_WORKER_RETRIES):
+        from .dialect import registry
+        if max_workers is None:
+            max_workers = multiprocessing.cpu_count()
+        if max_workers <= 0:
+            raise ValueError('max_workers must be greater than 0.')
+        if max_runs_per_worker is not None and max_runs_per_worker <= 0:
+            raise ValueError('max_runs_per_worker must be greater than 0.')
+        if dialects is None:
+            dialects = registry.dialects.names()
+        self.max_workers = max_workers
+        self.max_runs_per_worker = max_runs_per_worker
+        self.max_worker_rss = max_worker_rss
+        self.max_retries = max_retries
+        self._worker_args = (tuple(modules), tuple(dialects),
+                             max_runs_per_worker, max_worker_rss)
+        self._queue = Queue.Queue()
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self._stats = dict.fromkeys(WorkerStats._fields, 0)
+        self._threads = []
+        for i in xrange(max_workers):
+            t = threading.Thread(target=self._manage, args=(self._start(),))
+            t.daemon = True
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, script, globals=None, outputs=None):
+        """ Schedule ``script.run(globals, outputs)`` in a worker process and
+            return a :class:`Future` of its :class:`ProcessResult`.  Errors
+            raised while setting up the run, such as by the construction of
+            the dialect's objects, are raised by the Future.
+        """
+        job = self._dump_job(script, globals, outputs)
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('The executor has been shut down.')
+            self._queue.put((future, job))
+        return future
+
+    def shutdown(self, wait=True):
+        """ Stop accepting scripts.  The scripts already submitted are still
+            run; if *wait* is True, this waits until they are, and the worker
+            processes have exited.
+        """
+        with self._lock:
+            if not self._shutdown:
+                self._shutdown = True
+                for t in self._threads:
+                    self._queue.put(None)
+        if wait:
+            for t in self._threads:
+                t.join()
+
+    def stats(self):
+        """ Return the counts of runs and of worker events, as a
+            :class:`WorkerStats`.
+        """
+        with self._lock:
+            return WorkerStats(**self._stats)
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _start(self):
+        with _start_lock:
+            conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_worker_main, args=(child_conn,) + self._worker_args)
+            process.daemon = True
+            process.start()
+            child_conn.close()
+        self._count('started')
+        return _Worker(process, conn)
+
+    def _manage(self, worker):
+        # Feeds one worker process with runs, replacing it as needed.
+        while True:
+            item = self._queue.get()
+            if item is None:
+                if worker is not None:
+                    worker.stop()
+                return
+            future, job = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            attempts = 0
+            while True:
+                if worker is None:
+                    worker = self._start()
+                future.set_canceller(worker.process.terminate)
+                try:
+                    worker.conn.send(job)
+                    (result, exc), retire = worker.conn.recv()
+                except (EOFError, EnvironmentError):
+                    worker.join()
+                    worker = None
+                    if future.cancelled():
+                        self._count('cancelled')
+                        break
+                    self._count('crashes')
+                    if attempts < self.max_retries:
+                        attempts += 1
+                        self._count('retries')
+                        continue
+                    m = 'The worker process exited while running the script.'
+                    future.set_exc_info((exceptions.WorkerError,
+                                         exceptions.WorkerError(m), None))
+                    break
+                future.set_canceller(None)
+                if future.cancelled():
+                    # The worker was terminated after it replied.
+                    worker.join()
+                    worker = None
+                    self._count('cancelled')
+                    break
+                self._count('runs')
+                if retire is not None:
+                    worker.join()
+                    worker = None
+                    self._count('retired_' + retire)
+                if exc is None:
+                    future.set_result(result)
+                else:
+                    future.set_exc_info((type(exc), exc, None))
+                break
+            del item, future
+
+#==============================================================================#
+def _fork_child(job, conn, fds):
+    """ Run a job in a process forked by the zygote, write its pickled value
+        to the file descriptor *fds[-1]*, and exit.
+    """
+    status = 1
+    try:
+        conn.close()
+        for fd in fds[:-1]:
+            os.close(fd)
+        if not hasattr(gc, 'freeze'):
+            # Collections would write to every tracked object, copying the
+            # zygote's pages.  The process lasts for one run only.
+            gc.disable()
+        data = _dumps(_run_in_worker(job))
+        while data:
+            data = data[os.write(fds[-1], data):]
+        status = 0
+    finally:
+        os._exit(status)
+
+def _zygote_main(conn, modules, dialect_names, max_children):
+    """ The main loop of the zygote process of a :class:`ForkExecutor`.
+
+        Jobs arrive as ``('run', job_id, script_data, args_data)``.  Each is
+        run in a child forked from the zygote, up to *max_children* at once,
+        which writes its value to a pipe.  The zygote relays it to the parent
+        as ``(job_id, data, latency)``, where *data* is None if the child
+        failed.  ``('cancel', job_id)`` kills the job's child, or drops the
+        job if it has not started.  The zygote exits once the parent closes
+        the connection, or sends None, and every job has finished.
+    """
+    _initialize_worker(modules, dialect_names)
+    if hasattr(gc, 'freeze'):
+        gc.collect()
+        gc.freeze()
+    pending = collections.deque()
+    # The read end of each child's pipe: [job_id, pid, chunks, start time].
+    children = {}
+    accepting = True
+    while accepting or pending or children:
+        while pending and len(children) < max_children:
+            job_id, job = pending.popleft()
+            try:
+                # Loaded here, the script is inherited by later children.
+                _load_script(job[0])
+            except Exception:
+                pass
+            r, w = os.pipe()
+            start = time.time()
+            pid = os.fork()
+            if pid == 0:
+                _fork_child(job, conn, list(children) + [r, w])
+            os.close(w)
+            children[r] = [job_id, pid, [], start]
+        fds = list(children)
+        if accepting:
+            fds.append(conn.fileno())
+        for fd in select.select(fds, [], [])[0]:
+            if fd not in children:
+                try:
+                    item = conn.recv()
+                except EOFError:
+                    item = None
+                if item is None:
+                    accepting = False
+                elif item[0] == 'run':
+                    pending.append((item[1], item[2:]))
+                else:
+                    _cancel_job(conn, item[1], pending, children)
+                continue
+            child = children[fd]
+            data = os.read(fd, 65536)
+            if data:
+                child[2].append(data)
+                continue
+            os.close(fd)
+            del children[fd]
+            job_id, pid, chunks, start = child
+            status = os.waitpid(pid, 0)[1]
+            latency = time.time() - start
+            try:
+                conn.send((job_id, ''.join(chunks) if status == 0 else None,
+                           latency))
+            except EnvironmentError:
+                pass
+
+
+def _cancel_job(conn, job_id, pending, children):
+    # Kill the child running the job, whose end is then reported as for any
+    # child, or drop the job if it is still pending.
+    for child in children.itervalues():
+        if child[0] == job_id:
+            try:
+                os.kill(child[1], signal.SIGKILL)
+            except OSError:
+                pass
+            return
+    for item in pending:
+        if item[0] == job_id:
+            pending.remove(item)
+            conn.send((job_id, None, 0.0))
+            return
+
+
+ForkStats = collections.namedtuple(
+    'ForkStats', 'runs crashes cancelled mean_latency max_latency')
+
+class ForkExecutor(_PicklingExecutor):
+    """ Run each script in a new process, forked from a zygote process that
+        has the dialects preloaded.  Runs cannot affect one another, even
+        through dialect objects that are not safe to reuse, and do not pay
+        for importing ltdexec or constructing the dialects.  Up to
+        *max_workers* runs (by default, one per CPU) proceed at once.  This
+        requires :func:`os.fork`.
+
+        The zygote imports the given *modules*, and constructs the dialects
+        named in *dialects* (by default, every registered dialect), along
+        with their EnvironmentFactory objects, once.  Where the interpreter
+        provides :func:`gc.freeze`, the zygote's objects are then frozen, so
+        that the forked processes share the zygote's memory pages longer;
+        otherwise the forked processes do not collect garbage.
+
+        Each run returns a :class:`Future` of a :class:`ProcessResult`, whose
+        *latency* is the time from the fork to the arrival of the result.
+        A run whose process exits without a result raises a
+        :class:`~ltdexec.exceptions.WorkerError`.  Cancelling the Future of
+        a running script kills its process.  Scripts and globals must
+        be picklable, as for :class:`ProcessScriptExecutor`.
+    """
+    def __init__(self, max_workers=None, dialects=None, modules=()):
+        from .dialect import registry
+        if max_workers is None:
+            max_workers = multiprocessing.cpu_count()
+        if max_workers <= 0:
+            raise ValueError('max_workers must be greater than 0.')
+        if dialects is None:
+            dialects = registry.dialects.names()
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self._futures = {}
+        self._job_ids = itertools.count()
+        # Sends may block until the zygote reads them, and the zygote may be
+        # waiting for self._receive to read a result, which needs self._lock;
+        # so sends are only guarded by self._send_lock.  self._sending counts
+        # the jobs being sent, which shutdown() waits for.
+        self._send_lock = threading.Lock()
+        self._sending = 0
+        self._sent = threading.Condition(self._lock)
+        self._runs = self._crashes = self._cancelled = 0
+        self._latency_total = self._latency_max = 0.0
+        with _start_lock:
+            self._conn, child_conn = multiprocessing.Pipe()
+            self._zygote = multiprocessing.Process(
+                target=_zygote_main, args=(child_conn, tuple(modules),
+                                           tuple(dialects), max_workers))
+            self._zygote.daemon = True
+            self._zygote.start()
+            child_conn.close()
+        self._thread = threading.Thread(target=self._receive)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, script, globals=None, outputs=None):
+        """ Schedule ``script.run(globals, outputs)`` in a forked process and
+            return a :class:`Future` of its :class:`ProcessResult`.  Errors
+            raised while setting up the run are raised by the Future.
+        """
+        script_data, args_data = self._dump_job(script, globals, outputs)
+        job_id = next(self._job_ids)
+        future = Future()
+        future.set_running_or_notify_cancel()
+        future.set_canceller(lambda: self._send(('cancel', job_id)))
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('The executor has been shut down.')
+            self._futures[job_id] = future
+            self._sending += 1
+        sent = self._send(('run', job_id, script_data, args_data))
+        with self._lock:
+            self._sending -= 1
+            self._sent.notify_all()
+            if not sent:
+                self._futures.pop(job_id, None)
+        if not sent:
+            m = 'The zygote process exited.'
+            future.set_exc_info((exceptions.WorkerError,
+                                 exceptions.WorkerError(m), None))
+        return future
+
+    def shutdown(self, wait=True):
+        """ Stop accepting scripts.  The scripts already submitted are still
+            run; if *wait* is True, this waits until they are, and the zygote
+            has exited.
+        """
+        with self._lock:
+            stop = not self._shutdown
+            self._shutdown = True
+            while self._sending:
+                self._sent.wait()
+        if stop:
+            self._send(None)
+        if wait:
+            self._thread.join()
+            self._zygote.join()
+
+    def stats(self):
+        """ Return the counts of runs, crashes and cancelled runs, and the
+            mean and longest times from fork to result of the runs that were
+            not cancelled, in seconds, as a :class:`ForkStats`.
+        """
+        with self._lock:
+            count = self._runs + self._crashes
+            mean = self._latency_total / count if count else 0.0
+            return ForkStats(self._runs, self._crashes, self._cancelled,
+                             mean, self._latency_max)
+
+    def _send(self, message):
+        # Returns False if the zygote has exited.
+        with self._send_lock:
+            try:
+                self._conn.send(message)
+            except EnvironmentError:
+                return False
+        return True
+
+    def _receive(self):
+        # Hands the results relayed by the zygote to their Futures.
+        while True:
+            try:
+                job_id, data, latency = self._conn.recv()
+            except (EOFError, EnvironmentError):
+                break
+            with self._lock:
+                future = self._futures.pop(job_id)
+                if future.cancelled():
+                    self._cancelled += 1
+                else:
+                    if data is None:
+                        self._crashes += 1
+                    else:
+                        self._runs += 1
+                    self._latency_total += latency
+                    self._latency_max = max(self._latency_max, latency)
+            if future.cancelled():
+                continue
+            if data is None:
+                m = 'The process running the script exited without a result.'
+                future.set_exc_info((exceptions.WorkerError,
+                                     exceptions.WorkerError(m), None))
+                continue
+            result, exc = cPickle.loads(data)
+            if exc is None:
+                result.latency = latency
+                future.set_result(result)
+            else:
+                future.set_exc_info((type(exc), exc, None))
+        with self._lock:
+            self._shutdown = True
+            futures, self._futures = self._futures, {}
+        with self._send_lock:
+            self._conn.close()
+        for future in futures.itervalues():
+            m = 'The zygote process exited.'
+            future.set_exc_info((exceptions.WorkerError,
+                                 exceptions.WorkerError(m), None))
+
+#==============================================================================#
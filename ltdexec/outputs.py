@@ -0,0 +1,151 @@
+"""
+ltdexec.outputs
+===============
+
+Output schemas declare the names, and the types, of the values that a script
+produces.  Only those values are taken from a run's namespace, and the values
+of many runs may be stored in compact columns.
+
+"""
+
+import array
+import collections
+
+from . import exceptions
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#==============================================================================#
+#: The array type codes used to store outputs of these types.
+_typecodes = {int: 'l', float: 'd'}
+
+#: The value stored for a run that produced no outputs.
+_fill_values = {int: 0, float: 0.0, bool: False}
+
+class OutputSchema(object):
+    """ Declares the outputs of a script: *fields* is a sequence of
+        ``(name, type)`` pairs, or a mapping of names to types.  A type of None
+        accepts any value.
+
+        A float output also accepts integers, which are converted.  Integer
+        and float outputs are stored in arrays; outputs of other types are
+        stored in lists.
+    """
+    def __init__(self, fields):
+        if isinstance(fields, collections.Mapping):
+            fields = sorted(fields.iteritems())
+        self.fields = tuple((name, typ) for name, typ in fields)
+        self.names = tuple(name for name, typ in self.fields)
+        if len(set(self.names)) != len(self.names):
+            raise ValueError('The output names must be unique.')
+
+    def extract(self, namespace):
+        """ Return a dict of the declared outputs found in *namespace*.  An
+            :class:`~ltdexec.exceptions.OutputError` is raised if one is
+            missing or has the wrong type.
+        """
+        outputs = {}
+        for name, typ in self.fields:
+            try:
+                value = namespace[name]
+            except KeyError:
+                m = 'The output "{0}" was not assigned.'.format(name)
+                raise exceptions.OutputError(m, name)
+            outputs[name] = self.check(name, typ, value)
+        return outputs
+
+    def check(self, name, typ, value):
+        """ Return *value*, converted if needed, if it is valid for the output
+            *name* of type *typ*.
+        """
+        if typ is None or isinstance(value, typ):
+            return value
+        if typ is float and isinstance(value, (int, long)):
+            return float(value)
+        if typ is int and isinstance(value, long):
+            return value
+        m = 'The output "{0}" should be of type {1}, not {2}.'
+        m = m.format(name, typ.__name__, type(value).__name__)
+        raise exceptions.OutputError(m, name)
+
+    def columns(self):
+        """ Create empty :class:`OutputColumns` for this schema. """
+        return OutputColumns(self)
+
+    def __repr__(self):
+        return '<OutputSchema: {0}>'.format(', '.join(self.names))
+
+
+#==============================================================================#
+class OutputColumns(object):
+    """ The outputs of many runs, stored by column.  ``columns[name]`` is the
+        array, or list, holding the output *name* of each run.
+
+        A run that raised an exception, or produced invalid outputs, still
+        takes a row, filled with zeroes (or None, in lists); its exc_info
+        triple is kept in :attr:`errors` under the index of the row.
+    """
+    def __init__(self, schema):
+        self.schema = schema
+        self.errors = {}
+        self._columns = collections.OrderedDict()
+        self._fill = []
+        for name, typ in schema.fields:
+            if typ in _typecodes:
+                self._columns[name] = array.array(_typecodes[typ])
+            else:
+                self._columns[name] = []
+            self._fill.append(_fill_values.get(typ))
+        self._length = 0
+
+    def append(self, outputs):
+        """ Append a row holding the given dict of outputs. """
+        columns = self._columns
+        appended = []
+        try:
+            for name in self.schema.names:
+                columns[name].append(outputs[name])
+                appended.append(name)
+        except:
+            # A value that does not fit its array leaves the row unfinished.
+            for name in appended:
+                columns[name].pop()
+            raise
+        self._length += 1
+
+    def append_error(self, exc_info):
+        """ Append a row for a run that failed with the given exc_info. """
+        self.errors[self._length] = exc_info
+        for column, fill in zip(self._columns.itervalues(), self._fill):
+            column.append(fill)
+        self._length += 1
+
+    def to_numpy(self):
+        """ Return a dict of NumPy arrays holding the columns. """
+        if numpy is None:
+            raise ImportError('NumPy is not installed.')
+        arrays = {}
+        for name, typ in self.schema.fields:
+            column = self._columns[name]
+            if isinstance(column, array.array):
+                arrays[name] = numpy.array(column, dtype=column.typecode)
+            elif typ is bool:
+                arrays[name] = numpy.array(column, dtype=bool)
+            else:
+                arrays[name] = numpy.array(column, dtype=object)
+        return arrays
+
+    def __getitem__(self, name):
+        return self._columns[name]
+
+    def __len__(self):
+        return self._length
+
+    def __repr__(self):
+        return '<OutputColumns: {0}, rows={1}>'.format(
+            ', '.join(self.schema.names), self._length)
+
+#==============================================================================#
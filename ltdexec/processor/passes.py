@@ -0,0 +1,211 @@
+"""
+ltdexec.processor.passes
+========================
+
+Passes package the checks and modifications applied to an abstract syntax
+tree, so that several of them can share a single walk of the tree.
+
+"""
+
+import ast
+
+from .. import exceptions
+
+#==============================================================================#
+_leaf_node_types = (ast.expr_context, ast.boolop, ast.operator, ast.unaryop,
+                    ast.cmpop)
+
+# Fields that never hold nodes.
+_primitive_fields = {
+    'Name': ('id',), 'Attribute': ('attr',), 'Num': ('n',), 'Str': ('s',),
+    'FunctionDef': ('name',), 'ClassDef': ('name',), 'Global': ('names',),
+    'ImportFrom': ('module', 'level'), 'alias': ('name', 'asname'),
+    'keyword': ('arg',), 'arguments': ('vararg', 'kwarg'), 'Print': ('nl',),
+}
+
+def is_leaf_node_type(node_type):
+    """ Return True for contexts and operators, which have no children. """
+    return issubclass(node_type, _leaf_node_types)
+
+def child_fields(node_type, include_leaves=False):
+    """ Return, in reverse order, the fields of the given node type that may
+        hold child nodes.  Fields that can only hold contexts and operators are
+        left out unless *include_leaves* is True.
+    """
+    skip = _primitive_fields.get(node_type.__name__, ())
+    if not include_leaves:
+        skip += ('ctx', 'op', 'ops')
+    return tuple(f for f in reversed(node_type._fields) if f not in skip)
+
+#==============================================================================#
+class TreePass(object):
+    """ A pass that needs the whole tree at once, such as a plain function
+        from tree to tree.  It is never fused with other passes.
+    """
+    fusable = False
+
+    def __init__(self, func, modifies_tree=True):
+        self.func = func
+        self.modifies_tree = modifies_tree
+
+    def run(self, tree):
+        return self.func(tree)
+
+
+class NodePass(object):
+    """ A pass that looks at one node at a time.  A
+        :class:`PassManager` fuses consecutive NodePasses into one walk.
+
+        :meth:`visit` is called for each node, parents before children.  It
+        returns True (or None) to have the node's children visited, False if
+        the pass has no interest in them, or a list of nodes to replace the
+        node with.  Only statements may be replaced.  Replacement nodes are
+        visited by the passes that come after the replacing pass, while the
+        passes before it still see the original node's children.  This is the
+        order in which the passes would see the tree if each walked it in turn.
+    """
+    fusable = True
+
+    #: The node types this pass visits, or None for all of them.
+    node_types = None
+
+    #: True if :meth:`visit` needs to see contexts and operators.
+    visits_leaf_nodes = False
+
+    #: True if :meth:`visit` may return replacement nodes.
+    replaces_nodes = False
+
+    #: True if :meth:`visit` may change nodes in place.  Replacements are
+    #: noticed by the :class:`PassManager` regardless.
+    modifies_tree = True
+
+    def begin(self, tree):
+        """ Called before a walk of *tree* begins. """
+        pass
+
+    def visit(self, node):
+        return True
+
+    def end(self, tree):
+        """ Called after the walk, returning the resulting tree. """
+        return tree
+
+    def run(self, tree):
+        """ Apply this pass on its own. """
+        return PassManager([self])(tree)
+
+#==============================================================================#
+class PassManager(object):
+    """ Apply a sequence of passes to a tree.  Runs of consecutive fusable
+        passes are applied together, in a single walk of the tree.
+
+        After the passes are applied, :attr:`modified` is False only if none
+        of them could have changed the tree.
+    """
+    def __init__(self, passes):
+        self.passes = list(passes)
+        self.modified = False
+
+    def groups(self):
+        """ Split the passes into lists that are each applied in one walk. """
+        groups = []
+        for p in self.passes:
+            if p.fusable and groups and groups[-1][-1].fusable:
+                groups[-1].append(p)
+            else:
+                groups.append([p])
+        return groups
+
+    def __call__(self, tree):
+        for group in self.groups():
+            if any(p.modifies_tree for p in group):
+                self.modified = True
+            if group[0].fusable:
+                tree = self.walk(tree, group)
+            else:
+                tree = group[0].run(tree)
+        return tree
+
+    def walk(self, tree, group):
+        """ Apply a group of fusable passes in one walk of the tree. """
+        group = tuple(group)
+        for p in group:
+            p.begin(tree)
+        include_leaves = any(p.visits_leaf_nodes for p in group)
+        replacing = any(p.replaces_nodes for p in group)
+        fields_cache = {}
+        visitors_cache = {}
+        AST = ast.AST
+        stmt = ast.stmt
+
+        # Each entry is (node, active passes, list to append the node to).
+        stack = [(tree, group, None)]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            node, active, container = pop()
+            cls = node.__class__
+            try:
+                visitors = visitors_cache[cls]
+            except KeyError:
+                visitors = visitors_cache.setdefault(cls, tuple(
+                    p for p in group
+                    if p.node_types is None or issubclass(cls, p.node_types)))
+
+            descend = active
+            replacement = None
+            for p in visitors:
+                if active is not group and p not in active:
+                    continue
+                result = p.visit(node)
+                if result is True or result is None:
+                    continue
+                elif result is False:
+                    descend = tuple(q for q in descend if q is not p)
+                else:
+                    if container is None:
+                        m = 'Only statements may be replaced.'
+                        raise exceptions.InternalError(m)
+                    i = active.index(p)
+                    replacement = (result, active[i+1:])
+                    self.modified = True
+                    descend = tuple(q for q in descend if q in active[:i])
+                    break
+
+            if replacement is None:
+                if container is not None:
+                    container.append(node)
+            else:
+                nodes, later = replacement
+                for new in reversed(nodes):
+                    push((new, later, container))
+
+            if not descend:
+                continue
+            try:
+                fields = fields_cache[cls]
+            except KeyError:
+                fields = fields_cache.setdefault(
+                    cls, child_fields(cls, include_leaves))
+            for field in fields:
+                value = getattr(node, field, None)
+                if value.__class__ is list:
+                    if replacing and value and isinstance(value[0], stmt):
+                        # Statement lists are rebuilt as their items are
+                        # visited, so that items may be replaced.
+                        new_list = []
+                        setattr(node, field, new_list)
+                        for child in reversed(value):
+                            push((child, descend, new_list))
+                    else:
+                        for child in reversed(value):
+                            if isinstance(child, AST):
+                                push((child, descend, None))
+                elif isinstance(value, AST):
+                    push((value, descend, None))
+
+        for p in group:
+            tree = p.end(tree)
+        return tree
+
+#==============================================================================#
@@ -5,12 +5,17 @@ ltdexec.processor.processor
 Processors that handle a script before it is compiled.
 
 """
+from . import passes, transform, validator
+from .transform import _overrides
+
 class Processor(object):
     """ Perform modifications and checks of a script before it is compiled.
 
         A Processor has the opportunity to modify and validate the raw source
         code and the compiled abstract syntax tree.
     """
+    PassManager = passes.PassManager
+
     def __init__(self, dialect):
         self.dialect = dialect
         self.SourceValidator = dialect.SourceValidator
@@ -26,13 +31,28 @@ class Processor(object):
         source = transform.postcheck_transform(source)
         return source
 
-    def process_ast(self, ast_tree):
+    def ast_passes(self):
+        """ Return the passes applied to the abstract syntax tree: the
+            precheck transform, the validation and the postcheck transform.
+            Passes that can share a walk of the tree are applied together.
+        """
         validator = self.AstValidator(self.dialect)
         transform = self.AstTransform(self.dialect)
-        ast_tree = transform.precheck_transform(ast_tree)
-        validator(ast_tree)
-        ast_tree = transform.postcheck_transform(ast_tree)
-        return ast_tree
+        return (transform.precheck_passes() + [validator.as_pass()] +
+                transform.postcheck_passes())
+
+    def process_ast(self, ast_tree):
+        return self.PassManager(self.ast_passes())(ast_tree)
+
+    def process_ast_modified(self, ast_tree):
+        """ Process the tree as :meth:`process_ast` does, returning the tree
+            and whether processing may have modified it.
+        """
+        if _overrides(self, Processor, 'process_ast'):
+            return self.process_ast(ast_tree), True
+        manager = self.PassManager(self.ast_passes())
+        ast_tree = manager(ast_tree)
+        return ast_tree, manager.modified
 
 
 class SplitSourceProcessor(Processor):
@@ -59,6 +79,15 @@ class SplitSourceProcessor(Processor):
     def merge_asts(self, trees):
         return self.AstMerger()(trees)
 
+    def processes_merged_ast(self):
+        """ Return False if :meth:`process_merged_ast` neither checks nor
+            changes the tree, so that it may be skipped.
+        """
+        return not (self.MergedAstValidator is validator.MergedAstValidator
+                    and self.MergedAstTransform is transform.MergedAstTransform
+                    and not _overrides(self, SplitSourceProcessor,
+                                       'process_merged_ast'))
+
     def process_merged_ast(self, ast_tree):
         validator = self.MergedAstValidator(self.dialect)
         transform = self.MergedAstTransform(self.dialect)
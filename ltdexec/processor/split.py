@@ -0,0 +1,151 @@
+"""
+ltdexec.processor.split
+=======================
+
+Splitters break a script into its top-level statements so that each may be
+processed on its own, and mergers reassemble the processed pieces into one
+abstract syntax tree.
+
+"""
+
+import __builtin__
+import ast
+import collections
+import re
+
+#==============================================================================#
+#: A piece of a script: *text* begins on line *lineno* of the whole script.
+SourceChunk = collections.namedtuple('SourceChunk', 'lineno text')
+
+_coding_re = re.compile(r'^[ \t\f]*#.*coding[:=]')
+
+def shift_syntax_error(e, delta):
+    """ Move the line number of the SyntaxError *e* down by *delta* lines.
+        The builtin constructor is used so that the exception's arguments, and
+        not only its attributes, reflect the change.
+    """
+    if not delta or e.lineno is None:
+        return
+    __builtin__.SyntaxError.__init__(
+        e, e.msg, (e.filename, e.lineno + delta, e.offset, e.text))
+
+#==============================================================================#
+# Matches the parts of a source within which no statement can begin: string
+# literals (whose prefixes do not matter), brackets and backslash
+# continuations.  Comments are matched so that quotes within them are skipped.
+# A lone quote is an unterminated string.  The lookahead lets the search skip
+# other characters quickly.
+_scan_re = re.compile(r"""
+    (?=['"()\[\]{}\\\#])
+    (?:
+      (?P<string>(?:'''(?:[^'\\]|\\.|'(?!''))*'''
+                   |\"\"\"(?:[^"\\]|\\.|"(?!\"\"))*\"\"\"
+                   |'(?:[^'\\\n]|\\.)*'
+                   |"(?:[^"\\\n]|\\.)*"))
+    | (?P<open>[(\[{])
+    | (?P<close>[)\]}])
+    | (?P<continuation>\\\r?\n)
+    | (?P<bad>['"])
+    | \#[^\r\n]*
+    )""", re.S | re.X)
+
+_line_start_re = re.compile(r'^[^\s#]', re.M)
+_continuation_re = re.compile(r'(?:else|elif|except|finally)\b')
+
+class SourceSplitter(object):
+    """ Split source text into chunks of consecutive top-level statements.
+
+        Compound statements stay whole: a chunk is never started at an
+        ``else``, ``elif``, ``except`` or ``finally`` clause, nor after a
+        decorator.  Comments and blank lines belong to the chunk before them.
+        Sources that use ``__future__`` imports or declare an encoding, which
+        affect the compilation of the whole script, are not split; neither are
+        sources with unbalanced brackets or unterminated strings, so that the
+        parser reports their errors.
+
+        The source is scanned with regular expressions rather than the
+        tokenize module, which would take about as long as processing the
+        chunks that the split saves.
+    """
+    def __call__(self, source):
+        if not self.splittable(source):
+            return [SourceChunk(1, source)]
+        starts = self.statement_starts(source)
+        if not starts:
+            return [SourceChunk(1, source)]
+        starts[0] = 0
+        chunks = []
+        lineno = 1
+        previous = 0
+        for start, end in zip(starts, starts[1:] + [len(source)]):
+            lineno += source.count('\n', previous, start)
+            previous = start
+            chunks.append(SourceChunk(lineno, source[start:end]))
+        return chunks
+
+    def splittable(self, source):
+        if '__future__' in source:
+            return False
+        # Lines ending in a lone carriage return are not split.
+        if source.count('\r') != source.count('\r\n'):
+            return False
+        head = source.split('\n', 2)[:2]
+        return not any(_coding_re.match(line) for line in head)
+
+    def statement_starts(self, source):
+        """ Return the offsets at which chunks begin, or None if the source
+            cannot be split.
+        """
+        # Spans of the source within which no statement can begin.
+        spans = []
+        depth = 0
+        opened = 0
+        for m in _scan_re.finditer(source):
+            kind = m.lastgroup
+            if kind == 'string':
+                if depth == 0:
+                    spans.append((m.start(), m.end()))
+            elif kind == 'open':
+                if depth == 0:
+                    opened = m.start()
+                depth += 1
+            elif kind == 'close':
+                depth -= 1
+                if depth < 0:
+                    return None
+                if depth == 0:
+                    spans.append((opened, m.end()))
+            elif kind == 'continuation':
+                if depth == 0:
+                    spans.append((m.start(), m.end() + 1))
+            elif kind == 'bad':
+                return None
+        if depth != 0:
+            return None
+
+        starts = []
+        decorated = False   # the previous statement was a decorator
+        i, n = 0, len(spans)
+        for m in _line_start_re.finditer(source):
+            pos = m.start()
+            while i < n and spans[i][1] <= pos:
+                i += 1
+            if i < n and spans[i][0] < pos:
+                continue
+            if not decorated and not _continuation_re.match(source, pos):
+                starts.append(pos)
+            decorated = source[pos] == '@'
+        return starts
+
+
+#==============================================================================#
+class AstMerger(object):
+    """ Merge the module trees of consecutive chunks into one module. """
+    def __call__(self, trees):
+        body = []
+        for tree in trees:
+            body.extend(tree.body)
+        return ast.Module(body=body)
+
+
+#==============================================================================#
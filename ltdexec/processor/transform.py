@@ -9,7 +9,13 @@ it has been compiled.
 
 import ast
 
+from . import passes
+
 #==============================================================================#
+def _overrides(obj, base, attrname):
+    return getattr(type(obj), attrname).im_func is not \
+           getattr(base, attrname).im_func
+
 class TransformBase(object):
     def __init__(self, dialect):
         self.dialect = dialect
@@ -20,6 +26,18 @@ class TransformBase(object):
     def postcheck_transform(self, data):
         return data
 
+    def precheck_passes(self):
+        """ Return the passes that perform the precheck transform. """
+        if _overrides(self, TransformBase, 'precheck_transform'):
+            return [passes.TreePass(self.precheck_transform)]
+        return []
+
+    def postcheck_passes(self):
+        """ Return the passes that perform the postcheck transform. """
+        if _overrides(self, TransformBase, 'postcheck_transform'):
+            return [passes.TreePass(self.postcheck_transform)]
+        return []
+
 #==============================================================================#
 class SourceTransform(TransformBase):
     pass
@@ -29,67 +47,127 @@ class AstTransform(TransformBase):
     def postcheck_transform(self, tree):
         return TransformImportsAst().visit(tree)
 
+    def postcheck_passes(self):
+        if _overrides(self, AstTransform, 'postcheck_transform'):
+            return [passes.TreePass(self.postcheck_transform)]
+        return [TransformImportsPass()]
+
 class MergedAstTransform(TransformBase):
     pass
 
 #==============================================================================#
+def import_calls(node):
+    """Return the statements that replace the given Import node.  The new
+       nodes are given the location of the Import node.
+    """
+    loc = {'lineno': node.lineno, 'col_offset': node.col_offset}
+    exprs = []
+    for alias in node.names:
+        modname = alias.name
+        asname = alias.asname
+        func = ast.Name(id='_LX_import_module', ctx=ast.Load(), **loc)
+        args = [ast.Str(s=modname, **loc)]
+        if asname:
+            keywords = [ast.keyword(arg='asname',
+                                    value=ast.Str(s=asname, **loc))]
+        else:
+            keywords = []
+        call = ast.Call(func=func, args=args, keywords=keywords, starargs=None,
+                        kwargs=None, **loc)
+        exprs.append(ast.Expr(value=call, **loc))
+    return exprs
+
+def import_from_calls(node):
+    """Return the statements that replace the given ImportFrom node.  The new
+       nodes are given the location of the ImportFrom node.
+    """
+    assert node.level == 0
+    loc = {'lineno': node.lineno, 'col_offset': node.col_offset}
+    modname = node.module
+    froms = []
+    for alias in node.names:
+        name = ast.Str(s=alias.name, **loc)
+        if alias.asname:
+            asname = ast.Str(s=alias.asname, **loc)
+        else:
+            asname = ast.Name(id='None', ctx=ast.Load(), **loc)
+        pair = ast.Tuple(elts=[name,asname], ctx=ast.Load(), **loc)
+        froms.append(pair)
+    froms = ast.List(elts=froms, ctx=ast.Load(), **loc)
+    func = ast.Name(id='_LX_import_module', ctx=ast.Load(), **loc)
+    args = [ast.Str(s=modname, **loc)]
+    keywords = [ast.keyword(arg='froms', value=froms)]
+    call = ast.Call(func=func, args=args, keywords=keywords, starargs=None,
+                    kwargs=None, **loc)
+    return [ast.Expr(value=call, **loc)]
+
+
 class TransformImportsAst(ast.NodeTransformer):
     """Transform an AST containing Import or ImportFrom nodes to use the
        LimitedExec custom import function(s) instead.  The import functions are
        provided by the Environment class.
     """
     def visit_Import(self, node):
-        exprs = []
-        for alias in node.names:
-            modname = alias.name
-            asname = alias.asname
-            func = ast.Name(id='_LX_import_module', ctx=ast.Load())
-            args = [ast.Str(s=modname)]
-            if asname:
-                keywords = [ast.keyword(arg='asname', value=ast.Str(s=asname))]
-            else:
-                keywords = []
-            call = ast.Call(func=func, args=args, keywords=keywords, starargs=None, kwargs=None)
-            expr = ast.Expr(value=call)
-            expr = ast.copy_location(expr, node)
-            ast.fix_missing_locations(expr)
-            exprs.append(expr)
-        return exprs
+        return import_calls(node)
 
     def visit_ImportFrom(self, node):
-        assert node.level == 0
-        none = ast.Name(id='None', ctx=ast.Load())
-        modname = node.module
-        froms = []
-        for alias in node.names:
-            name = ast.Str(s=alias.name)
-            asname = ast.Str(s=alias.asname) if alias.asname else none
-            pair = ast.Tuple(elts=[name,asname], ctx=ast.Load())
-            froms.append(pair)
-        froms = ast.List(elts=froms, ctx=ast.Load())
-        func = ast.Name(id='_LX_import_module', ctx=ast.Load())
-        args = [ast.Str(s=modname)]
-        keywords = [ast.keyword(arg='froms', value=froms)]
-        call = ast.Call(func=func, args=args, keywords=keywords, starargs=None, kwargs=None)
-        expr = ast.Expr(value=call)
-        expr = ast.copy_location(expr, node)
-        ast.fix_missing_locations(expr)
-        return [expr]
-
-
-#==============================================================================#
-
-
-
-
-
-
-
-
+        return import_from_calls(node)
 
 
+class TransformImportsPass(passes.NodePass):
+    """The transform of :class:`TransformImportsAst`, as a fusable pass."""
+    node_types = (ast.Import, ast.ImportFrom)
+    replaces_nodes = True
+    modifies_tree = False
 
+    def visit(self, node):
+        if isinstance(node, ast.Import):
+            return import_calls(node)
+        else:
+            return import_from_calls(node)
 
 
+#==============================================================================#
+def wrap_in_row_loop(tree):
+    """Return a module that runs the body of the module *tree* once for each
+       row of a batch, for :meth:`~ltdexec.script.Script.run_batch`.  The
+       loop calls functions provided in the script's globals:
+
+       ``_LX_batch_begin(row)`` before each row, ``_LX_batch_done()`` after a
+       row completes, and ``_LX_batch_failed()`` from within the handler of
+       an exception that a row raised.  The rows are taken from
+       ``_LX_batch_rows``.
+
+       The statements of the body keep their line numbers, and the loop is
+       given that of the first statement.  ``__future__`` imports remain at
+       the start of the module.
+    """
+    body = list(tree.body)
+    future = []
+    while (body and isinstance(body[0], ast.ImportFrom) and
+           body[0].module == '__future__'):
+        future.append(body.pop(0))
+    first = body[0] if body else None
+    loc = {'lineno': getattr(first, 'lineno', 1),
+           'col_offset': getattr(first, 'col_offset', 0)}
+
+    def call(name, *args):
+        func = ast.Name(id=name, ctx=ast.Load(), **loc)
+        return ast.Expr(value=ast.Call(func=func, args=list(args), keywords=[],
+                                       starargs=None, kwargs=None, **loc),
+                        **loc)
+
+    row = ast.Name(id='_LX_batch_row', ctx=ast.Load(), **loc)
+    handler = ast.ExceptHandler(type=None, name=None,
+                                body=[call('_LX_batch_failed')], **loc)
+    attempt = ast.TryExcept(body=body or [ast.Pass(**loc)],
+                            handlers=[handler],
+                            orelse=[call('_LX_batch_done')], **loc)
+    loop = ast.For(target=ast.Name(id='_LX_batch_row', ctx=ast.Store(), **loc),
+                   iter=ast.Name(id='_LX_batch_rows', ctx=ast.Load(), **loc),
+                   body=[call('_LX_batch_begin', row), attempt],
+                   orelse=[], **loc)
+    return ast.Module(body=future + [loop])
 
 
+#==============================================================================#
@@ -9,10 +9,15 @@ errors through exceptions, which may be used to provide an error message.
 """
 
 import ast
+import keyword
 import re
+import tokenize
+import weakref
+from StringIO import StringIO
 
 from .. import config
 from .. import exceptions
+from . import passes
 
 #==============================================================================#
 def syntax_error(node, msg, reason=None):
@@ -27,6 +32,12 @@ def syntax_error(node, msg, reason=None):
     text = config.misc.DEFAULT_SCRIPT_TEXT_LINE
     raise exceptions.SyntaxError(msg, filename, lineno, offset, text, reason)
 
+_store_contexts = (ast.Store, ast.AugStore, ast.Del)
+
+def is_store(ctx):
+    """Return True if the given expression context assigns or deletes."""
+    return isinstance(ctx, _store_contexts)
+
 #==============================================================================#
 class SourceValidator(object):
     """ A SourceValidator verifies the correctness of raw source code. """
@@ -41,6 +52,125 @@ class SourceValidator(object):
         """
         pass
 
+#==============================================================================#
+class PrefilterSourceValidator(SourceValidator):
+    """ A SourceValidator that rejects scripts using forbidden names or
+        attributes, or names and attributes with the private prefix, before
+        they are parsed.
+
+        The source is first searched for any of these identifiers with a
+        single regular expression; sources without a match are accepted
+        immediately.  Otherwise the source is tokenized, and only identifiers
+        that are certain to be names or attributes in the abstract syntax tree
+        are checked.  Anything doubtful is left to the AstValidator, which
+        reports errors with the same reasons.
+    """
+    #: Reasons which may be reported by the prefilter.
+    name_reasons = frozenset(['private_prefix_name', 'forbidden_name'])
+    attribute_reasons = frozenset(['private_prefix_attr', 'forbidden_attr'])
+
+    _patterns = {}
+
+    def __call__(self, source):
+        if not self.pattern().search(source):
+            return
+        validator = self.dialect.AstValidator(self.dialect)
+        tokens = tokenize.generate_tokens(StringIO(source).readline)
+        try:
+            self.scan(tokens, validator)
+        except (tokenize.TokenError, IndentationError):
+            # The parser will report a better error.
+            pass
+
+    def pattern(self):
+        """ Return a regular expression matching every identifier that may
+            be rejected.
+        """
+        key = getattr(self.dialect, 'fingerprint', id(self.dialect))
+        try:
+            return self._patterns[key]
+        except KeyError:
+            pass
+        words = (set(self.dialect.forbidden_names_set) |
+                 set(self.dialect.forbidden_attrs_set))
+        alternatives = [re.escape(w) for w in sorted(words)]
+        alternatives.append(re.escape(config.names.LTDEXEC_PRIVATE_PREFIX) +
+                            r'\w*')
+        pattern = re.compile(r'(?<![\w])(?:{0})(?![\w])'.format(
+                             '|'.join(alternatives)))
+        return self._patterns.setdefault(key, pattern)
+
+    def scan(self, tokens, validator):
+        """ Check the identifiers among the given tokens. """
+        NAME, OP = tokenize.NAME, tokenize.OP
+        skipped = (tokenize.NL, tokenize.COMMENT)
+        earlier = None      # the significant token before the previous one
+        previous = None     # the previous significant token
+        current = None      # the token being looked at
+        depth = 0           # bracket nesting depth
+        skipping = False    # within an import or global statement
+        params = []         # (depth, closing token) of open parameter lists
+        for token in tokens:
+            if token[0] in skipped:
+                continue
+            if current is not None and current[0] == NAME:
+                # In Python 2, the names of *args and **kwargs parameters
+                # are not Name nodes.
+                if not (params and params[-1][0] == depth and
+                        previous and previous[1] in ('*', '**') and
+                        earlier[1] in ('(', ',', 'lambda')):
+                    self.check_token(previous, current, token, depth,
+                                     skipping, validator)
+            earlier, previous, current = previous, current, token
+            typ, string = token[0], token[1]
+            if typ == OP:
+                if string in ('(', '[', '{'):
+                    depth += 1
+                    if string == '(' and earlier and earlier[1] == 'def':
+                        params.append((depth, ')'))
+                elif string in (')', ']', '}'):
+                    depth -= 1
+                    while params and params[-1][0] > depth:
+                        params.pop()
+                elif string == ':' and params and params[-1] == (depth, ':'):
+                    params.pop()
+                elif string == ';':
+                    skipping = False
+            elif typ == tokenize.NEWLINE:
+                skipping = False
+                del params[:]
+            elif typ == NAME and string in ('import', 'from', 'global'):
+                skipping = True
+            elif typ == NAME and string == 'lambda':
+                params.append((depth, ':'))
+
+    def check_token(self, previous, token, following, depth, skipping,
+                    validator):
+        """ Check one NAME token, given its neighbouring tokens. """
+        string = token[1]
+        if skipping or keyword.iskeyword(string):
+            return
+        prev = previous[1] if previous else None
+        if prev in ('def', 'class'):
+            return
+        if prev == '.':
+            error = validator.attribute_error(string, False)
+            reasons = self.attribute_reasons
+        elif depth > 0 and following[1] == '=':
+            # A keyword argument, which is not a name.
+            return
+        else:
+            error = validator.name_error(string, False)
+            reasons = self.name_reasons
+        if error and error[1] in reasons:
+            lineno, col = token[2]
+            msg, reason = error
+            raise exceptions.SyntaxError(msg,
+                                         config.misc.DEFAULT_SCRIPT_FILE_NAME,
+                                         lineno, col + 1,
+                                         config.misc.DEFAULT_SCRIPT_TEXT_LINE,
+                                         reason)
+
 #==============================================================================#
 class MinimalAstValidator(ast.NodeVisitor):
     """ The MinimalSourceValidator must be the base class of all abstract
@@ -51,6 +181,29 @@ class MinimalAstValidator(ast.NodeVisitor):
         super(MinimalAstValidator, self).__init__()
         self.dialect = dialect
 
+    def name_error(self, name, store):
+        """ Return a ``(message, reason)`` pair describing why the given name
+            may not be used, or None if it may be used.  *store* is True if
+            the name is the target of an assignment or deletion.
+        """
+        if name.startswith(config.names.LTDEXEC_PRIVATE_PREFIX):
+            m = 'Names may not begin with "{0}". '
+            m += 'This is reserved for library-internal use.'
+            m = m.format(config.names.LTDEXEC_PRIVATE_PREFIX)
+            return m, 'private_prefix_name'
+        return None
+
+    def attribute_error(self, attr, store):
+        """ Return a ``(message, reason)`` pair describing why the given
+            attribute may not be used, or None if it may be used.
+        """
+        if attr.startswith(config.names.LTDEXEC_PRIVATE_PREFIX):
+            m = 'Attributes may not begin with "{0}". '
+            m += 'This is reserved for library-internal use.'
+            m = m.format(config.names.LTDEXEC_PRIVATE_PREFIX)
+            return m, 'private_prefix_attr'
+        return None
+
     def check_name(self, node):
         """ Verifies that a name node does not use a name reserved for use by
             LimitedExec.  Such names begin with ``_LX_``.
@@ -58,11 +211,9 @@ class MinimalAstValidator(ast.NodeVisitor):
             All abstract syntax tree validators **must** call this method,
             directly or indirectly.
         """
-        if node.id.startswith(config.names.LTDEXEC_PRIVATE_PREFIX):
-            m = 'Names may not begin with "{0}". '
-            m += 'This is reserved for library-internal use.'
-            m = m.format(config.names.LTDEXEC_PRIVATE_PREFIX)
-            syntax_error(node, m, reason='private_prefix_name')
+        error = self.name_error(node.id, is_store(node.ctx))
+        if error:
+            syntax_error(node, *error)
 
     def check_attribute(self, node):
         """ Verifies that a name node does not use a name reserved for use by
@@ -71,11 +222,9 @@ class MinimalAstValidator(ast.NodeVisitor):
             All abstract syntax tree validators **must** call this method,
             directly or indirectly.
         """
-        if node.attr.startswith(config.names.LTDEXEC_PRIVATE_PREFIX):
-            m = 'Attributes may not begin with "{0}". '
-            m += 'This is reserved for library-internal use.'
-            m = m.format(config.names.LTDEXEC_PRIVATE_PREFIX)
-            syntax_error(node, m, reason='private_prefix_attr')
+        error = self.attribute_error(node.attr, is_store(node.ctx))
+        if error:
+            syntax_error(node, *error)
 
     def visit_Name(self, node):
         self.check_name(node)
@@ -89,6 +238,16 @@ class MinimalAstValidator(ast.NodeVisitor):
         """ Perform the validation. """
         self.visit(tree)
 
+    def as_pass(self):
+        """ Return a :mod:`~ltdexec.processor.passes` pass that performs the
+            validation.
+        """
+        return passes.TreePass(self._validate, modifies_tree=False)
+
+    def _validate(self, tree):
+        self(tree)
+        return tree
+
 #==============================================================================#
 class AstValidator(MinimalAstValidator):
     """ Base class of the default abstract syntax tree validator class created
@@ -145,47 +304,56 @@ class AstValidator(MinimalAstValidator):
             m = 'Cannot import as "{0}", it is a forbidden name.'.format(asname)
             syntax_error(node, m, reason='import_forbidden_name')
 
-    def check_name(self, node):
-        super(AstValidator, self).check_name(node)
-        ctx = node.ctx
-        name = node.id
+    def name_error(self, name, store):
+        error = super(AstValidator, self).name_error(name, store)
+        if error:
+            return error
+
         if name in self.dialect.forbidden_names_set:
             m = 'Use of the name "{0}" is forbidden.'.format(name)
-            syntax_error(node, m, reason='forbidden_name')
+            return m, 'forbidden_name'
 
-        elif (ctx == ast.Store or ctx == ast.AugStore or ctx == ast.Del) and \
-              name in self.dialect.unassignable_names_set:
+        elif store and name in self.dialect.unassignable_names_set:
             m = 'The name "{0}" may not be assigned to.'.format(name)
-            syntax_error(node, m, reason='unassignable_name')
+            return m, 'unassignable_name'
 
         if self.dialect.no_double_underscore_names and len(name)>1:
             if name[:2]=='__' and name[-2:]=='__':
                 m = 'Use of the name "{0}" is forbidden--'
                 m += 'it starts and ends with double underscores.'
                 m = m.format(name)
-                syntax_error(node, m, reason='double_underscore_name')
+                return m, 'double_underscore_name'
+        return None
 
+    def attribute_error(self, attr, store):
+        error = super(AstValidator, self).attribute_error(attr, store)
+        if error:
+            return error
 
-    def check_attribute(self, node):
-        super(AstValidator, self).check_attribute(node)
-        ctx = node.ctx
-        attr = node.attr
         if attr in self.dialect.forbidden_attrs_set:
             m = 'Use of the attribute "{0}" is forbidden.'.format(attr)
-            syntax_error(node, m, reason='forbidden_attr')
+            return m, 'forbidden_attr'
 
-        elif (ctx == ast.Store or ctx == ast.AugStore or ctx == ast.Del) and \
-              attr in self.dialect.unassignable_attrs_set:
+        elif store and attr in self.dialect.unassignable_attrs_set:
             m = 'The attribute "{0}" may not be assigned to.'.format(attr)
-            syntax_error(node, m, reason='unassignable_attr')
+            return m, 'unassignable_attr'
 
         if self.dialect.no_double_underscore_attrs and len(attr)>1:
             if attr[:2]=='__' and attr[-2:]=='__':
                 m = 'Use of the attribute "{0}" is forbidden--'
                 m += 'it starts and ends with double underscores.'
                 m = m.format(attr)
-                syntax_error(node, m, reason='double_underscore_attr')
+                return m, 'double_underscore_attr'
+        return None
+
+    def check_attribute(self, node):
+        super(AstValidator, self).check_attribute(node)
+        self.check_attribute_value(node)
 
+    def check_attribute_value(self, node):
+        """ Verifies that the object whose attribute is accessed is not a
+            builtin.
+        """
         if isinstance(node.value, ast.Name) and \
            node.value.id in config.names.BUILTIN_NAMES_SET:
             m = 'Attributes of builtins may not be accessed.'
@@ -215,13 +383,238 @@ class AstValidator(MinimalAstValidator):
         self.generic_visit(node)
 
 
+#==============================================================================#
+class TableAstValidator(AstValidator):
+    """ An AstValidator that checks a tree in a single iterative walk.
+
+        Instead of dispatching every node through ``visit_<classname>`` and
+        recursing through ``generic_visit``, it looks the node type up in a
+        table, built once per validator class, that holds only the checks
+        needed for that type.  Node types without checks are simply walked.
+        The verdict for each name and attribute is computed once per dialect
+        and then found with a single dictionary lookup.
+
+        Subclasses may still define or override ``visit_*`` and ``check_*``
+        methods; such methods are called as they would be by
+        :class:`ast.NodeVisitor`, and are responsible for visiting the
+        children of the nodes they handle.
+    """
+    #: Verdict caches are cleared when they grow beyond this many entries.
+    max_cached_verdicts = 10000
+
+    _dispatch_tables = weakref.WeakKeyDictionary()
+    _verdict_caches = weakref.WeakKeyDictionary()
+
+    def __call__(self, tree):
+        """ Perform the validation. """
+        self.walk(tree)
+
+    def as_pass(self):
+        """ Return a pass that performs the validation, and which may share
+            its walk of the tree with other passes.
+        """
+        return ValidatorPass(self)
+
+    def walk(self, tree):
+        """ Check *tree* and all of its descendants, in the same order that
+            :meth:`ast.NodeVisitor.visit` would visit them.
+        """
+        table, child_fields, include_leaves = self.dispatch_table()
+        self._names, self._attrs = self.verdict_caches()
+        AST = ast.AST
+        stack = [tree]
+        pop = stack.pop
+        push = stack.append
+        get_handler = table.get
+        while stack:
+            node = pop()
+            cls = node.__class__
+            handler = get_handler(cls)
+            if handler is not None and not handler(self, node):
+                continue
+            try:
+                fields = child_fields[cls]
+            except KeyError:
+                fields = child_fields.setdefault(
+                    cls, passes.child_fields(cls, include_leaves))
+            # Fields are in reverse order, so that the children are popped in
+            # their natural order.
+            for field in fields:
+                value = getattr(node, field, None)
+                if value.__class__ is list:
+                    for child in reversed(value):
+                        if isinstance(child, AST):
+                            push(child)
+                elif isinstance(value, AST):
+                    push(value)
+
+    @classmethod
+    def dispatch_table(cls):
+        """ Return the ``(table, child_fields, include_leaves)`` triple for
+            this class.  The table maps node types to handlers, each of which
+            checks a node and returns True if the node's children still need
+            to be walked.  *child_fields* caches the fields to walk for each
+            node type, and *include_leaves* is True if contexts and operators
+            must be walked too.
+        """
+        try:
+            return cls._dispatch_tables[cls]
+        except KeyError:
+            pass
+        table = {}
+        for attrname in dir(cls):
+            if not attrname.startswith('visit_'):
+                continue
+            node_type = getattr(ast, attrname[len('visit_'):], None)
+            if not (isinstance(node_type, type) and
+                    issubclass(node_type, ast.AST)):
+                continue
+            table[node_type] = _make_handler(cls, attrname)
+        include_leaves = any(passes.is_leaf_node_type(t) for t in table)
+        return cls._dispatch_tables.setdefault(cls,
+                                               (table, {}, include_leaves))
+
+    def verdict_caches(self):
+        """ Return the name and attribute verdict caches shared by all
+            validators of this class and dialect.
+        """
+        cls = self.__class__
+        caches = cls._verdict_caches.setdefault(cls, {})
+        key = getattr(self.dialect, 'fingerprint', id(self.dialect))
+        try:
+            names, attrs = caches[key]
+        except KeyError:
+            names, attrs = caches.setdefault(key, ({}, {}))
+        limit = self.max_cached_verdicts
+        if len(names) > limit:
+            names.clear()
+        if len(attrs) > limit:
+            attrs.clear()
+        return names, attrs
+
+    def _verdict(self, cache, error_func, identifier):
+        # A verdict is a pair of errors: for loading, and for storing.
+        verdict = (error_func(identifier, False), error_func(identifier, True))
+        cache[identifier] = verdict
+        return verdict
+
+    def _handle_name(self, node):
+        verdict = self._names.get(node.id)
+        if verdict is None:
+            verdict = self._verdict(self._names, self.name_error, node.id)
+        error = verdict[isinstance(node.ctx, _store_contexts)]
+        if error:
+            syntax_error(node, *error)
+        return True
+
+    def _handle_attribute(self, node):
+        verdict = self._attrs.get(node.attr)
+        if verdict is None:
+            verdict = self._verdict(self._attrs, self.attribute_error,
+                                    node.attr)
+        error = verdict[isinstance(node.ctx, _store_contexts)]
+        if error:
+            syntax_error(node, *error)
+        self.check_attribute_value(node)
+        return True
+
+    def _handle_import(self, node):
+        for alias in node.names:
+            self.check_import(node, alias.name, alias.asname)
+        return True
+
+    def _handle_import_from(self, node):
+        for alias in node.names:
+            self.check_import_from(node, node.module, alias.name, alias.asname,
+                                   node.level)
+        return True
+
+
+class ValidatorPass(passes.NodePass):
+    """ Performs the validation of a :class:`TableAstValidator` as a fusable
+        pass.
+    """
+    modifies_tree = False
+
+    def __init__(self, validator):
+        self.validator = validator
+        self.table, fields, self.visits_leaf_nodes = validator.dispatch_table()
+        self.node_types = tuple(self.table)
+
+    def begin(self, tree):
+        validator = self.validator
+        validator._names, validator._attrs = validator.verdict_caches()
+
+    def visit(self, node):
+        handler = self.table.get(node.__class__)
+        if handler is None:
+            return True
+        return handler(self.validator, node)
+
+    def run(self, tree):
+        self.validator(tree)
+        return tree
+
+
+_builtin_handlers = {
+    # visit method: (methods that must not be overridden, fast handler)
+    'visit_Name': (('check_name',), TableAstValidator._handle_name),
+    'visit_Attribute': (('check_attribute',),
+                        TableAstValidator._handle_attribute),
+    'visit_Import': (('check_import',), TableAstValidator._handle_import),
+    'visit_ImportFrom': (('check_import_from',),
+                         TableAstValidator._handle_import_from),
+}
+
+def _same_function(cls, base, attrname):
+    return getattr(cls, attrname).im_func is getattr(base, attrname).im_func
+
+def _make_handler(cls, attrname):
+    """ Choose the handler used by a TableAstValidator subclass for the node
+        type handled by its method named *attrname*.
+    """
+    func = getattr(cls, attrname).im_func
+    forbidden = getattr(func, 'forbidden_node', None)
+    if forbidden is not None:
+        message, reason = forbidden
+        def handler(self, node):
+            syntax_error(node, message, reason=reason)
+        return handler
+
+    if attrname in _builtin_handlers:
+        checks, fast_handler = _builtin_handlers[attrname]
+        if all(_same_function(cls, AstValidator, name)
+               for name in (attrname,) + checks):
+            return fast_handler.im_func
+
+    # An unknown visitor method: call it, and let it visit the children.
+    def handler(self, node):
+        getattr(self, attrname)(node)
+        return False
+    return handler
+
+#==============================================================================#
+class MergedAstValidator(object):
+    """ A MergedAstValidator verifies the tree assembled from separately
+        processed chunks of a script.
+
+        This default implementation does nothing, since each chunk has
+        already been validated.
+    """
+    def __init__(self, dialect):
+        self.dialect = dialect
+
+    def __call__(self, tree):
+        pass
+
 #------------------------------------------------------------------------------#
 def make_forbidden_visitor(name, description):
+    msg = 'The following is not allowed in this script: {0}.'
+    msg = msg.format(description)
     def func(self, node):
-        msg = 'The following is not allowed in this script: {0}.'
-        msg = msg.format(description)
         syntax_error(node, msg, reason='node_'+name)
     func.__name__ = 'visit_' + name
+    func.forbidden_node = (msg, 'node_'+name)
     return func
 
 def create_ast_validator_class(dialect):
@@ -229,7 +622,7 @@ def create_ast_validator_class(dialect):
         dialect.
 
         By default, a Dialect uses this function to create an ast validator.
-        The validator produced will have AstValdiator as a base class.
+        The validator produced will have TableAstValidator as a base class.
     """
     attrs = {}
     for flag, flagtraits in config.flags.node_leafflag_traits.iteritems():
@@ -240,6 +633,6 @@ def create_ast_validator_class(dialect):
             attrs['visit_' + nodetraits.name] = visitor
 
 
-    return type('AutoAstValidator', (AstValidator,), attrs)
+    return type('AutoAstValidator', (TableAstValidator,), attrs)
 
-#==============================================================================#
\ No newline at end of file
+#==============================================================================#
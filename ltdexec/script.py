@@ -1,41 +1,178 @@
+import marshal
 import sys
+import types
 import __builtin__
 
+from . import exceptions
 from .source import Source
 
 
 #==============================================================================#
 class Result(object):
-    """ The result of executing a Script. """
-    def __init__(self):
-        self.result = None
-        self.exception = False
-        self.exc_info = (None,None,None)
-        self.globals = {}
-        self.locals = {}
+    """ The result of executing a Script.
+
+        The result owns the namespace the script ran in, rather than a copy
+        of it.  Scripts run with the same dict as their globals and locals,
+        so unless *locals* is given, it is the same mapping as *globals*.
+
+        If the run declared an output schema, *outputs* holds the dict of
+        the declared outputs, and the namespace is not kept.
+    """
+    __slots__ = ('result', 'exception', 'exc_info', 'globals', 'locals',
+                 'outputs')
+
+    def __init__(self, result=None, exception=False,
+                 exc_info=(None,None,None), globals=None, locals=None,
+                 outputs=None):
+        self.result = result
+        self.exception = exception
+        self.exc_info = exc_info
+        self.globals = {} if globals is None else globals
+        self.locals = self.globals if locals is None else locals
+        self.outputs = outputs
+
+    def snapshot(self):
+        """ Return a copy of the result whose namespace is independent of the
+            one the script ran in, and so of any later changes made to it, for
+            instance by functions the script defined.
+        """
+        globals = self.globals.copy()
+        if self.locals is self.globals:
+            locals = globals
+        else:
+            locals = self.locals.copy()
+        outputs = None if self.outputs is None else self.outputs.copy()
+        return Result(self.result, self.exception, self.exc_info, globals,
+                      locals, outputs)
+
+
+def code_names(code):
+    """ Return the names used by a code object and the code objects nested
+        within it.  Every global name the code may look up is included, along
+        with attribute and imported names.
+    """
+    names = set()
+    stack = [code]
+    while stack:
+        code = stack.pop()
+        names.update(code.co_names)
+        stack.extend(c for c in code.co_consts if isinstance(c, types.CodeType))
+    return frozenset(names)
+
+
+class BatchResult(object):
+    """ The result of running a Script over a batch of rows.  *outputs* maps
+        each declared output name to a list holding its value after each row,
+        or None if the row did not assign it or raised an exception.
+        *errors* maps the index of each row that raised an exception to its
+        exc_info triple.
+    """
+    __slots__ = ('outputs', 'errors')
+
+    def __init__(self, outputs=None, errors=None):
+        self.outputs = {} if outputs is None else outputs
+        self.errors = {} if errors is None else errors
+
+    @property
+    def exception(self):
+        return bool(self.errors)
+
+
+class _Batch(object):
+    # Provides the functions called by the loop of a batch script.
+    def __init__(self, namespace, outputs):
+        self.namespace = namespace
+        self.initial = None
+        self.index = -1
+        self.result = BatchResult(dict((name, []) for name in outputs))
+
+    def begin(self, row):
+        namespace = self.namespace
+        if self.initial is None:
+            self.initial = namespace.copy()
+        else:
+            namespace.clear()
+            namespace.update(self.initial)
+        namespace.update(row)
+        self.index += 1
+
+    def done(self):
+        get = self.namespace.get
+        for name, values in self.result.outputs.iteritems():
+            values.append(get(name))
+
+    def failed(self):
+        exc_info = sys.exc_info()
+        if isinstance(exc_info[1], KeyboardInterrupt):
+            raise exc_info[0], exc_info[1], exc_info[2]
+        self.result.errors[self.index] = exc_info
+        for values in self.result.outputs.itervalues():
+            values.append(None)
 
 
 #==============================================================================#
 class Script(object):
+    """ A compiled script.  Only the dialect objects whose names are among
+        :attr:`referenced_names` are constructed for a run.
+    """
+    __slots__ = ('code', 'source', 'dialect', '_referenced_names',
+                 '_batch_code')
+
+    #: Scripts only exist in the interpreter that compiled them.
+    python_version = sys.version_info
+
     def __init__(self, code, source, dialect):
         from .dialect import util as dialect_util
         assert isinstance(source, Source)
-        self.python_version = sys.version_info
         self.code = code
         self.source = source
         self.dialect = dialect_util.get_dialect_object(dialect)
-        self.env_factory = self.dialect.EnvironmentFactory(self.dialect)
+        self._referenced_names = None
+        self._batch_code = None
+
+    @property
+    def env_factory(self):
+        """ The EnvironmentFactory of the script's dialect, which is shared by
+            all of the dialect's scripts. """
+        return self.dialect.env_factory
 
     @property
     def filename(self):
         return self.source.filename
 
-    def run(self, globals=None):
+    @property
+    def referenced_names(self):
+        """ The names the code may look up, computed on first use. """
+        if self._referenced_names is None:
+            self._referenced_names = code_names(self.code)
+        return self._referenced_names
+
+    def __reduce__(self):
+        """ Scripts are pickled as their marshalled code, source text and
+            filename, and the name and fingerprint of their dialect.  They can
+            only be loaded by the same Python version, where a dialect of the
+            same name and fingerprint is registered.
+        """
+        return (load_script, (marshal.dumps(self.code), self.source.text,
+                              self.source.filename, self.dialect.name,
+                              self.dialect.fingerprint,
+                              tuple(self.python_version[:3])))
+
+    def run(self, globals=None, outputs=None, shared=None):
         """ Run the script.  If *globals* is provided, they will
             be merged into the environment's namespace overwriting any object
             with the same name.  The return value is a Result object containing
             information about the script's run.
 
+            If an :class:`~ltdexec.outputs.OutputSchema` is given as
+            *outputs*, or declared by the dialect's `output_schema`, only the
+            declared outputs are kept, in the Result's `outputs`.  Missing
+            or mistyped outputs are reported as an exception of the run.
+
+            Data shared by many runs may be given as *shared*, a
+            :class:`~ltdexec.shared.SharedInputs`, whose names the dialect
+            must declare in its `shared_names`.
+
             Before execution, an Environment will be created using the dialect
             given in the constructor.  It is seperate from any other
             Environment created by a previous or future run.
@@ -51,24 +188,258 @@ class Script(object):
         # is expected because such exceptions are *not* due to the script
         # itself.  The source is instead the result of the `objects` attribute
         # of the Dialect.
-        with self.env_factory(globals) as env:
-            res = Result()
+        schema = outputs or self.dialect.output_schema
+        if shared is not None:
+            shared.check(self.dialect)
+        with self.env_factory(globals, self.referenced_names) as env:
+            res = self.run_in_environment(env, schema, shared)
+
+        return res
+
+    def run_async(self, globals=None, outputs=None, timeout=None,
+                  runner=None):
+        """ Run the script in the background, through *runner*, an
+            :class:`~ltdexec.aio.AsyncRunner`, or the default one, and return
+            a :class:`~ltdexec.executor.Future` of the Result.  See
+            :mod:`ltdexec.aio`.
+        """
+        from . import aio
+        runner = runner or aio.get_runner()
+        return runner.run_async(self, globals, outputs, timeout)
+
+    def run_many(self, globals_iterable, outputs=None, shared=None):
+        """ Run the script once for each globals dict in *globals_iterable*,
+            yielding a Result for each run, as :meth:`run` would return.
+
+            One Environment serves all of the runs.  Between runs, it is
+            reset: objects defined as reusable (see
+            :class:`~ltdexec.wrapper.defname`) are kept, while the others are
+            closed and constructed again.  The Environment is closed once the
+            iterable is exhausted, or the generator is closed.  *outputs* and
+            *shared* are as for :meth:`run`.
+        """
+        schema = outputs or self.dialect.output_schema
+        if shared is not None:
+            shared.check(self.dialect)
+        env = None
+        try:
+            for globals in globals_iterable:
+                globals = globals or {}
+                if env is None:
+                    env = self.env_factory(globals, self.referenced_names)
+                else:
+                    env.reset(globals)
+                yield self.run_in_environment(env, schema, shared)
+        finally:
+            if env is not None:
+                env.close()
+
+    def run_in_environment(self, env, outputs=None, shared=None):
+        """ Run the script in the given Environment, returning a Result.  If
+            an output schema is given, only the declared outputs are kept.
+            The values of *shared* inputs are bound in the globals for the
+            run, and removed before the Result takes the namespace.
+        """
+        result, exception, exc_info = None, False, (None,None,None)
+        try:
+            # In CPython, if __builtins__ is not in globals, the current
+            # globals are copied into the globals dict before executing the
+            # expression.  This is not what we want, so we provide
+            # __builtins__ ourselves.
+            env.globals['__builtins__'] = __builtin__
+            if shared is not None:
+                bindings = shared.bindings(self.referenced_names)
+                env.globals.update(bindings)
+            result = eval(self.code, env.globals, env.locals)
+            if outputs is not None:
+                return Result(result, outputs=outputs.extract(env.globals))
+        except:
+            # TODO: reraise the exception, or catch it?
+            exc_info = sys.exc_info()
+            exception = True
+            if outputs is not None:
+                return Result(result, exception, exc_info)
+
+        # The Result takes the namespace over from the environment.
+        namespace = env.globals
+        namespace.pop('_LX_import_module', None)
+        if shared is not None:
+            for name in bindings:
+                namespace.pop(name, None)
+        locals = None if env.locals is namespace else env.locals
+        return Result(result, exception, exc_info, namespace, locals)
+
+    def run_columns(self, globals_iterable, outputs=None, shared=None):
+        """ Run the script once for each globals dict in *globals_iterable*,
+            as :meth:`run_many` does, and return
+            :class:`~ltdexec.outputs.OutputColumns` holding the outputs that
+            the schema *outputs*, or the dialect's `output_schema`, declares.
+            No Result is created for the runs.  *shared* is as for
+            :meth:`run`.
+        """
+        schema = outputs or self.dialect.output_schema
+        if schema is None:
+            raise ValueError('No output schema was given or declared.')
+        if shared is not None:
+            shared.check(self.dialect)
+        bindings = {} if shared is None else shared.bindings(
+            self.referenced_names)
+        columns = schema.columns()
+        code = self.code
+        env = None
+        try:
+            for globals in globals_iterable:
+                globals = globals or {}
+                if env is None:
+                    env = self.env_factory(globals, self.referenced_names)
+                else:
+                    env.reset(globals)
+                namespace = env.globals
+                namespace['__builtins__'] = __builtin__
+                namespace.update(bindings)
+                try:
+                    eval(code, namespace, env.locals)
+                    columns.append(schema.extract(namespace))
+                except:
+                    columns.append_error(sys.exc_info())
+        finally:
+            if env is not None:
+                env.close()
+        return columns
+
+    def run_batch(self, rows, outputs):
+        """ Run the script once for each row of *rows*, an iterable of globals
+            dicts, and return a :class:`BatchResult` holding, for each name in
+            *outputs*, a list of the values it had after each row.
+
+            The first call compiles the script again, as the body of a loop
+            over the rows, so that the whole batch is run by a single `eval`
+            in a single Environment.  Each row starts from the globals the
+            Environment was created with, updated with the row, as a run
+            would.  However, the dialect's objects are constructed once for
+            the batch, and so are shared by its rows.
+
+            An exception raised by a row is recorded in the result, and the
+            remaining rows are still run.
+        """
+        code = self._batch_code
+        if code is None:
+            code = self.dialect.compiler.compile_batch(self.source.text,
+                                                       self.source.filename)
+            self._batch_code = code
+        with self.env_factory(None, self.referenced_names) as env:
+            namespace = env.globals
+            batch = _Batch(namespace, outputs)
+            namespace['__builtins__'] = __builtin__
+            namespace['_LX_batch_rows'] = rows
+            namespace['_LX_batch_begin'] = batch.begin
+            namespace['_LX_batch_done'] = batch.done
+            namespace['_LX_batch_failed'] = batch.failed
+            eval(code, namespace)
+        return batch.result
+
+
+#==============================================================================#
+class Expression(object):
+    """ A compiled expression, such as a formula.  Evaluating it returns its
+        value directly.
+
+        When every object of the dialect is a function, an evaluation needs
+        no Environment: the expression is evaluated in a copy of a namespace
+        shared by the dialect's expressions.  Otherwise, each evaluation
+        creates an Environment as :meth:`Script.run` does.
+    """
+    __slots__ = ('code', 'source', 'dialect', '_referenced_names',
+                 '_namespace', '_vectorizable')
+
+    python_version = sys.version_info
+
+    def __init__(self, code, source, dialect):
+        from .dialect import util as dialect_util
+        assert isinstance(source, Source)
+        self.code = code
+        self.source = source
+        self.dialect = dialect_util.get_dialect_object(dialect)
+        self._referenced_names = None
+        self._namespace = self.dialect.env_factory.shared_namespace()
+        self._vectorizable = None
+
+    @property
+    def filename(self):
+        return self.source.filename
+
+    @property
+    def referenced_names(self):
+        """ The names the code may look up, computed on first use. """
+        if self._referenced_names is None:
+            self._referenced_names = code_names(self.code)
+        return self._referenced_names
+
+    @property
+    def vectorizable(self):
+        """ True if the expression can be evaluated over whole columns at
+            once: see :mod:`ltdexec.vectorize`. """
+        if self._vectorizable is None:
+            from . import vectorize
+            self._vectorizable = vectorize.is_vectorizable(
+                self.source.text, self.dialect.vectorized_functions)
+        return self._vectorizable
+
+    def evaluate(self, globals=None):
+        """ Evaluate the expression, with the names in *globals* available to
+            it, and return its value.  An exception raised by the expression
+            is wrapped in an :class:`~ltdexec.exceptions.ExecutionError`.
+        """
+        if self._namespace is None:
+            return self._evaluate_in_environment(globals or {})
+        namespace = self._namespace.copy()
+        if globals:
+            namespace.update(globals)
+        namespace['__builtins__'] = __builtin__
+        try:
+            return eval(self.code, namespace)
+        except:
+            raise exceptions.ExecutionError(sys.exc_info(), self.source,
+                                            globals=namespace)
+
+    __call__ = evaluate
+
+    def evaluate_columns(self, columns, globals=None):
+        """ Evaluate the expression for each row of *columns*, a mapping of
+            names to equally long sequences, such as NumPy arrays, and return
+            the values.  See :func:`ltdexec.vectorize.evaluate_columns`.
+        """
+        from . import vectorize
+        return vectorize.evaluate_columns(self, columns, globals)
+
+    def _evaluate_in_environment(self, globals):
+        with self.dialect.env_factory(globals, self.referenced_names) as env:
+            env.globals['__builtins__'] = __builtin__
             try:
-                # In CPython, if __builtins__ is not in globals, the current
-                # globals are copied into the globals dict before executing the
-                # expression.  This is not what we want, so we provide
-                # __builtins__ ourselves.
-                env.globals['__builtins__'] = __builtin__
-                res.result = eval(self.code, env.globals, env.locals)
+                return eval(self.code, env.globals)
             except:
-                # TODO: reraise the exception, or catch it?
-                res.exc_info = sys.exc_info()
-                res.exception = True
+                raise exceptions.ExecutionError(sys.exc_info(), self.source,
+                                                globals=env.globals)
 
-            res.globals = env.globals.copy()
-            res.locals = env.locals.copy()
-
-        return res
 
+#==============================================================================#
+def load_script(code, text, filename, dialect_name, fingerprint, version):
+    """ Recreate a pickled Script without compiling it again. """
+    from .dialect import registry
+    if version != tuple(sys.version_info[:3]):
+        m = 'The script was compiled by Python {0}, not {1}.'
+        m = m.format('.'.join(map(str, version)),
+                     '.'.join(map(str, sys.version_info[:3])))
+        raise exceptions.IncompatibleScriptError(m)
+    if dialect_name not in registry.dialects:
+        m = 'The script\'s dialect "{0}" is not registered.'
+        raise exceptions.UnregisteredDialectError(m.format(dialect_name))
+    dialect = registry.dialects[dialect_name]
+    if dialect.fingerprint != fingerprint:
+        m = 'The settings of dialect "{0}" differ from those the script was '\
+            'compiled with.'
+        raise exceptions.IncompatibleScriptError(m.format(dialect_name))
+    source = Source(text, filename, dialect.compress_source)
+    return Script(marshal.loads(code), source, dialect)
 
-#==============================================================================#
\ No newline at end of file
+#==============================================================================#
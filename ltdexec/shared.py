@@ -0,0 +1,124 @@
+"""
+ltdexec.shared
+==============
+
+Read-only data, such as lookup tables, shared by many runs without being
+copied into each run's namespace.
+
+"""
+
+import collections
+import weakref
+
+from . import config
+
+#==============================================================================#
+def readonly(value):
+    """ Return a read-only view of *value* if it is a dict or a list.  Other
+        values are returned unchanged.
+    """
+    if isinstance(value, dict):
+        return ReadOnlyMapping(value)
+    elif isinstance(value, list):
+        return ReadOnlySequence(value)
+    return value
+
+
+class ReadOnlyMapping(collections.Mapping):
+    """ A view of a dict that scripts cannot change.  Dicts and lists found
+        within it are returned as views too.
+    """
+    __slots__ = ('_LX_data',)
+
+    def __init__(self, data):
+        self._LX_data = data
+
+    def __getitem__(self, key):
+        return readonly(self._LX_data[key])
+
+    def __iter__(self):
+        return iter(self._LX_data)
+
+    def __len__(self):
+        return len(self._LX_data)
+
+    def __contains__(self, key):
+        return key in self._LX_data
+
+    def __repr__(self):
+        return 'ReadOnlyMapping({0!r})'.format(self._LX_data)
+
+
+class ReadOnlySequence(collections.Sequence):
+    """ A view of a list that scripts cannot change.  Dicts and lists found
+        within it are returned as views too.
+    """
+    __slots__ = ('_LX_data',)
+
+    def __init__(self, data):
+        self._LX_data = data
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ReadOnlySequence(self._LX_data[index])
+        return readonly(self._LX_data[index])
+
+    def __len__(self):
+        return len(self._LX_data)
+
+    def __repr__(self):
+        return 'ReadOnlySequence({0!r})'.format(self._LX_data)
+
+
+#==============================================================================#
+class SharedInputs(object):
+    """ Inputs that many runs share, given as a mapping of names to values.
+
+        Dicts and lists are exposed through read-only views, made once, in
+        :attr:`values`.  Each run binds the views of the names its script
+        references in its globals, with a single update, so the data is never
+        copied, and removes them again before its Result takes the namespace.
+        Functions defined by a script therefore no longer see the names once
+        the run is over.
+
+        Scripts cannot rebind the names, as the dialect must declare them in
+        its `shared_names`, which makes them unassignable.
+    """
+    def __init__(self, data):
+        self.names = frozenset(data)
+        self._checked = weakref.WeakKeyDictionary()
+        self.values = dict((name, readonly(value))
+                           for name, value in data.iteritems())
+        self._bindings = {}
+
+    def bindings(self, names):
+        """ Return a dict of the views of the shared names among *names*, a
+            frozenset such as :attr:`Script.referenced_names
+            <ltdexec.script.Script.referenced_names>`.  The dict is kept, and
+            must not be modified.
+        """
+        try:
+            return self._bindings[names]
+        except KeyError:
+            pass
+        bindings = dict((name, self.values[name])
+                        for name in self.names.intersection(names))
+        if len(self._bindings) >= config.misc.DEFAULT_SCRIPT_CACHE_SIZE:
+            self._bindings.clear()
+        self._bindings[names] = bindings
+        return bindings
+
+    def check(self, dialect):
+        """ Raise a ValueError unless the dialect declares every name. """
+        if dialect in self._checked:
+            return
+        undeclared = self.names - dialect.shared_names_set
+        if undeclared:
+            m = 'The dialect does not declare the shared names: {0}.'
+            raise ValueError(m.format(', '.join(sorted(undeclared))))
+        self._checked[dialect] = True
+
+    def __repr__(self):
+        return '<SharedInputs: {0}>'.format(', '.join(sorted(self.names)))
+
+#==============================================================================#
@@ -1,13 +1,67 @@
+import array
+import zlib
 
 
 #==============================================================================#
 class Source(object):
-    def __init__(self, source, filename):
-        self.lines = source.splitlines() or ['']
+    """ The text of a script, with one-based access to its lines.
+
+        The text is kept once, as given, or zlib-compressed if *compress* is
+        True.  Lines are not stored; the offsets at which they begin are
+        computed when a line is first requested, and kept in a compact array.
+    """
+    __slots__ = ('filename', 'size', 'compressed', '_unicode', '_offsets',
+                 '_data')
+
+    def __init__(self, source, filename, compress=False):
         self.filename = filename
+        self.size = len(source)
+        self.compressed = compress
+        self._unicode = isinstance(source, unicode)
+        self._offsets = None
+        if compress:
+            data = source.encode('utf-8') if self._unicode else source
+            self._data = zlib.compress(data)
+        else:
+            self._data = source
+
+    @property
+    def text(self):
+        """ The complete source text. """
+        if not self.compressed:
+            return self._data
+        data = zlib.decompress(self._data)
+        return data.decode('utf-8') if self._unicode else data
+
+    @property
+    def lines(self):
+        """ A list of the lines of the source, without line endings. """
+        return self.text.splitlines() or ['']
+
+    def offsets(self, text=None):
+        """ Return an array of the offsets at which the lines begin, followed
+            by the length of the text.
+        """
+        offsets = self._offsets
+        if offsets is None:
+            if text is None:
+                text = self.text
+            offsets = array.array('I' if len(text) < 2**32 else 'L', [0])
+            pos = 0
+            for line in text.splitlines(True):
+                pos += len(line)
+                offsets.append(pos)
+            self._offsets = offsets
+        return offsets
+
+    def _line(self, text, offsets, index):
+        # Zero-based.  An empty source has a single, empty line.
+        if len(offsets) == 1:
+            return text
+        return text[offsets[index]:offsets[index+1]].splitlines()[0]
 
     def __len__(self):
-        return len(self.lines)
+        return max(len(self.offsets()) - 1, 1)
 
     def __getitem__(self, lineno):
         """ One-based index into the lines of the source file.
@@ -18,6 +72,9 @@ class Source(object):
 
             Negative indexes are interpreted in the normal Python manner.
         """
+        text = self.text
+        offsets = self.offsets(text)
+        count = max(len(offsets) - 1, 1)
         if isinstance(lineno, slice):
             start, stop = None, None
             if lineno.start > 0:
@@ -28,21 +85,26 @@ class Source(object):
                 stop = lineno.stop - 1
             elif lineno.stop == 0:
                 raise IndexError('Zero is not a valid index.  Line numbers are counted from 1.')
-            lineno = slice(start, stop, lineno.step)
+            indices = slice(start, stop, lineno.step).indices(count)
+            return [self._line(text, offsets, i) for i in xrange(*indices)]
         else:
             if lineno > 0:
                 lineno -= 1
             elif lineno == 0:
                 raise IndexError('Zero is not a valid index.  Line numbers are counted from 1.')
-        return self.lines[lineno]
+            else:
+                lineno += count
+            if not 0 <= lineno < count:
+                raise IndexError('Line number out of range.')
+            return self._line(text, offsets, lineno)
 
     def __iter__(self):
-        return self.lines.__iter__()
+        return iter(self.lines)
 
     def __str__(self):
         return '\n'.join(self.lines)
 
     def __repr__(self):
-        return '<Source: filename={0}, lines={1}>'.format(self.filename, len(self.lines))
+        return '<Source: filename={0}, lines={1}>'.format(self.filename, len(self))
 
 #==============================================================================#
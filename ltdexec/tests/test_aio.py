@@ -0,0 +1,139 @@
+import threading
+import time
+
+from ltdexec import aio, exceptions, wrapper
+from ltdexec.dialect import Dialect
+from ltdexec.executor import (ScriptExecutor, ProcessScriptExecutor,
+                              ForkExecutor)
+from ltdexec.script import Script
+
+from .base import LtdExec_TestCaseBase
+
+#==============================================================================#
+class _Tracker(object):
+    # Records how many calls run at once.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.most = 0
+
+    def work(self, seconds):
+        with self.lock:
+            self.running += 1
+            self.most = max(self.most, self.running)
+        time.sleep(seconds)
+        with self.lock:
+            self.running -= 1
+        return seconds
+
+def _wait_for(condition, timeout=10):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+class AsyncRunner_TestCase(LtdExec_TestCaseBase):
+    def setUp(self):
+        super(AsyncRunner_TestCase, self).setUp()
+        self.tracker = tracker = _Tracker()
+        class MyDialect(Dialect):
+            objects = {'work': wrapper.deffunc(tracker.work),
+                       'sleep': wrapper.deffunc(time.sleep)}
+        self.dialect = MyDialect
+
+    def test_compile_and_run(self):
+        with aio.AsyncRunner(ScriptExecutor(max_workers=2)) as runner:
+            script = runner.compile_async('y = x + 1', 'my_file',
+                                          self.dialect).result(timeout=10)
+            self.assertTrue(isinstance(script, Script))
+            self.assertEquals('my_file', script.filename)
+            result = script.run_async({'x': 1}, runner=runner).result(
+                timeout=10)
+            self.assertEquals(2, result.globals['y'])
+
+    def test_compile_error(self):
+        with aio.AsyncRunner(ScriptExecutor(max_workers=1)) as runner:
+            future = runner.compile_async('x = = 1', 'my_file', self.dialect)
+            with self.assertRaises(exceptions.CompilationError):
+                future.result(timeout=10)
+
+    def test_max_concurrency(self):
+        script = self.dialect.compile('y = work(0.02)', 'my_file')
+        with aio.AsyncRunner(ScriptExecutor(max_workers=8),
+                             max_concurrency=2) as runner:
+            futures = [runner.run_async(script) for i in range(8)]
+            results = [f.result(timeout=10) for f in futures]
+        self.assertEquals([0.02] * 8, [r.globals['y'] for r in results])
+        self.assertEquals(2, self.tracker.most)
+
+    def test_timeout(self):
+        script = self.dialect.compile('sleep(0.5)', 'my_file')
+        with aio.AsyncRunner(ScriptExecutor(max_workers=1)) as runner:
+            start = time.time()
+            future = runner.run_async(script, timeout=0.05)
+            self.assertTrue(time.time() - start < 0.5)
+            with self.assertRaises(exceptions.TimeoutError):
+                future.result(timeout=10)
+
+    def test_cancel_waiting(self):
+        script = self.dialect.compile('y = work(0.1)', 'my_file')
+        with aio.AsyncRunner(ScriptExecutor(max_workers=1),
+                             max_concurrency=1) as runner:
+            first = runner.run_async(script)
+            second = runner.run_async(script)
+            self.assertTrue(second.cancel())
+            self.assertEquals(0.1, first.result(timeout=10).globals['y'])
+            with self.assertRaises(exceptions.CancelledError):
+                second.result()
+            # The place the cancelled call took is given back.
+            third = runner.run_async(script)
+            self.assertEquals(0.1, third.result(timeout=10).globals['y'])
+
+    def test_timeout_kills_forked_run(self):
+        script = self.dialect.compile('sleep(30)', 'my_file')
+        executor = ForkExecutor(max_workers=1)
+        with aio.AsyncRunner(executor) as runner:
+            start = time.time()
+            with self.assertRaises(exceptions.TimeoutError):
+                runner.run_async(script, timeout=0.1).result(timeout=10)
+            self.assertTrue(_wait_for(lambda: executor.stats().cancelled))
+            ok = self.dialect.compile('y = 1', 'my_file')
+            self.assertEquals(1, runner.run_async(ok).result(timeout=10)
+                                       .globals['y'])
+        self.assertTrue(time.time() - start < 10)
+
+    def test_cancel_stops_worker(self):
+        script = self.dialect.compile('sleep(30)', 'my_file')
+        executor = ProcessScriptExecutor(max_workers=1)
+        with aio.AsyncRunner(executor) as runner:
+            start = time.time()
+            future = runner.run_async(script)
+            time.sleep(0.1)
+            self.assertTrue(future.cancel())
+            self.assertTrue(_wait_for(lambda: executor.stats().cancelled))
+            ok = self.dialect.compile('y = 1', 'my_file')
+            self.assertEquals(1, runner.run_async(ok).result(timeout=10)
+                                       .globals['y'])
+        self.assertEquals(0, executor.stats().crashes)
+        self.assertTrue(time.time() - start < 10)
+
+    def test_default_runner(self):
+        runner = aio.configure(ScriptExecutor(max_workers=1),
+                               max_concurrency=4)
+        try:
+            self.assertTrue(aio.get_runner() is runner)
+            script = aio.compile_async('y = 3', 'my_file',
+                                       self.dialect).result(timeout=10)
+            result = aio.run_async(script).result(timeout=10)
+            self.assertEquals(3, result.globals['y'])
+            result = script.run_async().result(timeout=10)
+            self.assertEquals(3, result.globals['y'])
+        finally:
+            runner.shutdown()
+            aio._default_runner = None
+
+    def test_invalid_max_concurrency(self):
+        with self.assertRaises(ValueError):
+            aio.AsyncRunner(ScriptExecutor(max_workers=1), max_concurrency=0)
+
+#==============================================================================#
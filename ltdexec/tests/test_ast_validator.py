@@ -2,6 +2,7 @@ import unittest
 import ast
 
 from ltdexec.dialect.base import Dialect
+from ltdexec.processor.validator import syntax_error
 from ltdexec import exceptions
 
 from .base import LtdExec_TestCaseBase
@@ -447,8 +448,93 @@ class NoDoubleUnderscoreAttrs_AstValidator_TestCase(LtdExec_TestCaseBase):
 
 
 #==============================================================================#
+class UnassignableAstValidator_TestCase(LtdExec_TestCaseBase):
+    def setUp(self):
+        super(UnassignableAstValidator_TestCase, self).setUp()
+        class MyDialect(Dialect):
+            allow_statement_del = True
+            unassignable_names = ['fixed']
+            unassignable_attrs = ['frozen']
+        self.validator = MyDialect().AstValidator(MyDialect())
 
+    def test_load_allowed(self):
+        self.validator(ast.parse("x = fixed.frozen"))
+        self.assertTrue('Good.  No exception was thrown.')
 
+    def test_assign(self):
+        for src, reason in [('fixed = 1', 'unassignable_name'),
+                            ('fixed += 1', 'unassignable_name'),
+                            ('del fixed', 'unassignable_name'),
+                            ('a.frozen = 1', 'unassignable_attr')]:
+            with self.assertRaises(exceptions.SyntaxError) as cm:
+                self.validator(ast.parse(src))
+            self.assertEquals(reason, cm.exception.reason)
 
+#==============================================================================#
+class TableAstValidator_TestCase(LtdExec_TestCaseBase):
+    # The table-driven walk must report the same first error as the
+    # ast.NodeVisitor based walk.
+    sources = [
+        "x = 1\ny = x + 2",
+        "def f(a, b=2):\n    return [a.b for a in range(b)]",
+        "import module",
+        "x = 1\ny = type(x)\nz = a._LX_hidden",
+        "x = a.__class__\n_LX_name = 1",
+        "class A(object):\n    def m(self):\n        del self.x",
+        "try:\n    pass\nfinally:\n    x = len.__doc__",
+        "f(lambda q: q._LX_x, [i for i in (yield)])",
+        "exec 'x' in {}",
+        "if a:\n    b = {1: c.d, 2: [e, f(g=h.i)]}\nelse:\n    print >>j, eval",
+    ]
+
+    def assertSameResult(self, validator, src):
+        errors = []
+        for check in (validator.visit, validator):
+            try:
+                check(ast.parse(src))
+            except exceptions.SyntaxError as e:
+                errors.append((e.reason, e.lineno, e.offset, e.args[0]))
+            else:
+                errors.append(None)
+        self.assertEquals(errors[0], errors[1], src)
+
+    def test_default_dialect(self):
+        validator = Dialect().AstValidator(Dialect())
+        for src in self.sources:
+            self.assertSameResult(validator, src)
+
+    def test_custom_dialect(self):
+        class MyDialect(Dialect):
+            allow_statement_import = True
+            allow_statement_del = True
+            no_double_underscore_attrs = True
+            forbidden_names = ['b', 'q']
+        validator = MyDialect().AstValidator(MyDialect())
+        for src in self.sources:
+            self.assertSameResult(validator, src)
+
+    def test_overridden_visitor(self):
+        visited = []
+        class MyValidator(Dialect().AstValidator):
+            def visit_Call(self, node):
+                visited.append(node.func.id)
+                self.generic_visit(node)
+        validator = MyValidator(Dialect())
+        with self.assertRaises(exceptions.SyntaxError) as cm:
+            validator(ast.parse("f(g(type))"))
+        self.assertEquals('forbidden_name', cm.exception.reason)
+        self.assertEquals(['f', 'g'], visited)
+
+    def test_overridden_check(self):
+        class MyValidator(Dialect().AstValidator):
+            def check_name(self, node):
+                if node.id == 'secret':
+                    syntax_error(node, 'No secrets.', reason='secret')
+                super(MyValidator, self).check_name(node)
+        validator = MyValidator(Dialect())
+        with self.assertRaises(exceptions.SyntaxError) as cm:
+            validator(ast.parse("x = secret"))
+        self.assertEquals('secret', cm.exception.reason)
 
 
+#==============================================================================#
@@ -0,0 +1,218 @@
+import os
+import shutil
+import tempfile
+import types
+
+from ltdexec.dialect import Dialect
+from ltdexec import cache, compiler
+
+from .base import LtdExec_TestCaseBase
+
+#==============================================================================#
+class Sized(object):
+    def __init__(self, size):
+        self.size = size
+
+class SizedCache(cache.LRUCache):
+    def sizeof(self, value):
+        return value.size
+
+#==============================================================================#
+class LRUCache_TestCase(LtdExec_TestCaseBase):
+    def test_get_put(self):
+        c = cache.LRUCache(4)
+        self.assertEquals(None, c.get('a'))
+        c.put('a', 1)
+        self.assertEquals(1, c.get('a'))
+        self.assertEquals('x', c.get('b', 'x'))
+        stats = c.stats()
+        self.assertEquals(1, stats.hits)
+        self.assertEquals(2, stats.misses)
+        self.assertEquals(1, stats.entries)
+
+    def test_evicts_least_recently_used(self):
+        c = cache.LRUCache(2)
+        c.put('a', 1)
+        c.put('b', 2)
+        c.get('a')
+        c.put('c', 3)
+        self.assertTrue('a' in c)
+        self.assertFalse('b' in c)
+        self.assertTrue('c' in c)
+        self.assertEquals(1, c.stats().evictions)
+
+    def test_evicts_by_size(self):
+        c = SizedCache(10, max_size=5)
+        c.put('a', Sized(2))
+        c.put('b', Sized(2))
+        c.put('c', Sized(2))
+        self.assertEquals(2, len(c))
+        self.assertFalse('a' in c)
+        self.assertEquals(4, c.stats().size)
+        # A single oversized entry is still kept.
+        c.put('d', Sized(8))
+        self.assertEquals(['d'], list(c._entries))
+
+    def test_invalidate(self):
+        c = SizedCache(4)
+        c.put('a', Sized(3))
+        self.assertTrue(c.invalidate('a'))
+        self.assertFalse(c.invalidate('a'))
+        self.assertEquals(0, c.stats().size)
+        c.put('a', Sized(3))
+        c.clear()
+        self.assertEquals(0, len(c))
+
+#==============================================================================#
+class ScriptCache_TestCase(LtdExec_TestCaseBase):
+    def test_source_key(self):
+        dialect = Dialect()
+        key = cache.source_key('x = 1', 'f', dialect)
+        self.assertEquals(key, cache.source_key('x = 1', 'f', dialect))
+        self.assertNotEquals(key, cache.source_key('x = 2', 'f', dialect))
+        self.assertNotEquals(key, cache.source_key('x = 1', 'g', dialect))
+        self.assertNotEquals(key, cache.source_key('x = 1', 'f', dialect,
+                                                   'eval'))
+        self.assertNotEquals(key, cache.source_key(u'x = 1', 'f', dialect))
+
+    def test_compiler_returns_cached_script(self):
+        comp = compiler.Compiler(Dialect())
+        script = comp('x = 1', 'my_file')
+        self.assertTrue(script is comp('x = 1', 'my_file'))
+        self.assertFalse(script is comp('x = 1', 'other_file'))
+        self.assertEquals(1, comp.script_cache.stats().hits)
+
+    def test_expressions_cached_separately(self):
+        comp = compiler.Compiler(Dialect())
+        expr = comp.compile_expression('x + 1', 'my_file')
+        self.assertTrue(expr is comp.compile_expression('x + 1', 'my_file'))
+        self.assertFalse(expr is comp('x + 1', 'my_file'))
+        comp.invalidate('x + 1', 'my_file')
+        self.assertEquals(0, len(comp.script_cache))
+
+    def test_compiler_invalidate(self):
+        comp = compiler.Compiler(Dialect())
+        script = comp('x = 1', 'my_file')
+        comp.invalidate('x = 1', 'my_file')
+        self.assertFalse(script is comp('x = 1', 'my_file'))
+        comp.invalidate()
+        self.assertEquals(0, len(comp.script_cache))
+
+    def test_compiler_invalidate_needs_filename(self):
+        comp = compiler.Compiler(Dialect())
+        script = comp('x = 1', 'my_file')
+        with self.assertRaises(TypeError):
+            comp.invalidate('x = 1')
+        self.assertTrue(script is comp('x = 1', 'my_file'))
+
+    def test_disabled(self):
+        class MyDialect(Dialect):
+            script_cache_size = 0
+        comp = compiler.Compiler(MyDialect())
+        self.assertEquals(None, comp.script_cache)
+        self.assertFalse(comp('x = 1', 'f') is comp('x = 1', 'f'))
+
+    def test_errors_not_cached(self):
+        comp = compiler.Compiler(Dialect())
+        for i in range(2):
+            with self.assertRaises(Exception):
+                comp('not * 5', 'my_file')
+        self.assertEquals(0, len(comp.script_cache))
+
+#==============================================================================#
+class DiskCodeCache_TestCase(LtdExec_TestCaseBase):
+    def setUp(self):
+        super(DiskCodeCache_TestCase, self).setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(DiskCodeCache_TestCase, self).tearDown()
+
+    def store(self, c, src, filename='f'):
+        dialect = Dialect()
+        key = c.key(src, filename, dialect)
+        c.store(key, src, filename, dialect, compile(src, filename, 'exec'))
+        return key
+
+    def test_store_load(self):
+        c = cache.DiskCodeCache(self.directory)
+        dialect = Dialect()
+        key = self.store(c, 'x = 1')
+        code = c.load(key, 'x = 1', 'f', dialect)
+        self.assertTrue(isinstance(code, types.CodeType))
+        self.assertEquals(None, c.load(c.key('x = 2', 'f', dialect),
+                                       'x = 2', 'f', dialect))
+        self.assertEquals((1, 1, 0), c.stats()[:3])
+        # A fresh cache object sees the entries left by another.
+        c2 = cache.DiskCodeCache(self.directory)
+        self.assertEquals(c.stats().size, c2.stats().size)
+        self.assertTrue(c2.load(key, 'x = 1', 'f', dialect) is not None)
+
+    def test_corrupt_entry(self):
+        c = cache.DiskCodeCache(self.directory)
+        key = self.store(c, 'x = 1')
+        path = c.path(key)
+        with open(path, 'rb') as f:
+            data = f.read()
+        with open(path, 'wb') as f:
+            f.write(data[:-1] + chr((ord(data[-1]) + 1) % 256))
+        self.assertEquals(None, c.load(key, 'x = 1', 'f', Dialect()))
+        self.assertEquals(1, c.stats().corrupt)
+        self.assertFalse(os.path.exists(path))
+        self.assertEquals(0, c.stats().size)
+
+    def test_secret(self):
+        c = cache.DiskCodeCache(self.directory, secret='s3cret')
+        key = self.store(c, 'x = 1')
+        self.assertTrue(c.load(key, 'x = 1', 'f', Dialect()) is not None)
+        # Entries planted without the secret are rejected.
+        planted = cache.DiskCodeCache(self.directory)
+        key = self.store(planted, 'x = 2')
+        self.assertEquals(None, c.load(key, 'x = 2', 'f', Dialect()))
+        self.assertEquals(1, c.stats().corrupt)
+        other = cache.DiskCodeCache(self.directory, secret='other')
+        key = self.store(other, 'x = 3')
+        self.assertEquals(None, c.load(key, 'x = 3', 'f', Dialect()))
+
+    def disk_size(self):
+        return sum(os.path.getsize(os.path.join(dirpath, name))
+                   for dirpath, dirnames, names in os.walk(self.directory)
+                   for name in names)
+
+    def test_overwrite_keeps_size(self):
+        c = cache.DiskCodeCache(self.directory)
+        for i in range(5):
+            self.store(c, 'x = 1')
+            self.assertEquals(self.disk_size(), c.stats().size)
+
+    def test_mismatched_source(self):
+        c = cache.DiskCodeCache(self.directory)
+        key = self.store(c, 'x = 1')
+        self.assertEquals(None, c.load(key, 'x = 2', 'f', Dialect()))
+        self.assertEquals(1, c.stats().corrupt)
+
+    def test_eviction(self):
+        c = cache.DiskCodeCache(self.directory)
+        self.store(c, 'x = 0')
+        entry_size = c.stats().size
+        c = cache.DiskCodeCache(self.directory, max_bytes=entry_size * 3)
+        keys = [self.store(c, 'x = {0}'.format(i)) for i in range(1, 6)]
+        self.assertTrue(c.stats().evictions > 0)
+        self.assertTrue(c.stats().size <= entry_size * 3)
+        self.assertTrue(os.path.exists(c.path(keys[-1])))
+
+    def test_compiler_uses_disk_cache(self):
+        class MyDialect(Dialect):
+            code_cache_dir = self.directory
+        comp = compiler.Compiler(MyDialect())
+        comp('x = 1', 'my_file')
+        comp.invalidate('x = 1', 'my_file')
+        self.assertEquals(0, comp.code_cache.stats().size)
+        comp('x = 1', 'my_file')
+        comp.script_cache.clear()
+        script = comp('x = 1', 'my_file')
+        self.assertEquals(1, comp.code_cache.stats().hits)
+        self.assertEquals(1, script.run().globals['x'])
+
+#==============================================================================#
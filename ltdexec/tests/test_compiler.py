@@ -88,4 +88,127 @@ class DefaultCompiler_TestCase(LtdExec_TestCaseBase):
         self.assertEquals('    ^\n', fe[-2])
         self.assertEquals('SyntaxError: The following is not allowed in this script: import statement.\n', fe[-1])
 
-#==============================================================================#
\ No newline at end of file
+
+class SplitSourceCompiler_TestCase(LtdExec_TestCaseBase):
+    def setUp(self):
+        super(SplitSourceCompiler_TestCase, self).setUp()
+        class MyDialect(Dialect):
+            Compiler = compiler.SplitSourceCompiler
+        self.dialect = MyDialect()
+        self.compiler = self.dialect.compiler
+
+    def test_same_code_as_compiler(self):
+        src = textwrap.dedent("""\
+            def f(x):
+                return x + 1
+
+            # comment
+            @staticmethod
+            @staticmethod
+            def g():
+                pass
+            if f(1):
+                y = (2 +
+            3)
+            else:
+                y = 3
+            z = f(y)
+            """)
+        expected = compiler.Compiler(self.dialect).do_compile(src, 'f')
+        code = self.compiler.do_compile(src, 'f')
+        self.assertEquals(expected.co_code, code.co_code)
+        self.assertEquals(expected.co_lnotab, code.co_lnotab)
+
+    def test_run(self):
+        script = self.compiler('x = 1\ndef f():\n    return x + 1\ny = f()\n',
+                               'my_file')
+        self.assertEquals(2, script.run().globals['y'])
+
+    def test_run_batch(self):
+        script = self.compiler('def f():\n    return x + 1\ny = f()\n',
+                               'my_file')
+        result = script.run_batch([{'x': 1}, {'x': 5}], ['y'])
+        self.assertEquals([2, 6], result.outputs['y'])
+
+    def test_chunks_cached(self):
+        self.compiler('x = 1\ny = 2\n', 'my_file')
+        stats = self.compiler.chunk_cache.stats()
+        self.assertEquals((0, 2), (stats.hits, stats.misses))
+        script = self.compiler('x = 1\nz = 3\ny = 2\n', 'my_file')
+        stats = self.compiler.chunk_cache.stats()
+        self.assertEquals((2, 3), (stats.hits, stats.misses))
+        result = script.run()
+        self.assertEquals((1, 3, 2), tuple(result.globals[k] for k in 'xzy'))
+
+    def test_syntax_error_line(self):
+        self.compiler('a = 1\nb = 2\n', 'my_file')
+        for src in ('a = 1\nb = 2\nimport module\n',
+                    'a = 1\nb = 2\nnot * 5\n'):
+            with self.assertRaises(exceptions.CompilationError) as cm:
+                self.compiler(src, 'my_file')
+            type, value, tb = cm.exception.exc_info
+            self.assertEquals(3, value.lineno)
+            self.assertEquals(3, value.args[1][1])
+            self.assertEquals(src.splitlines()[2] + '\n', value.text)
+            fe = cm.exception.format_exception()
+            self.assertEquals('  File "my_file", line 3\n', fe[-4])
+
+    def test_processor_fallback(self):
+        from ltdexec.processor import processor
+        self.assertTrue(isinstance(self.compiler.processor,
+                                   processor.SplitSourceProcessor))
+
+    def test_invalidate(self):
+        self.compiler('x = 1\n', 'my_file')
+        self.compiler.invalidate()
+        self.assertEquals(0, len(self.compiler.chunk_cache))
+
+#==============================================================================#
+class ParallelSplitSourceCompiler_TestCase(LtdExec_TestCaseBase):
+    def setUp(self):
+        super(ParallelSplitSourceCompiler_TestCase, self).setUp()
+        class MyDialect(Dialect):
+            Compiler = compiler.ParallelSplitSourceCompiler
+            parallel_compile_processes = 2
+            parallel_compile_threshold = 2
+        self.dialect = MyDialect()
+        self.compiler = self.dialect.compiler
+
+    def tearDown(self):
+        self.compiler.close()
+        super(ParallelSplitSourceCompiler_TestCase, self).tearDown()
+
+    def test_same_code_as_compiler(self):
+        src = ''.join('x{0} = {0}\nif x{0}:\n    y = x{0}\n'.format(i)
+                      for i in range(20))
+        expected = compiler.Compiler(self.dialect).do_compile(src, 'f')
+        code = self.compiler.do_compile(src, 'f')
+        self.assertTrue(self.compiler.pool is not None)
+        self.assertEquals(expected.co_code, code.co_code)
+        self.assertEquals(expected.co_lnotab, code.co_lnotab)
+
+    def test_below_threshold(self):
+        self.compiler('x = 1\n', 'my_file')
+        self.assertEquals(None, self.compiler.pool)
+
+    def test_syntax_error_line(self):
+        for src, typ in (('a = 1\nb = 2\nimport module\nc = 3\n',
+                          exceptions.SyntaxError),
+                         ('a = 1\nb = 2\nnot * 5\nc = 3\n', SyntaxError)):
+            with self.assertRaises(exceptions.CompilationError) as cm:
+                self.compiler(src, 'my_file')
+            type, value, tb = cm.exception.exc_info
+            self.assertEquals(typ, type)
+            self.assertEquals(3, value.lineno)
+            self.assertEquals(src.splitlines()[2] + '\n', value.text)
+            fe = cm.exception.format_exception()
+            self.assertEquals('  File "my_file", line 3\n', fe[-4])
+
+    def test_close(self):
+        self.compiler('x = 1\ny = 2\n', 'my_file')
+        self.compiler.close()
+        self.assertEquals(None, self.compiler.pool)
+        script = self.compiler('x = 1\ny = 3\n', 'my_file')
+        self.assertEquals(3, script.run().globals['y'])
+
+#==============================================================================#
@@ -1,8 +1,9 @@
 import unittest
 
 from ltdexec.dialect.base import Dialect
+from ltdexec.dialect.registry import dialects
 from ltdexec.processor.validator import AstValidator
-from ltdexec import exceptions
+from ltdexec import exceptions, wrapper
 
 from .base import LtdExec_TestCaseBase
 
@@ -231,6 +232,46 @@ class CustomDialect_TestCase(LtdExec_TestCaseBase):
         with self.assertRaises(exceptions.ImmutableError) as cm:
             mydialect.allow_statement_def = True
 
+#==============================================================================#
+class DialectFingerprint_TestCase(LtdExec_TestCaseBase):
+    def test_basic(self):
+        self.assertEquals(40, len(Dialect.fingerprint))
+        self.assertEquals(Dialect.fingerprint, Dialect().fingerprint)
+
+    def test_identical_rules(self):
+        class MyDialect(Dialect):
+            pass
+        class OtherDialect(Dialect):
+            allow_statement_import = False
+        self.assertEquals(Dialect.fingerprint, MyDialect.fingerprint)
+        self.assertEquals(Dialect.fingerprint, OtherDialect.fingerprint)
+
+    def test_redefinition(self):
+        def define():
+            class MyDialect(Dialect):
+                allow_statement_import = True
+                allowed_imports = {'math': ['sqrt'], 'string': None}
+                objects = {'obj': wrapper.defname(Struct, args=[1])}
+            fingerprint = MyDialect.fingerprint
+            dialects.unregister(MyDialect.name)
+            return fingerprint
+        self.assertEquals(define(), define())
+
+    def test_different_rules(self):
+        class ImportDialect(Dialect):
+            allow_statement_import = True
+        class NamesDialect(Dialect):
+            forbidden_names = ['x']
+        class ObjectsDialect(Dialect):
+            objects = {'obj': wrapper.defname(Struct)}
+        class ValidatorDialect(Dialect):
+            AstValidator = AstValidator
+        fingerprints = set([Dialect.fingerprint, ImportDialect.fingerprint,
+                            NamesDialect.fingerprint,
+                            ObjectsDialect.fingerprint,
+                            ValidatorDialect.fingerprint])
+        self.assertEquals(5, len(fingerprints))
+
 #==============================================================================#
 class DialectUtil_TestCase(LtdExec_TestCaseBase):
     def test_get_dialect_object_by_class(self):
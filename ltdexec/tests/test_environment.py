@@ -1,7 +1,9 @@
 import unittest
 import textwrap
+import threading
 
-from ltdexec.environment import Environment, EnvironmentFactory
+from ltdexec.environment import (Environment, EnvironmentFactory,
+                                 PooledEnvironmentFactory)
 from ltdexec.dialect import Dialect
 from ltdexec import wrapper
 
@@ -148,7 +150,159 @@ class Environment_TestCase(LtdExec_TestCaseBase):
             self.assertTrue('Good. No exception.')
             self.assertEquals(4.0, env.globals['x'])
 
+    def test_reset(self):
+        TestObj.clear_instances()
+        objects = {
+            'a': wrapper.defname(TestObj, args=['a'], method_on_close='close',
+                                 reusable=True),
+            'b': wrapper.defname(TestObj, args=['b'], method_on_close='close'),
+            }
+        env = Environment(objects, {'x': 1})
+        a, b = env.globals['a'], env.globals['b']
+        env.globals['y'] = 2
+        env.import_module('math')
+        env.reset({'x': 3})
+        self.assertEquals(1, len(wrapper._local.key_stack))
+        self.assertTrue(env.globals['a'] is a)
+        self.assertFalse(env.globals['b'] is b)
+        self.assertEquals(False, a.closed)
+        self.assertEquals(True, b.closed)
+        self.assertEquals(3, env.globals['x'])
+        self.assertTrue('y' not in env.globals)
+        self.assertTrue('math' not in env.globals)
+        self.assertTrue('math' in env.modules)
+        self.assertTrue('_LX_import_module' in env.globals)
+        env.close()
+        self.assertEquals(True, a.closed)
+        self.assertEquals(True, env.globals['b'].closed)
+        self.assertEquals(0, len(wrapper._local.key_stack))
+
+
+#==============================================================================#
+class PooledEnvironmentFactory_TestCase(LtdExec_TestCaseBase):
+    def setUp(self):
+        super(PooledEnvironmentFactory_TestCase, self).setUp()
+        TestObj.clear_instances()
+        class MyDialect(Dialect):
+            EnvironmentFactory = PooledEnvironmentFactory
+            environment_pool_size = 2
+            objects = {
+                'a': wrapper.defname(TestObj, args=['a'],
+                                     method_on_close='close', reusable=True),
+                'b': wrapper.defname(TestObj, args=['b'],
+                                     method_on_close='close'),
+            }
+        self.dialect = MyDialect()
+        self.factory = self.dialect.env_factory
+
+    def tearDown(self):
+        self.factory.close()
+        super(PooledEnvironmentFactory_TestCase, self).tearDown()
+
+    def test_reuse(self):
+        with self.factory({'x': 1}) as env:
+            a, b = env.globals['a'], env.globals['b']
+            env.globals['y'] = 2
+        self.assertEquals(False, a.closed)
+        self.assertEquals(0, len(wrapper._local.key_stack))
+        with self.factory({'x': 3}) as env2:
+            self.assertTrue(env2 is env)
+            self.assertEquals(1, len(wrapper._local.key_stack))
+            self.assertTrue(env.globals['a'] is a)
+            self.assertFalse(env.globals['b'] is b)
+            self.assertEquals(True, b.closed)
+            self.assertEquals(3, env.globals['x'])
+            self.assertTrue('y' not in env.globals)
+        self.assertEquals((1, 1, 0, 1, 0), tuple(self.factory.stats()))
 
+    def test_close_closes_unreusable_objects(self):
+        env = self.factory({'x': 1})
+        a, b = env.globals['a'], env.globals['b']
+        run_globals = env.globals
+        env.close()
+        # Closed as soon as the run ends, not at the next lend.
+        self.assertEquals(True, b.closed)
+        self.assertEquals(False, a.closed)
+        self.assertTrue(env.globals['a'] is a)
+        self.assertFalse('b' in env.globals)
+        self.assertFalse('x' in env.globals)
+        self.assertFalse(env.globals is run_globals)
+        self.assertEquals(1, self.factory.stats().idle)
+        with self.factory() as env2:
+            self.assertTrue(env2 is env)
+            self.assertFalse(env.globals['b'] is b)
+            self.assertEquals(False, env.globals['b'].closed)
+
+    def test_failed_close_discards(self):
+        class ThrowingDialect(Dialect):
+            EnvironmentFactory = PooledEnvironmentFactory
+            objects = {'t': wrapper.defname(ThrowsOnClose, args=['t'],
+                                            method_on_close='close')}
+        factory = ThrowingDialect().env_factory
+        env = factory()
+        with self.assertRaises(RuntimeError):
+            env.close()
+        stats = factory.stats()
+        self.assertEquals((1, 0, 0), (stats.discards, stats.idle,
+                                      stats.leased))
+        self.assertEquals(0, len(wrapper._local.key_stack))
 
+    def test_bounded(self):
+        envs = [self.factory() for i in range(3)]
+        self.assertEquals(3, self.factory.stats().leased)
+        for env in envs:
+            env.close()
+        stats = self.factory.stats()
+        self.assertEquals((1, 2, 0), (stats.discards, stats.idle,
+                                      stats.leased))
+        self.assertEquals(True, envs[2].globals['a'].closed)
+        self.assertEquals(0, len(wrapper._local.key_stack))
+
+    def test_fill_and_close(self):
+        self.factory.fill()
+        self.assertEquals(2, self.factory.stats().idle)
+        self.factory.close()
+        self.assertEquals(0, self.factory.stats().idle)
+        self.assertEquals(True, TestObj.instances['a'].closed)
+        self.assertEquals(0, len(wrapper._local.key_stack))
 
-#==============================================================================#
\ No newline at end of file
+    def test_failed_reset_discards(self):
+        env = self.factory()
+        env.close()
+        env.validate = lambda: False
+        env2 = self.factory()
+        self.assertFalse(env2 is env)
+        env2.close()
+        stats = self.factory.stats()
+        self.assertEquals((0, 2, 1), (stats.hits, stats.misses,
+                                      stats.discards))
+        self.assertEquals(0, len(wrapper._local.key_stack))
+
+    def test_reuse_with_overridden_object(self):
+        script = self.dialect.compile('y = a', 'my_file')
+        for i in range(5):
+            self.assertEquals(i, script.run({'a': i}).globals['y'])
+        stats = self.factory.stats()
+        self.assertEquals((4, 1, 0), (stats.hits, stats.misses,
+                                      stats.discards))
+
+    def test_run_in_threads(self):
+        script = self.dialect.compile('y = x * 2', 'my_file')
+        results = {}
+        def work(n):
+            results[n] = [script.run({'x': n + i}).globals['y']
+                          for i in range(50)]
+        threads = [threading.Thread(target=work, args=(n,))
+                   for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for n in range(4):
+            self.assertEquals([2 * (n + i) for i in range(50)], results[n])
+        stats = self.factory.stats()
+        self.assertEquals(200, stats.hits + stats.misses)
+        self.assertEquals(0, stats.leased)
+
+
+#==============================================================================#
@@ -3,6 +3,7 @@ import sys
 import traceback
 import textwrap
 import ast
+import pickle
 import __builtin__
 
 from ltdexec import exceptions
@@ -130,4 +131,15 @@ class SanitizeTraceback_TestCase(LtdExec_TestCaseBase):
         self.assertEquals(None, tb_text)
 
 
-#
\ No newline at end of file
+#==============================================================================#
+class SyntaxError_TestCase(LtdExec_TestCaseBase):
+    def test_pickle(self):
+        e = exceptions.SyntaxError('msg', 'my_file', 3, 4, 'x = 1\n',
+                                   'forbidden_name')
+        e2 = pickle.loads(pickle.dumps(e, pickle.HIGHEST_PROTOCOL))
+        self.assertEquals(exceptions.SyntaxError, type(e2))
+        self.assertEquals(e.args, e2.args)
+        self.assertEquals('forbidden_name', e2.reason)
+        self.assertEquals(3, e2.lineno)
+
+#==============================================================================#
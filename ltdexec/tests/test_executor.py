@@ -0,0 +1,398 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from ltdexec import exceptions, wrapper
+from ltdexec.dialect import Dialect, registry
+from ltdexec.executor import (Future, ScriptExecutor, ProcessScriptExecutor,
+                              ProcessResult, ForkExecutor,
+                              resident_memory)
+from ltdexec.outputs import OutputSchema
+
+from .base import LtdExec_TestCaseBase
+
+#==============================================================================#
+class Future_TestCase(LtdExec_TestCaseBase):
+    def test_result(self):
+        future = Future()
+        self.assertFalse(future.done())
+        self.assertTrue(future.set_running_or_notify_cancel())
+        self.assertTrue(future.running())
+        future.set_result(3)
+        self.assertTrue(future.done())
+        self.assertEquals(3, future.result())
+        self.assertEquals(None, future.exception())
+
+    def test_exception(self):
+        future = Future()
+        try:
+            raise KeyError('x')
+        except KeyError:
+            future.set_exc_info(sys.exc_info())
+        self.assertTrue(isinstance(future.exception(), KeyError))
+        with self.assertRaises(KeyError):
+            future.result()
+
+    def test_callbacks(self):
+        future = Future()
+        called = []
+        future.add_done_callback(called.append)
+        self.assertEquals([], called)
+        future.set_result(1)
+        self.assertEquals([future], called)
+        future.add_done_callback(called.append)
+        self.assertEquals([future, future], called)
+
+    def test_cancel(self):
+        future = Future()
+        self.assertTrue(future.cancel())
+        self.assertTrue(future.cancelled())
+        self.assertFalse(future.set_running_or_notify_cancel())
+        with self.assertRaises(exceptions.CancelledError):
+            future.result()
+
+    def test_cannot_cancel_running(self):
+        future = Future()
+        future.set_running_or_notify_cancel()
+        self.assertFalse(future.cancel())
+
+    def test_cancel_running(self):
+        future = Future()
+        future.set_running_or_notify_cancel()
+        stopped = []
+        future.set_canceller(lambda: stopped.append(True))
+        self.assertTrue(future.cancel())
+        self.assertEquals([True], stopped)
+        self.assertFalse(future.set_result(1))
+        with self.assertRaises(exceptions.CancelledError):
+            future.result()
+
+    def test_set_once(self):
+        future = Future()
+        self.assertTrue(future.set_result(1))
+        self.assertFalse(future.set_exc_info((KeyError, KeyError(), None)))
+        self.assertEquals(1, future.result())
+
+    def test_timeout(self):
+        future = Future()
+        with self.assertRaises(exceptions.TimeoutError):
+            future.result(timeout=0.01)
+        threading.Timer(0.01, future.set_result, (2,)).start()
+        self.assertEquals(2, future.result(timeout=5))
+
+#==============================================================================#
+class ScriptExecutor_TestCase(LtdExec_TestCaseBase):
+    def test_submit(self):
+        s = Dialect.compile('y = x + 1', 'my_file')
+        with ScriptExecutor(max_workers=2) as executor:
+            future = executor.submit(s, {'x': 1})
+            self.assertEquals(2, future.result().globals['y'])
+
+    def test_submit_exception(self):
+        s = Dialect.compile('y = 1 / x', 'my_file')
+        with ScriptExecutor(max_workers=2) as executor:
+            result = executor.submit(s, {'x': 0}).result()
+            self.assertTrue(result.exception)
+            self.assertTrue(result.exc_info[0] is ZeroDivisionError)
+
+    def test_submit_call_exception(self):
+        with ScriptExecutor(max_workers=1) as executor:
+            future = executor.submit_call(int, 'x')
+            with self.assertRaises(ValueError):
+                future.result()
+
+    def test_map(self):
+        s = Dialect.compile('y = x * 2', 'my_file')
+        with ScriptExecutor(max_workers=3) as executor:
+            results = executor.map(s, ({'x': i} for i in range(20)))
+            self.assertEquals(range(0, 40, 2),
+                              [r.globals['y'] for r in results])
+
+    def test_shutdown(self):
+        executor = ScriptExecutor(max_workers=1)
+        future = executor.submit_call(time.sleep, 0.01)
+        executor.shutdown()
+        self.assertTrue(future.done())
+        with self.assertRaises(RuntimeError):
+            executor.submit_call(time.sleep, 0)
+
+    def test_invalid_max_workers(self):
+        with self.assertRaises(ValueError):
+            ScriptExecutor(max_workers=0)
+
+    def test_no_cross_talk(self):
+        class MyDialect(Dialect):
+            objects = {'double': wrapper.deffunc(lambda v: v * 2)}
+        s = MyDialect.compile('y = double(x)\nz = [x] * 3', 'my_file')
+        with ScriptExecutor(max_workers=8) as executor:
+            futures = [executor.submit(s, {'x': i}) for i in range(400)]
+            for i, future in enumerate(futures):
+                result = future.result()
+                self.assertEquals(i * 2, result.globals['y'])
+                self.assertEquals([i] * 3, result.globals['z'])
+        self.assertEquals([], wrapper._local.key_stack)
+
+#==============================================================================#
+class RegistryThreads_TestCase(LtdExec_TestCaseBase):
+    def test_single_instance(self):
+        class MyDialect(Dialect):
+            pass
+        # Forget the instance, so that the threads race to construct it.
+        registry.dialects.unregister(MyDialect.name)
+        registry.dialects.register(MyDialect)
+        instances = []
+        def lookup():
+            instances.append(registry.dialects[MyDialect.name])
+        threads = [threading.Thread(target=lookup) for i in range(16)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEquals(16, len(instances))
+        self.assertEquals(1, len(set(id(d) for d in instances)))
+
+#==============================================================================#
+class ProcessScriptExecutor_TestCase(LtdExec_TestCaseBase):
+    def setUp(self):
+        super(ProcessScriptExecutor_TestCase, self).setUp()
+        class MyDialect(Dialect):
+            objects = {'double': wrapper.deffunc(lambda v: v * 2)}
+            allow_statement_import = True
+        self.dialect = MyDialect
+        self.executor = ProcessScriptExecutor(max_workers=2)
+
+    def tearDown(self):
+        self.executor.shutdown()
+        super(ProcessScriptExecutor_TestCase, self).tearDown()
+
+    def test_submit(self):
+        s = self.dialect.compile('import math\ny = double(x)', 'my_file')
+        result = self.executor.submit(s, {'x': 4}).result(timeout=30)
+        self.assertTrue(isinstance(result, ProcessResult))
+        self.assertFalse(result.exception)
+        self.assertEquals(8, result.globals['y'])
+        self.assertEquals(4, result.globals['x'])
+        # The dialect's objects and modules are not sent back.
+        self.assertFalse('double' in result.globals)
+        self.assertFalse('math' in result.globals)
+
+    def test_map(self):
+        s = self.dialect.compile('y = [double(x)]', 'my_file')
+        results = self.executor.map(s, ({'x': i} for i in range(50)))
+        self.assertEquals([[2 * i] for i in range(50)],
+                          [r.globals['y'] for r in results])
+
+    def test_exception(self):
+        s = self.dialect.compile('y = 1\nz = y / x', 'my_file')
+        result = self.executor.submit(s, {'x': 0}).result(timeout=30)
+        self.assertTrue(result.exception)
+        self.assertEquals('ZeroDivisionError', result.exception_type)
+        self.assertTrue(result.traceback.startswith('Traceback'))
+        self.assertTrue('File "my_file", line 2' in result.traceback)
+        self.assertTrue('z = y / x' in result.traceback)
+        self.assertEquals(1, result.globals['y'])
+
+    def test_outputs(self):
+        s = self.dialect.compile('y = double(x)', 'my_file')
+        schema = OutputSchema([('y', int)])
+        result = self.executor.submit(s, {'x': 3}, schema).result(timeout=30)
+        self.assertEquals({'y': 6}, result.outputs)
+        self.assertEquals({}, result.globals)
+
+    def test_setup_error(self):
+        class ObjDialect(Dialect):
+            objects = {'obj': wrapper.defname(int, args=['x'])}
+        executor = ProcessScriptExecutor(max_workers=1)
+        try:
+            s = ObjDialect.compile('y = obj', 'my_file')
+            with self.assertRaises(ValueError):
+                executor.submit(s).result(timeout=30)
+        finally:
+            executor.shutdown()
+
+    def test_unpicklable_globals(self):
+        s = self.dialect.compile('y = x', 'my_file')
+        with self.assertRaises(Exception):
+            self.executor.submit(s, {'x': lambda: 1})
+
+    def test_pickle_result(self):
+        import pickle
+        result = ProcessResult(True, 'KeyError', 'Traceback', None, None)
+        copy = pickle.loads(pickle.dumps(result, 2))
+        self.assertTrue(copy.exception)
+        self.assertEquals('Traceback', copy.traceback)
+        self.assertEquals({}, copy.globals)
+
+    def test_shutdown(self):
+        self.executor.shutdown()
+        s = self.dialect.compile('y = x', 'my_file')
+        with self.assertRaises(RuntimeError):
+            self.executor.submit(s, {'x': 1})
+
+#==============================================================================#
+def _crash_once(path):
+    # Exit the worker process the first time it is called for *path*.
+    if not os.path.exists(path):
+        open(path, 'w').close()
+        os._exit(1)
+    return 1
+
+class WorkerRecycling_TestCase(LtdExec_TestCaseBase):
+    def setUp(self):
+        super(WorkerRecycling_TestCase, self).setUp()
+        class MyDialect(Dialect):
+            objects = {'getpid': wrapper.deffunc(os.getpid),
+                       'crash': wrapper.deffunc(lambda: os._exit(1)),
+                       'crash_once': wrapper.deffunc(_crash_once)}
+        self.dialect = MyDialect
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        super(WorkerRecycling_TestCase, self).tearDown()
+
+    def test_resident_memory(self):
+        rss = resident_memory()
+        if os.path.exists('/proc/self/statm'):
+            self.assertTrue(rss > 0)
+        else:
+            self.assertEquals(None, rss)
+
+    def test_retire_after_runs(self):
+        s = self.dialect.compile('pid = getpid()', 'my_file')
+        with ProcessScriptExecutor(max_workers=1,
+                                   max_runs_per_worker=2) as executor:
+            pids = [r.globals['pid'] for r in executor.map(s, [{}] * 5)]
+            stats = executor.stats()
+        self.assertEquals(pids[0], pids[1])
+        self.assertEquals(pids[2], pids[3])
+        self.assertEquals(3, len(set(pids)))
+        self.assertEquals(5, stats.runs)
+        self.assertEquals(2, stats.retired_runs)
+        self.assertEquals(3, stats.started)
+
+    @unittest.skipIf(resident_memory() is None, '/proc/self/statm is missing')
+    def test_retire_above_rss(self):
+        s = self.dialect.compile('pid = getpid()', 'my_file')
+        with ProcessScriptExecutor(max_workers=1,
+                                   max_worker_rss=1) as executor:
+            pids = [r.globals['pid'] for r in executor.map(s, [{}] * 3)]
+            stats = executor.stats()
+        self.assertEquals(3, len(set(pids)))
+        self.assertEquals(3, stats.retired_rss)
+        self.assertEquals(0, stats.retired_runs)
+
+    def test_retry_after_crash(self):
+        s = self.dialect.compile('y = crash_once(path)', 'my_file')
+        path = os.path.join(self.tmpdir, 'crashed')
+        with ProcessScriptExecutor(max_workers=1) as executor:
+            result = executor.submit(s, {'path': path}).result(timeout=30)
+            stats = executor.stats()
+        self.assertEquals(1, result.globals['y'])
+        self.assertEquals(1, stats.crashes)
+        self.assertEquals(1, stats.retries)
+        self.assertEquals(2, stats.started)
+
+    def test_crash_after_retries(self):
+        s = self.dialect.compile('crash()', 'my_file')
+        ok = self.dialect.compile('y = 2', 'my_file')
+        with ProcessScriptExecutor(max_workers=1, max_retries=2) as executor:
+            with self.assertRaises(exceptions.WorkerError):
+                executor.submit(s).result(timeout=30)
+            # The executor goes on with a new worker.
+            result = executor.submit(ok).result(timeout=30)
+            stats = executor.stats()
+        self.assertEquals(2, result.globals['y'])
+        self.assertEquals(3, stats.crashes)
+        self.assertEquals(2, stats.retries)
+        self.assertEquals(1, stats.runs)
+
+#==============================================================================#
+_counter = [0]
+
+def _count():
+    _counter[0] += 1
+    return _counter[0]
+
+class ForkExecutor_TestCase(LtdExec_TestCaseBase):
+    def setUp(self):
+        super(ForkExecutor_TestCase, self).setUp()
+        class MyDialect(Dialect):
+            objects = {'getpid': wrapper.deffunc(os.getpid),
+                       'count': wrapper.deffunc(_count),
+                       'crash': wrapper.deffunc(lambda: os._exit(1))}
+        self.dialect = MyDialect
+        self.executor = ForkExecutor(max_workers=3)
+
+    def tearDown(self):
+        self.executor.shutdown()
+        super(ForkExecutor_TestCase, self).tearDown()
+
+    def test_submit(self):
+        s = self.dialect.compile('y = x * 2', 'my_file')
+        result = self.executor.submit(s, {'x': 4}).result(timeout=30)
+        self.assertEquals(8, result.globals['y'])
+        self.assertTrue(result.latency > 0)
+
+    def test_isolation(self):
+        s = self.dialect.compile('n = count()\npid = getpid()', 'my_file')
+        results = list(self.executor.map(s, [{}] * 10))
+        # Every run starts from the zygote's state, in its own process.
+        self.assertEquals([1] * 10, [r.globals['n'] for r in results])
+        self.assertEquals(10, len(set(r.globals['pid'] for r in results)))
+        self.assertFalse(os.getpid() in [r.globals['pid'] for r in results])
+        stats = self.executor.stats()
+        self.assertEquals(10, stats.runs)
+        self.assertTrue(0 < stats.mean_latency <= stats.max_latency)
+
+    def test_exception(self):
+        s = self.dialect.compile('y = 1 / x', 'my_file')
+        result = self.executor.submit(s, {'x': 0}).result(timeout=30)
+        self.assertTrue(result.exception)
+        self.assertEquals('ZeroDivisionError', result.exception_type)
+        self.assertTrue('y = 1 / x' in result.traceback)
+
+    def test_crash(self):
+        s = self.dialect.compile('crash()', 'my_file')
+        with self.assertRaises(exceptions.WorkerError):
+            self.executor.submit(s).result(timeout=30)
+        s = self.dialect.compile('y = 1', 'my_file')
+        self.assertEquals(1, self.executor.submit(s).result(timeout=30)
+                                 .globals['y'])
+        stats = self.executor.stats()
+        self.assertEquals(1, stats.crashes)
+        self.assertEquals(1, stats.runs)
+
+    def test_shutdown(self):
+        s = self.dialect.compile('y = x', 'my_file')
+        futures = [self.executor.submit(s, {'x': i}) for i in range(5)]
+        self.executor.shutdown()
+        self.assertEquals(range(5), [f.result().globals['y']
+                                     for f in futures])
+        with self.assertRaises(RuntimeError):
+            self.executor.submit(s, {'x': 1})
+
+    def test_large_jobs_from_threads(self):
+        # Sending a large job must not stop the results of others, which
+        # are large too, from being read.
+        s = self.dialect.compile('y = x * 2', 'my_file')
+        futures = {}
+        def submit(n):
+            for i in range(5):
+                x = str(n * 5 + i) * 2 ** 19
+                futures[x] = self.executor.submit(s, {'x': x})
+        threads = [threading.Thread(target=submit, args=(n,))
+                   for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEquals(20, len(futures))
+        for x, future in futures.items():
+            self.assertEquals(x * 2, future.result(timeout=60).globals['y'])
+
+#==============================================================================#
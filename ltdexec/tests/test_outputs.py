@@ -0,0 +1,134 @@
+import array
+import pickle
+import unittest
+
+from ltdexec.dialect import Dialect
+from ltdexec.outputs import OutputSchema
+from ltdexec import exceptions, outputs
+
+from .base import LtdExec_TestCaseBase
+
+#==============================================================================#
+class OutputSchema_TestCase(LtdExec_TestCaseBase):
+    def setUp(self):
+        super(OutputSchema_TestCase, self).setUp()
+        self.schema = OutputSchema([('total', float), ('count', int),
+                                    ('label', str), ('extra', None)])
+
+    def test_extract(self):
+        namespace = {'total': 2, 'count': 3, 'label': 'x', 'extra': [1],
+                     'other': 4}
+        self.assertEquals({'total': 2.0, 'count': 3, 'label': 'x',
+                           'extra': [1]},
+                          self.schema.extract(namespace))
+        self.assertTrue(isinstance(self.schema.extract(namespace)['total'],
+                                   float))
+
+    def test_missing(self):
+        with self.assertRaises(exceptions.OutputError) as cm:
+            self.schema.extract({'total': 1.0, 'label': 'x', 'extra': 0})
+        self.assertEquals('count', cm.exception.name)
+
+    def test_wrong_type(self):
+        with self.assertRaises(exceptions.OutputError) as cm:
+            self.schema.extract({'total': '1', 'count': 1, 'label': 'x',
+                                 'extra': 0})
+        self.assertEquals('total', cm.exception.name)
+
+    def test_mapping(self):
+        schema = OutputSchema({'b': int, 'a': float})
+        self.assertEquals(('a', 'b'), schema.names)
+
+    def test_duplicate_names(self):
+        with self.assertRaises(ValueError):
+            OutputSchema([('a', int), ('a', float)])
+
+    def test_error_pickle(self):
+        e = exceptions.OutputError('message', 'total')
+        e2 = pickle.loads(pickle.dumps(e))
+        self.assertEquals(('message', 'total'), (str(e2), e2.name))
+
+#==============================================================================#
+class OutputColumns_TestCase(LtdExec_TestCaseBase):
+    def test_storage(self):
+        columns = OutputSchema([('a', int), ('b', float),
+                                ('c', str)]).columns()
+        columns.append({'a': 1, 'b': 2.5, 'c': 'x'})
+        columns.append_error((None, None, None))
+        self.assertEquals(2, len(columns))
+        self.assertTrue(isinstance(columns['a'], array.array))
+        self.assertEquals([1, 0], columns['a'].tolist())
+        self.assertEquals([2.5, 0.0], columns['b'].tolist())
+        self.assertEquals(['x', None], columns['c'])
+        self.assertEquals([1], columns.errors.keys())
+
+    def test_unfinished_row(self):
+        columns = OutputSchema([('a', float), ('b', int)]).columns()
+        with self.assertRaises(OverflowError):
+            columns.append({'a': 1.0, 'b': 2 ** 100})
+        self.assertEquals(0, len(columns))
+        self.assertEquals(0, len(columns['a']))
+
+    @unittest.skipIf(outputs.numpy is None, 'NumPy is not installed.')
+    def test_to_numpy(self):
+        columns = OutputSchema([('a', int), ('b', bool)]).columns()
+        columns.append({'a': 1, 'b': True})
+        arrays = columns.to_numpy()
+        self.assertEquals([1], arrays['a'].tolist())
+        self.assertEquals([True], arrays['b'].tolist())
+
+#==============================================================================#
+class ScriptOutputs_TestCase(LtdExec_TestCaseBase):
+    def setUp(self):
+        super(ScriptOutputs_TestCase, self).setUp()
+        self.schema = OutputSchema([('total', float), ('n', int)])
+        self.script = Dialect.compile(
+            'def f(v):\n    return v * 2\ntotal = f(x)\nn = int(x)', 'my_file')
+
+    def test_run(self):
+        result = self.script.run({'x': 3}, self.schema)
+        self.assertFalse(result.exception)
+        self.assertEquals({'total': 6.0, 'n': 3}, result.outputs)
+        self.assertEquals({}, result.globals)
+
+    def test_run_invalid_output(self):
+        result = self.script.run({'x': 'a'}, self.schema)
+        self.assertTrue(result.exception)
+        self.assertTrue(isinstance(result.exc_info[1], ValueError))
+        result = self.script.run({'x': 1.5},
+                                 OutputSchema([('total', int)]))
+        self.assertTrue(isinstance(result.exc_info[1],
+                                   exceptions.OutputError))
+
+    def test_dialect_schema(self):
+        class MyDialect(Dialect):
+            output_schema = OutputSchema([('y', int)])
+        result = MyDialect.compile('y = x + 1', 'my_file').run({'x': 1})
+        self.assertEquals({'y': 2}, result.outputs)
+
+    def test_run_many(self):
+        results = list(self.script.run_many([{'x': 1}, {'x': 'a'}],
+                                            self.schema))
+        self.assertEquals({'total': 2.0, 'n': 1}, results[0].outputs)
+        self.assertEquals({}, results[0].globals)
+        self.assertTrue(isinstance(results[1].exc_info[1], ValueError))
+
+    def test_run_many_dialect_schema(self):
+        class MyDialect(Dialect):
+            output_schema = OutputSchema([('y', int)])
+        script = MyDialect.compile('y = x + 1', 'my_file')
+        results = script.run_many([{'x': 1}, {'x': 2}])
+        self.assertEquals([{'y': 2}, {'y': 3}], [r.outputs for r in results])
+
+    def test_run_columns(self):
+        columns = self.script.run_columns(
+            [{'x': 1}, {'x': 'a'}, {'x': 4}], self.schema)
+        self.assertEquals([2.0, 0.0, 8.0], columns['total'].tolist())
+        self.assertEquals([1, 0, 4], columns['n'].tolist())
+        self.assertEquals([1], columns.errors.keys())
+
+    def test_run_columns_needs_schema(self):
+        with self.assertRaises(ValueError):
+            self.script.run_columns([{'x': 1}])
+
+#==============================================================================#
@@ -0,0 +1,142 @@
+import ast
+import textwrap
+
+from ltdexec.dialect.base import Dialect
+from ltdexec.processor import passes
+from ltdexec.processor.transform import (TransformImportsAst,
+                                         TransformImportsPass)
+from ltdexec.processor.validator import ValidatorPass
+from ltdexec import exceptions
+
+from .base import LtdExec_TestCaseBase
+
+#==============================================================================#
+class RecordingPass(passes.NodePass):
+    def __init__(self, node_types=None):
+        self.node_types = node_types
+        self.seen = []
+
+    def visit(self, node):
+        self.seen.append(node.__class__.__name__)
+        return True
+
+class DuplicatingPass(passes.NodePass):
+    # Replaces each Pass statement with two Break statements.
+    node_types = (ast.Pass,)
+    replaces_nodes = True
+
+    def visit(self, node):
+        return [ast.Break(), ast.Break()]
+
+class SkippingPass(RecordingPass):
+    def visit(self, node):
+        super(SkippingPass, self).visit(node)
+        return not isinstance(node, ast.FunctionDef)
+
+#==============================================================================#
+class PassManager_TestCase(LtdExec_TestCaseBase):
+    def test_groups(self):
+        a, b = RecordingPass(), RecordingPass()
+        t = passes.TreePass(lambda tree: tree)
+        manager = passes.PassManager([a, b, t, a])
+        self.assertEquals([[a, b], [t], [a]], manager.groups())
+
+    def test_visit_order(self):
+        tree = ast.parse('x = f(y)\nz = 1')
+        p = RecordingPass()
+        passes.PassManager([p, RecordingPass()])(tree)
+        expected = [n.__class__.__name__ for n in ast.walk(tree)
+                    if not passes.is_leaf_node_type(n.__class__)]
+        self.assertEquals(sorted(expected), sorted(p.seen))
+        self.assertEquals(['Module', 'Assign', 'Name', 'Call', 'Name', 'Name',
+                           'Assign', 'Name', 'Num'], p.seen)
+
+    def test_node_types(self):
+        tree = ast.parse('x = f(y)')
+        p = RecordingPass(node_types=(ast.Name,))
+        passes.PassManager([p, RecordingPass()])(tree)
+        self.assertEquals(['Name', 'Name', 'Name'], p.seen)
+
+    def test_skip_children(self):
+        tree = ast.parse('def f():\n    x = 1\ny = 2')
+        skipping, recording = SkippingPass(), RecordingPass()
+        passes.PassManager([skipping, recording])(tree)
+        self.assertEquals(['Module', 'FunctionDef', 'Assign', 'Name', 'Num'],
+                          skipping.seen)
+        self.assertEquals(2, recording.seen.count('Num'))
+
+    def test_replacement(self):
+        tree = ast.parse('while x:\n    pass\n    y\n    pass')
+        before, after = RecordingPass(), RecordingPass()
+        passes.PassManager([before, DuplicatingPass(), after])(tree)
+        body = tree.body[0].body
+        self.assertEquals(['Break', 'Break', 'Expr', 'Break', 'Break'],
+                          [n.__class__.__name__ for n in body])
+        self.assertFalse('Break' in before.seen)
+        self.assertEquals(2, before.seen.count('Pass'))
+        self.assertEquals(4, after.seen.count('Break'))
+        self.assertFalse('Pass' in after.seen)
+
+    def test_modified(self):
+        validating = ValidatorPass(Dialect().AstValidator(Dialect()))
+        manager = passes.PassManager([validating])
+        manager(ast.parse('x = 1'))
+        self.assertFalse(manager.modified)
+        manager = passes.PassManager([validating, TransformImportsPass()])
+        manager(ast.parse('x = 1'))
+        self.assertFalse(manager.modified)
+        manager = passes.PassManager([TransformImportsPass()])
+        manager(ast.parse('import math'))
+        self.assertTrue(manager.modified)
+        manager = passes.PassManager([RecordingPass()])
+        manager(ast.parse('x = 1'))
+        self.assertTrue(manager.modified)
+
+    def test_replace_non_statement(self):
+        class BadPass(passes.NodePass):
+            node_types = (ast.Name,)
+            replaces_nodes = True
+            def visit(self, node):
+                return []
+        with self.assertRaises(exceptions.InternalError):
+            passes.PassManager([BadPass()])(ast.parse('x'))
+
+#==============================================================================#
+class FusedProcessing_TestCase(LtdExec_TestCaseBase):
+    def setUp(self):
+        super(FusedProcessing_TestCase, self).setUp()
+        class MyDialect(Dialect):
+            allow_statement_import = True
+            allow_statement_import_from = True
+        self.dialect = MyDialect()
+
+    def test_default_passes(self):
+        ast_passes = self.dialect.compiler.processor.ast_passes()
+        self.assertEquals([ValidatorPass, TransformImportsPass],
+                          [type(p) for p in ast_passes])
+        manager = passes.PassManager(ast_passes)
+        self.assertEquals(1, len(manager.groups()))
+
+    def test_same_as_sequential(self):
+        src = textwrap.dedent("""\
+            import math, os.path as p
+            def f(x):
+                from math import sqrt, pi as PI
+                if x:
+                    import string
+                return sqrt(x)
+            """)
+        expected = TransformImportsAst().visit(ast.parse(src))
+        processor = self.dialect.compiler.processor
+        tree = processor.process_ast(ast.parse(src))
+        self.assertEquals(ast.dump(expected, include_attributes=True),
+                          ast.dump(tree, include_attributes=True))
+
+    def test_validation_errors(self):
+        processor = self.dialect.compiler.processor
+        with self.assertRaises(exceptions.SyntaxError) as cm:
+            processor.process_ast(ast.parse('import math\nx = _LX_import_module'))
+        self.assertEquals('private_prefix_name', cm.exception.reason)
+        self.assertEquals(2, cm.exception.lineno)
+
+#==============================================================================#
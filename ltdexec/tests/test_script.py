@@ -1,7 +1,9 @@
 import unittest
+import pickle
+import traceback
 
-from ltdexec import script, source, wrapper
-from ltdexec.dialect import Dialect
+from ltdexec import compiler, script, source, wrapper, exceptions
+from ltdexec.dialect import Dialect, registry
 
 from .base import LtdExec_TestCaseBase
 from .util import TestObj, ThrowingTestObj, ThrowsOnClose
@@ -75,7 +77,7 @@ class Script_TestCase(LtdExec_TestCaseBase):
                 'd': wrapper.defname(TestObj, args=['d']),
             }
 
-        text = 'x = 5'
+        text = 'x = (a, b, c, d)'
         filename = '<script>'
         mode = 'exec'
         co = compile(text, filename=filename, mode=mode)
@@ -94,5 +96,243 @@ class Script_TestCase(LtdExec_TestCaseBase):
         self.assertEquals(False, TestObj.instances['b'].closed)
         self.assertTrue('d' not in TestObj.instances)
 
+    def test_shared_env_factory(self):
+        text = 'x = 7'
+        scripts = [script.Script(compile(text, '<script>', 'exec'),
+                                 source.Source(text, '<script>'), Dialect)
+                   for i in range(2)]
+        self.assertTrue(scripts[0].env_factory is scripts[1].env_factory)
+        self.assertTrue(scripts[0].env_factory is Dialect().env_factory)
+
+    def test_slots(self):
+        text = 'x = 7'
+        src = source.Source(text, '<script>')
+        my_script = script.Script(compile(text, '<script>', 'exec'), src,
+                                  Dialect)
+        result = my_script.run()
+        for obj in (src, my_script, result):
+            self.assertFalse(hasattr(obj, '__dict__'))
+
+    def test_result_owns_namespace(self):
+        s = Dialect.compile('x = 1\ndef inc():\n    global x\n    x += 1',
+                            'my_file')
+        result = s.run()
+        self.assertTrue(result.locals is result.globals)
+        self.assertFalse('_LX_import_module' in result.globals)
+        snapshot = result.snapshot()
+        self.assertTrue(snapshot.locals is snapshot.globals)
+        self.assertFalse(snapshot.globals is result.globals)
+        result.globals['inc']()
+        self.assertEquals(2, result.globals['x'])
+        self.assertEquals(1, snapshot.globals['x'])
+
+    def test_result_defaults(self):
+        result = script.Result()
+        self.assertEquals((None, False, (None, None, None), {}, {}),
+                          (result.result, result.exception, result.exc_info,
+                           result.globals, result.locals))
+
+
+class ScriptPickle_TestCase(LtdExec_TestCaseBase):
+    def setUp(self):
+        super(ScriptPickle_TestCase, self).setUp()
+        class MyDialect(Dialect):
+            pass
+        self.dialect = MyDialect()
+        self.script = self.dialect.compiler('x = 7\ny = x * 2', 'my_file')
+
+    def test_round_trip(self):
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            loaded = pickle.loads(pickle.dumps(self.script, protocol))
+            self.assertTrue(loaded.dialect is self.dialect)
+            self.assertEquals('my_file', loaded.filename)
+            self.assertEquals('y = x * 2', loaded.source[2])
+            self.assertEquals(14, loaded.run().globals['y'])
+
+    def test_mismatched_version(self):
+        func, args = self.script.__reduce__()
+        args = args[:5] + ((1, 5, 2),)
+        with self.assertRaises(exceptions.IncompatibleScriptError):
+            func(*args)
+
+    def test_mismatched_fingerprint(self):
+        data = pickle.dumps(self.script)
+        registry.dialects.unregister(self.dialect.name)
+        class MyDialect(Dialect):
+            allow_statement_import = True
+        with self.assertRaises(exceptions.IncompatibleScriptError):
+            pickle.loads(data)
+
+    def test_unregistered_dialect(self):
+        func, args = self.script.__reduce__()
+        args = args[:3] + ('NoSuchDialect',) + args[4:]
+        with self.assertRaises(exceptions.UnregisteredDialectError):
+            func(*args)
+
+
+class Expression_TestCase(LtdExec_TestCaseBase):
+    def test_evaluate(self):
+        expr = Dialect.compile_expression('price * qty * (1 - discount)')
+        self.assertTrue(isinstance(expr, script.Expression))
+        self.assertEquals(150.0, expr.evaluate({'price': 20, 'qty': 10,
+                                                'discount': 0.25}))
+        self.assertEquals(8, expr({'price': 2, 'qty': 4, 'discount': 0}))
+        self.assertEquals('<expression>', expr.filename)
+
+    def test_compile_function(self):
+        expr = compiler.compile_expression('x * 2', 'my_file', Dialect)
+        self.assertEquals('my_file', expr.filename)
+        self.assertEquals(6, expr({'x': 3}))
+
+    def test_function_objects(self):
+        class MyDialect(Dialect):
+            objects = {'double': wrapper.deffunc(lambda v: v * 2)}
+        expr = MyDialect.compile_expression('double(x)')
+        self.assertTrue(expr._namespace is not None)
+        self.assertEquals(6, expr({'x': 3}))
+
+    def test_namespace_not_shared(self):
+        expr = Dialect.compile_expression('x')
+        self.assertEquals(1, expr({'x': 1}))
+        with self.assertRaises(exceptions.ExecutionError) as cm:
+            expr()
+        self.assertEquals(NameError, cm.exception.exc_info[0])
+
+    def test_execution_error(self):
+        expr = Dialect.compile_expression('1 / x', 'my_file')
+        with self.assertRaises(exceptions.ExecutionError) as cm:
+            expr({'x': 0})
+        self.assertEquals(ZeroDivisionError, cm.exception.exc_info[0])
+        self.assertEquals('  File "my_file", line 1, in <module>\n',
+                          cm.exception.format_tb()[0].split('\n')[0] + '\n')
+
+    def test_environment_fallback(self):
+        TestObj.clear_instances()
+        class MyDialect(Dialect):
+            objects = {
+                'a': wrapper.defname(TestObj, args=['a'],
+                                     method_on_close='close'),
+            }
+        expr = MyDialect.compile_expression('a.name + x')
+        self.assertEquals('ab', expr({'x': 'b'}))
+        self.assertEquals(True, TestObj.instances['a'].closed)
+
+    def test_statements_rejected(self):
+        for src in ('x = 1', 'type(x)', 'import os'):
+            with self.assertRaises(exceptions.CompilationError):
+                Dialect.compile_expression(src)
+
+
+class ReferencedNames_TestCase(LtdExec_TestCaseBase):
+    def test_names(self):
+        s = Dialect.compile('def f():\n    return g(y.z)\nx = f()', 'my_file')
+        self.assertTrue(set(['f', 'g', 'x', 'y', 'z']) <=
+                        s.referenced_names)
+        self.assertFalse('q' in s.referenced_names)
 
-#==============================================================================#
\ No newline at end of file
+    def test_only_referenced_objects_constructed(self):
+        TestObj.clear_instances()
+        class MyDialect(Dialect):
+            objects = {
+                'a': wrapper.defname(TestObj, args=['a']),
+                'b': wrapper.defname(TestObj, args=['b']),
+                'c': wrapper.defname(TestObj, args=['c']),
+            }
+        s = MyDialect.compile('def f():\n    return c.name\nx = a.name + f()',
+                              'my_file')
+        result = s.run()
+        self.assertEquals('ac', result.globals['x'])
+        self.assertEquals(['a', 'c'], sorted(TestObj.instances))
+        self.assertTrue('b' not in result.globals)
+
+    def test_builtin_objects(self):
+        class MyDialect(Dialect):
+            forbidden_names = []
+        s = MyDialect.compile('x = getattr(3, "real")', 'my_file')
+        self.assertEquals(3, s.run().globals['x'])
+
+
+class RunMany_TestCase(LtdExec_TestCaseBase):
+    def test_results(self):
+        s = Dialect.compile('if x:\n    y = x * 2\nz = 1 / x', 'my_file')
+        results = list(s.run_many([{'x': 1}, {'x': 0}, {'x': 3}]))
+        self.assertEquals([False, True, False],
+                          [r.exception for r in results])
+        self.assertEquals(2, results[0].globals['y'])
+        self.assertTrue('y' not in results[1].globals)
+        self.assertEquals(6, results[2].globals['y'])
+        self.assertEquals(0, len(wrapper._local.key_stack))
+
+    def test_reuse_policy(self):
+        TestObj.clear_instances()
+        class MyDialect(Dialect):
+            objects = {
+                'a': wrapper.defname(TestObj, args=['a'],
+                                     method_on_close='close', reusable=True),
+                'b': wrapper.defname(TestObj, args=['b'],
+                                     method_on_close='close'),
+            }
+        s = MyDialect.compile('pair = (a, b)', 'my_file')
+        results = s.run_many([{}, {}])
+        first = next(results)
+        self.assertEquals(False, TestObj.instances['a'].closed)
+        second = next(results)
+        a, b = first.globals['pair']
+        self.assertTrue(second.globals['pair'][0] is a)
+        self.assertFalse(second.globals['pair'][1] is b)
+        self.assertEquals(True, b.closed)
+        self.assertEquals(False, a.closed)
+        results.close()
+        self.assertEquals(True, a.closed)
+        self.assertEquals(True, second.globals['pair'][1].closed)
+        self.assertEquals(0, len(wrapper._local.key_stack))
+
+
+class RunBatch_TestCase(LtdExec_TestCaseBase):
+    def test_outputs(self):
+        s = Dialect.compile('total = price * qty\nif qty > 2:\n    big = 1\n',
+                            'my_file')
+        rows = [{'price': 2, 'qty': 3}, {'price': 5, 'qty': 1}]
+        result = s.run_batch(rows, ['total', 'big'])
+        self.assertFalse(result.exception)
+        self.assertEquals({'total': [6, 5], 'big': [1, None]}, result.outputs)
+
+    def test_same_as_run(self):
+        src = 'def f(v):\n    return v + k\nk = 10\nout = [f(x), len(str(x))]'
+        s = Dialect.compile(src, 'my_file')
+        rows = [{'x': i} for i in xrange(5)]
+        result = s.run_batch(iter(rows), ['out'])
+        self.assertEquals([s.run(row).globals['out'] for row in rows],
+                          result.outputs['out'])
+
+    def test_errors(self):
+        s = Dialect.compile('y = 1\nz = 10 / x', 'my_file')
+        result = s.run_batch([{'x': 1}, {'x': 0}, {'x': 5}], ['z'])
+        self.assertTrue(result.exception)
+        self.assertEquals([10, None, 2], result.outputs['z'])
+        self.assertEquals([1], result.errors.keys())
+        exc_info = result.errors[1]
+        self.assertTrue(isinstance(exc_info[1], ZeroDivisionError))
+        self.assertEquals(2, traceback.extract_tb(exc_info[2])[-1][1])
+
+    def test_objects_constructed_once(self):
+        TestObj.clear_instances()
+        class MyDialect(Dialect):
+            objects = {
+                'a': wrapper.defname(TestObj, args=['a'],
+                                     method_on_close='close'),
+            }
+        s = MyDialect.compile('n = a.name + x', 'my_file')
+        result = s.run_batch([{'x': '1'}, {'x': '2'}], ['n'])
+        self.assertEquals(['a1', 'a2'], result.outputs['n'])
+        self.assertEquals(True, TestObj.instances['a'].closed)
+
+    def test_imports(self):
+        class MyDialect(Dialect):
+            allow_statement_import = True
+        s = MyDialect.compile('import math\ny = math.floor(x)', 'my_file')
+        result = s.run_batch([{'x': 1.5}, {'x': 2.5}], ['y'])
+        self.assertEquals([1.0, 2.0], result.outputs['y'])
+
+
+#==============================================================================#
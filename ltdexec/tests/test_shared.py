@@ -0,0 +1,119 @@
+import __builtin__
+
+from ltdexec.dialect import Dialect
+from ltdexec.shared import (SharedInputs, ReadOnlyMapping, ReadOnlySequence,
+                            readonly)
+from ltdexec import exceptions
+
+from .base import LtdExec_TestCaseBase
+
+#==============================================================================#
+class ReadOnly_TestCase(LtdExec_TestCaseBase):
+    def test_mapping(self):
+        data = {'a': [1, {'b': 2}]}
+        view = readonly(data)
+        self.assertTrue(isinstance(view, ReadOnlyMapping))
+        self.assertTrue(isinstance(view['a'], ReadOnlySequence))
+        self.assertTrue(isinstance(view['a'][1], ReadOnlyMapping))
+        self.assertEquals(2, view['a'][1]['b'])
+        self.assertEquals(['a'], list(view))
+        self.assertEquals(1, len(view))
+        with self.assertRaises(TypeError):
+            view['a'] = 1
+        data['c'] = 3
+        self.assertEquals(3, view.get('c'))
+
+    def test_sequence(self):
+        view = readonly([3, 1, 2])
+        self.assertEquals([1, 2, 3], sorted(view))
+        self.assertEquals([1, 2], list(view[1:]))
+        self.assertTrue(2 in view)
+        with self.assertRaises(TypeError):
+            view[0] = 1
+        with self.assertRaises(AttributeError):
+            view.append(4)
+
+    def test_other_values(self):
+        value = (1, 2)
+        self.assertTrue(readonly(value) is value)
+
+#==============================================================================#
+class SharedInputs_TestCase(LtdExec_TestCaseBase):
+    def setUp(self):
+        super(SharedInputs_TestCase, self).setUp()
+        class MyDialect(Dialect):
+            shared_names = ['prices', 'rate']
+        self.dialect = MyDialect()
+        self.prices = {'apple': 2, 'pear': 3}
+        self.shared = SharedInputs({'prices': self.prices, 'rate': 10})
+
+    def test_run(self):
+        s = self.dialect.compile(
+            'def cost(item):\n    return prices[item] * rate\n'
+            'total = cost(item) + len(prices)', 'my_file')
+        result = s.run({'item': 'pear'}, shared=self.shared)
+        self.assertFalse(result.exception)
+        self.assertEquals(32, result.globals['total'])
+        self.assertFalse('prices' in result.globals)
+        self.assertFalse('rate' in result.globals)
+
+    def test_function_attributes(self):
+        # Scripts do not run in restricted execution mode.
+        s = self.dialect.compile(
+            'def cost(item, factor=2):\n    return prices[item] * factor\n'
+            'name = cost.func_name\ndefaults = cost.func_defaults\n'
+            'total = cost("apple")', 'my_file')
+        result = s.run(shared=self.shared)
+        self.assertFalse(result.exception, result.exc_info)
+        self.assertEquals('cost', result.globals['name'])
+        self.assertEquals((2,), result.globals['defaults'])
+        self.assertEquals(4, result.globals['total'])
+
+    def test_not_in_result(self):
+        s = self.dialect.compile('y = prices["apple"] * rate', 'my_file')
+        for result in [s.run(shared=self.shared)] + list(
+                s.run_many([{}], shared=self.shared)):
+            self.assertEquals(20, result.globals['y'])
+            self.assertTrue(result.globals['__builtins__'] is __builtin__)
+            for value in result.globals.itervalues():
+                self.assertFalse(isinstance(value, (ReadOnlyMapping,
+                                                    ReadOnlySequence)))
+                self.assertFalse(value is self.prices)
+
+    def test_bindings(self):
+        s = self.dialect.compile('y = rate', 'my_file')
+        bindings = self.shared.bindings(s.referenced_names)
+        self.assertEquals({'rate': 10}, bindings)
+        self.assertTrue(self.shared.bindings(s.referenced_names) is bindings)
+
+    def test_not_copied(self):
+        s = self.dialect.compile('x = prices', 'my_file')
+        results = [s.run(shared=self.shared) for i in range(2)]
+        self.assertTrue(results[0].globals['x']._LX_data is self.prices)
+        self.assertTrue(results[1].globals['x']._LX_data is self.prices)
+
+    def test_cannot_modify(self):
+        s = self.dialect.compile('prices["apple"] = 0', 'my_file')
+        result = s.run(shared=self.shared)
+        self.assertTrue(result.exception)
+        self.assertTrue(isinstance(result.exc_info[1], TypeError))
+        self.assertEquals(2, self.prices['apple'])
+
+    def test_cannot_rebind(self):
+        for src in ('rate = 1', 'def f():\n    prices = {}',
+                    'for rate in x: pass'):
+            with self.assertRaises(exceptions.CompilationError):
+                self.dialect.compile(src, 'my_file')
+
+    def test_undeclared_names(self):
+        s = Dialect.compile('x = rate', 'my_file')
+        with self.assertRaises(ValueError):
+            s.run(shared=self.shared)
+
+    def test_run_many(self):
+        s = self.dialect.compile('y = prices[item]', 'my_file')
+        results = s.run_many([{'item': 'apple'}, {'item': 'pear'}],
+                             shared=self.shared)
+        self.assertEquals([2, 3], [r.globals['y'] for r in results])
+
+#==============================================================================#
@@ -55,3 +55,40 @@ class Source_TestCase(LtdExec_TestCaseBase):
             source[:0]
         self.assertEquals('x = 5\ny = 7', str(source))
         self.assertEquals('x = 5$y = 7', '$'.join(line for line in source))
+
+    def test_same_as_line_list(self):
+        texts = ['x = 5\n', 'x = 5\r\n\r\ny = 7\n\n', '\n\nz\n',
+                 u'x = u"\xe9"\ny = 2']
+        for compress in (False, True):
+            for text in texts:
+                source = Source(text, 'FILE', compress)
+                lines = text.splitlines()
+                self.assertEquals(len(lines), len(source))
+                self.assertEquals(lines, list(source))
+                self.assertEquals(lines, source.lines)
+                if not isinstance(text, unicode):
+                    self.assertEquals('\n'.join(lines), str(source))
+                self.assertEquals(text, source.text)
+                for i in range(1, len(lines) + 1):
+                    self.assertEquals(lines[i-1], source[i])
+                    self.assertEquals(lines[-i], source[-i])
+                    self.assertEquals(lines[i-1:], source[i:])
+                    self.assertEquals(lines[:i-1], source[:i])
+                    self.assertEquals(lines[::2], source[::2])
+                with self.assertRaises(IndexError):
+                    source[len(lines) + 1]
+
+    def test_lazy_offsets(self):
+        source = Source('x = 5\ny = 7', 'FILE')
+        self.assertEquals(None, source._offsets)
+        self.assertEquals('y = 7', source[2])
+        self.assertEquals([0, 6, 11], source._offsets.tolist())
+
+    def test_compressed(self):
+        text = 'x = 5\n' * 1000
+        source = Source(text, 'FILE', compress=True)
+        self.assertTrue(len(source._data) < len(text))
+        self.assertEquals(len(text), source.size)
+        self.assertEquals('x = 5', source[1000])
+
+#==============================================================================#
@@ -0,0 +1,97 @@
+import ast
+
+from ltdexec.dialect.base import Dialect
+from ltdexec.processor import validator
+from ltdexec import exceptions
+
+from .base import LtdExec_TestCaseBase
+
+#==============================================================================#
+class PrefilterSourceValidator_TestCase(LtdExec_TestCaseBase):
+    def setUp(self):
+        super(PrefilterSourceValidator_TestCase, self).setUp()
+        class MyDialect(Dialect):
+            SourceValidator = validator.PrefilterSourceValidator
+            allow_statement_import = True
+            allow_statement_import_from = True
+        self.dialect = MyDialect()
+        self.validator = validator.PrefilterSourceValidator(self.dialect)
+
+    def assertRejected(self, src, reason, lineno=1, offset=None):
+        with self.assertRaises(exceptions.SyntaxError) as cm:
+            self.validator(src)
+        self.assertEquals(reason, cm.exception.reason)
+        self.assertEquals(lineno, cm.exception.lineno)
+        if offset is not None:
+            self.assertEquals(offset, cm.exception.offset)
+
+    def test_accepts_clean_source(self):
+        self.validator('x = a.b(c)\ny = [i for i in x]\n')
+
+    def test_forbidden_name(self):
+        self.assertRejected('x = 1\nx = type(y)', 'forbidden_name', 2, 5)
+
+    def test_forbidden_attr(self):
+        self.assertRejected('x = a.__class__', 'forbidden_attr', 1, 7)
+        self.assertRejected('x = (a\n  .__class__)', 'forbidden_attr', 2)
+
+    def test_private_prefix(self):
+        self.assertRejected('_LX_x = 1', 'private_prefix_name', 1, 1)
+        self.assertRejected('a._LX_x', 'private_prefix_attr', 1, 3)
+
+    def test_same_reasons_as_ast_validator(self):
+        ast_validator = self.dialect.AstValidator(self.dialect)
+        for src in ('x = type(y)', 'a.__class__', '_LX_x', 'a._LX_y'):
+            with self.assertRaises(exceptions.SyntaxError) as cm:
+                ast_validator(ast.parse(src))
+            expected = cm.exception
+            with self.assertRaises(exceptions.SyntaxError) as cm:
+                self.validator(src)
+            self.assertEquals(expected.reason, cm.exception.reason)
+            self.assertEquals(expected.msg, cm.exception.msg)
+
+    def test_ignores_strings_and_comments(self):
+        self.validator('x = "type"  # type\ny = """\n_LX_x\n"""\n')
+
+    def test_ignores_non_names(self):
+        self.validator('def type(x):\n    pass\n')
+        self.validator('class type(object):\n    pass\n')
+        self.validator('f(type=1)\n')
+        self.validator('f(1,\n  type=1)\n')
+        self.validator('import type\nfrom type import open as type\n')
+        self.validator('x = 1; import type\n')
+
+    def test_star_parameters(self):
+        # The names of *args and **kwargs parameters are not Name nodes, so
+        # the AstValidator accepts them.
+        ast_validator = self.dialect.AstValidator(self.dialect)
+        for src in ('def g(*open): pass', 'def g(**open): pass',
+                    'def g(a,\n      *open, **type): pass',
+                    'lambda *open: 0', 'lambda **open: 0',
+                    'f(lambda x=(lambda *open: 1), *type: 0)'):
+            ast_validator(ast.parse(src))
+            self.validator(src)
+        for src in ('f(*open)', 'f(**open)', 'lambda *a: f(*open)',
+                    'def g(x=f(*open)): pass', 'def g(a=2 * open): pass',
+                    'lambda a=b ** open: 0'):
+            with self.assertRaises(exceptions.SyntaxError):
+                ast_validator(ast.parse(src))
+            self.assertRejected(src, 'forbidden_name')
+
+    def test_statement_after_import(self):
+        self.assertRejected('import x; y = type', 'forbidden_name')
+        self.assertRejected('import x\ny = type', 'forbidden_name', 2)
+
+    def test_tokenize_error(self):
+        # Errors in the source are left for the parser to report.
+        self.validator('x = (type\n')
+
+    def test_compiler(self):
+        with self.assertRaises(exceptions.CompilationError) as cm:
+            self.dialect.compile('x = 1\ny = type', 'my_file')
+        type, e, tb = cm.exception.exc_info
+        self.assertEquals('forbidden_name', e.reason)
+        self.assertEquals('my_file', e.filename)
+        self.assertEquals('y = type\n', e.text)
+
+#==============================================================================#
@@ -0,0 +1,82 @@
+import ast
+import textwrap
+
+from ltdexec.processor import split
+
+from .base import LtdExec_TestCaseBase
+
+#==============================================================================#
+class SourceSplitter_TestCase(LtdExec_TestCaseBase):
+    def setUp(self):
+        super(SourceSplitter_TestCase, self).setUp()
+        self.splitter = split.SourceSplitter()
+
+    def test_statements(self):
+        chunks = self.splitter('x = 1\ny = 2; z = 3\n\nw = 4')
+        self.assertEquals([(1, 'x = 1\n'), (2, 'y = 2; z = 3\n\n'),
+                           (4, 'w = 4')], chunks)
+
+    def test_compound_statements(self):
+        src = textwrap.dedent("""\
+            # leading comment
+            @dec
+            # between
+            @dec(1,
+            2)
+            def f():
+                pass
+            try:
+                pass
+            except:
+                pass
+            else:
+                pass
+            finally:
+                pass
+            if x:
+                pass
+            elif y:
+                pass
+            x = [
+            1]
+            """)
+        chunks = self.splitter(src)
+        self.assertEquals([1, 8, 16, 20], [c.lineno for c in chunks])
+        self.assertEquals(src, ''.join(c.text for c in chunks))
+        for chunk in chunks:
+            ast.parse(chunk.text)
+
+    def test_multiline_constructs(self):
+        src = ('x = """\ny = 1\n"""\n'
+               "z = 1 + \\\nw\n"
+               "u = ['a', # ) '\nv]\n"
+               "# ' (\n"
+               "t = r'\\\\'\n")
+        chunks = self.splitter(src)
+        self.assertEquals([1, 4, 6, 9], [c.lineno for c in chunks])
+        self.assertEquals(src, ''.join(c.text for c in chunks))
+        for chunk in chunks:
+            ast.parse(chunk.text)
+
+    def test_not_split(self):
+        for src in ('from __future__ import division\nx = 1\n',
+                    '# -*- coding: latin-1 -*-\nx = 1\n',
+                    'x = (1\ny = 2\n', 'x = )\ny = 2\n',
+                    'x = "a\ny = 2\n', 'x = 1\ry = 2\r', ''):
+            self.assertEquals([(1, src)], self.splitter(src))
+
+    def test_merge(self):
+        trees = [ast.parse('x = 1'), ast.parse('y = 2\nz = 3')]
+        tree = split.AstMerger()(trees)
+        self.assertEquals(3, len(tree.body))
+        self.assertTrue(isinstance(tree, ast.Module))
+
+    def test_shift_syntax_error(self):
+        try:
+            compile('x = (', 'f', 'exec')
+        except SyntaxError as e:
+            split.shift_syntax_error(e, 4)
+            self.assertEquals(5, e.lineno)
+            self.assertEquals(5, e.args[1][1])
+
+#==============================================================================#
@@ -0,0 +1,154 @@
+import ast
+import unittest
+
+from ltdexec.dialect import Dialect
+from ltdexec import exceptions, vectorize, wrapper
+
+from .base import LtdExec_TestCaseBase
+
+numpy = vectorize.numpy
+
+#==============================================================================#
+class VectorizableChecker_TestCase(LtdExec_TestCaseBase):
+    def check(self, src, functions=('abs',)):
+        return vectorize.is_vectorizable(src, functions)
+
+    def test_vectorizable(self):
+        self.assertTrue(self.check('price * qty * (1 - discount)'))
+        self.assertTrue(self.check('-x ** 2 // 3 % y'))
+        self.assertTrue(self.check('(a > 0) & (b != 2)'))
+        self.assertTrue(self.check('abs(x - 1)'))
+
+    def test_not_vectorizable(self):
+        self.assertFalse(self.check('a and b'))
+        self.assertFalse(self.check('not a'))
+        self.assertFalse(self.check('x if x > 0 else 0'))
+        self.assertFalse(self.check('0 < x < 1'))
+        self.assertFalse(self.check('x in y'))
+        self.assertFalse(self.check('len(x)'))
+        self.assertFalse(self.check('abs(x=1)'))
+        self.assertFalse(self.check('x.real'))
+        self.assertFalse(self.check('x[0]'))
+        self.assertFalse(self.check('"a" * x'))
+
+    def test_dialect_functions(self):
+        class MyDialect(Dialect):
+            vectorized_functions = {'abs': 'absolute', 'sqrt': 'sqrt'}
+        self.assertTrue(MyDialect.compile_expression('sqrt(x)').vectorizable)
+        self.assertFalse(Dialect.compile_expression('sqrt(x)').vectorizable)
+
+#==============================================================================#
+class EvaluateColumns_TestCase(LtdExec_TestCaseBase):
+    def setUp(self):
+        super(EvaluateColumns_TestCase, self).setUp()
+        self.dialect = Dialect()
+
+    def evaluate(self, src, columns, globals=None):
+        expr = self.dialect.compile_expression(src)
+        return list(expr.evaluate_columns(columns, globals))
+
+    def test_rows(self):
+        columns = {'price': [1.0, 2.0, 4.0], 'qty': [3, 2, 1]}
+        self.assertEquals([2.7, 3.6, 3.6],
+                          [round(v, 6) for v in self.evaluate(
+                              'price * qty * (1 - discount)', columns,
+                              {'discount': 0.1})])
+
+    def test_not_vectorizable(self):
+        self.assertEquals([0, 2, 0], self.evaluate('x if x > 1 else 0',
+                                                   {'x': [1, 2, 0]}))
+
+    def test_constant(self):
+        self.assertEquals([6, 6], self.evaluate('k * 2', {'x': [1, 2]},
+                                                {'k': 3}))
+
+    def test_column_lengths(self):
+        expr = self.dialect.compile_expression('x + y')
+        with self.assertRaises(ValueError):
+            expr.evaluate_columns({'x': [1, 2], 'y': [1]})
+        with self.assertRaises(ValueError):
+            expr.evaluate_columns({})
+
+    def test_errors_reported_per_row(self):
+        expr = self.dialect.compile_expression('1 / x')
+        with self.assertRaises(exceptions.ExecutionError) as cm:
+            expr.evaluate_columns({'x': [1, 0, 2]})
+        self.assertTrue(isinstance(cm.exception.exc_info[1],
+                                   ZeroDivisionError))
+
+    def test_function_objects(self):
+        class MyDialect(Dialect):
+            objects = {'double': wrapper.deffunc(lambda v: v * 2)}
+        expr = MyDialect.compile_expression('double(x) + 1')
+        self.assertFalse(expr.vectorizable)
+        self.assertEquals([3, 5], list(expr.evaluate_columns({'x': [1, 2]})))
+
+#==============================================================================#
+@unittest.skipIf(numpy is None, 'NumPy is not installed.')
+class VectorizedEvaluation_TestCase(LtdExec_TestCaseBase):
+    def test_arrays(self):
+        expr = Dialect.compile_expression('abs(x - y) * 2')
+        x = numpy.arange(5)
+        y = numpy.ones(5)
+        value = expr.evaluate_columns({'x': x, 'y': y})
+        self.assertTrue(isinstance(value, numpy.ndarray))
+        self.assertEquals([2, 0, 2, 4, 6], value.tolist())
+
+    def test_comparison(self):
+        expr = Dialect.compile_expression('(x > 1) & (x < 4)')
+        value = expr.evaluate_columns({'x': numpy.arange(5)})
+        self.assertEquals([False, False, True, True, False], value.tolist())
+
+    def test_same_as_rows(self):
+        expr = Dialect.compile_expression('price * qty * (1 - discount)')
+        columns = {'price': numpy.linspace(1, 2, 7),
+                   'qty': numpy.arange(7)}
+        value = expr.evaluate_columns(columns, {'discount': 0.25})
+        expected = [expr.evaluate({'price': p, 'qty': q, 'discount': 0.25})
+                    for p, q in zip(columns['price'], columns['qty'])]
+        self.assertEquals(expected, value.tolist())
+
+    def test_integer_overflow(self):
+        expr = Dialect.compile_expression('x * 4 + y')
+        x = numpy.array([2 ** 62, 3, -2 ** 62])
+        value = expr.evaluate_columns({'x': x, 'y': [1, 2, 3]})
+        self.assertEquals([2 ** 64 + 1, 14, -2 ** 64 + 3], value.tolist())
+
+    def test_integers_same_as_rows(self):
+        expr = Dialect.compile_expression('(x + 1) * 3 // 2 - x % 4')
+        x = numpy.arange(-5, 5)
+        value = expr.evaluate_columns({'x': x})
+        self.assertEquals(x.dtype, value.dtype)
+        self.assertEquals([expr.evaluate({'x': v}) for v in x.tolist()],
+                          value.tolist())
+
+    def test_booleans(self):
+        expr = Dialect.compile_expression('x + y')
+        value = expr.evaluate_columns({'x': numpy.array([True, False]),
+                                       'y': numpy.array([True, True])})
+        self.assertEquals([2, 1], value.tolist())
+        expr = Dialect.compile_expression('(x > 1) + (x > 2)')
+        value = expr.evaluate_columns({'x': numpy.arange(4)})
+        self.assertEquals([0, 0, 1, 2], value.tolist())
+
+    def test_integer_bounds(self):
+        def bound(src, **namespace):
+            tree = ast.parse(src, mode='eval')
+            return vectorize.IntegerBounds(namespace)(tree)
+        x = numpy.array([-3, 2])
+        self.assertEquals(12, bound('x * 4', x=x))
+        self.assertEquals(9, bound('x ** 2', x=x))
+        self.assertEquals(4, bound('x & 3', x=x))
+        self.assertEquals(None, bound('x * 2 ** 62', x=x))
+        self.assertEquals(None, bound('x << 64', x=x))
+        self.assertEquals(vectorize.UNBOUNDED, bound('x * y', x=x, y=1.5))
+        self.assertEquals(vectorize.BOOLEAN, bound('(x > 0) & (x < 2)', x=x))
+        self.assertEquals(None, bound('(x > 0) * (x < 2)', x=x))
+        self.assertEquals(None, bound('x + y', x=x, y='a'))
+
+    def test_fallback(self):
+        expr = Dialect.compile_expression('x if x > 1 else 0')
+        value = expr.evaluate_columns({'x': numpy.arange(4)})
+        self.assertEquals([0, 0, 2, 3], value.tolist())
+
+#==============================================================================#
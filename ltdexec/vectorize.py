@@ -0,0 +1,328 @@
+"""
+ltdexec.vectorize
+=================
+
+Evaluation of an expression over whole columns of values at once.
+
+When NumPy is installed and an expression uses only operators that NumPy
+applies element by element, and calls only functions with a NumPy
+equivalent, the expression is evaluated once with each of its names bound to
+an array.  Otherwise, it is evaluated once per row.
+
+"""
+
+import ast
+import __builtin__
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#==============================================================================#
+_vectorizable_operators = (
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.BitAnd, ast.BitOr, ast.BitXor, ast.LShift, ast.RShift,
+    ast.UAdd, ast.USub, ast.Invert,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+)
+
+class VectorizableChecker(ast.NodeVisitor):
+    """ Check that an expression tree can be evaluated over arrays.
+
+        Only numbers, names, arithmetic, bitwise and single comparison
+        operators, and calls by name to the given *functions* are accepted.
+        Boolean operators, conditional expressions and chained comparisons
+        are not, since they take the truth of their operands, which an array
+        does not have.
+    """
+    def __init__(self, functions):
+        self.functions = functions
+
+    def __call__(self, tree):
+        return self.visit(tree)
+
+    def generic_visit(self, node):
+        return False
+
+    def visit_Expression(self, node):
+        return self.visit(node.body)
+
+    def visit_Num(self, node):
+        return True
+
+    def visit_Name(self, node):
+        return isinstance(node.ctx, ast.Load)
+
+    def visit_BinOp(self, node):
+        return (isinstance(node.op, _vectorizable_operators) and
+                self.visit(node.left) and self.visit(node.right))
+
+    def visit_UnaryOp(self, node):
+        return (isinstance(node.op, _vectorizable_operators) and
+                self.visit(node.operand))
+
+    def visit_Compare(self, node):
+        return (len(node.ops) == 1 and
+                isinstance(node.ops[0], _vectorizable_operators) and
+                self.visit(node.left) and self.visit(node.comparators[0]))
+
+    def visit_Call(self, node):
+        if not isinstance(node.func, ast.Name):
+            return False
+        if node.func.id not in self.functions:
+            return False
+        if node.keywords or node.starargs or node.kwargs:
+            return False
+        return all(self.visit(arg) for arg in node.args)
+
+def is_vectorizable(src, functions):
+    """ Return True if the expression *src* can be evaluated over arrays,
+        calling only the named *functions*.
+    """
+    try:
+        tree = ast.parse(src, mode='eval')
+    except SyntaxError:
+        return False
+    return VectorizableChecker(functions)(tree)
+
+#==============================================================================#
+_INT64_LIMIT = 2 ** 63
+
+class _Unbounded(object):
+    # The bound of values that cannot overflow: floats, and Python objects.
+    def __repr__(self):
+        return 'UNBOUNDED'
+
+class _Boolean(object):
+    # The bound of NumPy booleans, which only mix safely with each other in
+    # bitwise operations, and with integers.
+    def __repr__(self):
+        return 'BOOLEAN'
+
+UNBOUNDED = _Unbounded()
+BOOLEAN = _Boolean()
+
+class IntegerBounds(ast.NodeVisitor):
+    """ Bound the integers computed by a vectorizable expression tree, given
+        the *namespace* it is evaluated in.
+
+        Returns the largest absolute value that the expression or any part of
+        it may take, :data:`UNBOUNDED` if it computes no integers with NumPy,
+        or :data:`BOOLEAN` for a boolean array.  None is returned if NumPy's
+        fixed-width integers may overflow, or its booleans may be used in
+        arithmetic, where Python's integers and booleans would give other
+        values.
+    """
+    def __init__(self, namespace):
+        self.namespace = namespace
+
+    def __call__(self, tree):
+        return self.visit(tree)
+
+    def generic_visit(self, node):
+        return None
+
+    def visit_Expression(self, node):
+        return self.visit(node.body)
+
+    def visit_Num(self, node):
+        return self.bound_of(node.n)
+
+    def visit_Name(self, node):
+        return self.bound_of(self.namespace.get(node.id))
+
+    def visit_BinOp(self, node):
+        return self.combine(node.op, self.visit(node.left),
+                            self.visit(node.right))
+
+    def visit_UnaryOp(self, node):
+        bound = self.visit(node.operand)
+        if bound is None or bound is UNBOUNDED:
+            return bound
+        if bound is BOOLEAN:
+            return None
+        return self.checked(bound + 1 if isinstance(node.op, ast.Invert)
+                            else bound)
+
+    def visit_Compare(self, node):
+        if (self.visit(node.left) is None or
+            self.visit(node.comparators[0]) is None):
+            return None
+        return BOOLEAN
+
+    def visit_Call(self, node):
+        bounds = [self.visit(arg) for arg in node.args]
+        if None in bounds:
+            return None
+        if all(bound is UNBOUNDED for bound in bounds):
+            return UNBOUNDED
+        function = self.namespace.get(node.func.id)
+        if function is numpy.absolute and len(bounds) == 1:
+            return bounds[0]
+        # Functions that give floats for integers cannot overflow.
+        try:
+            sample = function(*[numpy.ones(1, dtype=int)] * len(bounds))
+        except Exception:
+            return None
+        if numpy.asarray(sample).dtype.kind in 'fc':
+            return UNBOUNDED
+        return None
+
+    def bound_of(self, value):
+        """ Return the bound of a value in the namespace. """
+        if isinstance(value, numpy.ndarray):
+            kind = value.dtype.kind
+            if kind in 'iu':
+                if not len(value):
+                    return 0
+                return self.checked(max(abs(int(value.max())),
+                                        abs(int(value.min()))))
+            if kind == 'b':
+                return BOOLEAN
+            if kind in 'fcO':
+                return UNBOUNDED
+            return None
+        if isinstance(value, bool):
+            return 1
+        if isinstance(value, (int, long)):
+            return self.checked(abs(value))
+        if isinstance(value, (float, complex)):
+            return UNBOUNDED
+        return None
+
+    def checked(self, bound):
+        """ Return *bound*, or None if it does not fit in 64 bits. """
+        return bound if bound < _INT64_LIMIT else None
+
+    def combine(self, op, left, right):
+        """ Return the bound of a binary operation on the given bounds. """
+        if left is None or right is None:
+            return None
+        if left is UNBOUNDED or right is UNBOUNDED:
+            return UNBOUNDED
+        bitwise = isinstance(op, (ast.BitAnd, ast.BitOr, ast.BitXor))
+        if left is BOOLEAN and right is BOOLEAN:
+            return BOOLEAN if bitwise else None
+        # Booleans combined with integers are taken as 0 and 1, as Python
+        # takes them.
+        if left is BOOLEAN:
+            left = 1
+        if right is BOOLEAN:
+            right = 1
+        if isinstance(op, (ast.Add, ast.Sub)):
+            return self.checked(left + right)
+        if isinstance(op, ast.Mult):
+            return self.checked(left * right)
+        if isinstance(op, (ast.Div, ast.FloorDiv, ast.RShift)):
+            return left
+        if isinstance(op, ast.Mod):
+            return right
+        if isinstance(op, ast.Pow):
+            if left <= 1:
+                return 1
+            return self.checked(left ** right) if right < 64 else None
+        if isinstance(op, ast.LShift):
+            return self.checked(left << right) if right < 64 else None
+        if bitwise:
+            # In two's complement, the result has no more bits than the
+            # larger operand.
+            return self.checked(2 ** max(left, right).bit_length())
+        return None
+
+#==============================================================================#
+def column_length(columns):
+    """ Return the common length of the given columns. """
+    lengths = set(len(column) for column in columns.itervalues())
+    if not lengths:
+        raise ValueError('At least one column is required.')
+    if len(lengths) != 1:
+        raise ValueError('The columns must all have the same length.')
+    return lengths.pop()
+
+def evaluate_vectorized(expression, columns, globals, length):
+    """ Evaluate *expression* once, with each column bound to an array.
+        Returns None if NumPy raised an error or did not produce one value per
+        row; the caller should then evaluate the expression row by row, which
+        reports errors as Python would.
+
+        NumPy's fixed-width integers wrap around on overflow, where Python's
+        are promoted to long, and its booleans add as logical or.  None is
+        also returned unless :class:`IntegerBounds` shows that neither can
+        happen.
+    """
+    namespace = dict(globals)
+    for name, numpy_name in expression.dialect.vectorized_functions.iteritems():
+        namespace[name] = getattr(numpy, numpy_name)
+    for name, column in columns.iteritems():
+        namespace[name] = numpy.asarray(column)
+    tree = ast.parse(expression.source.text, mode='eval')
+    if IntegerBounds(namespace)(tree) is None:
+        return None
+    namespace['__builtins__'] = __builtin__
+    try:
+        with numpy.errstate(all='raise'):
+            value = eval(expression.code, namespace)
+    except Exception:
+        return None
+    value = numpy.asarray(value)
+    if value.ndim == 0:
+        return numpy.repeat(value, length)
+    if value.shape != (length,):
+        return None
+    if value.dtype == object:
+        # Give the array the type evaluate_columns gives values from rows.
+        return to_array(value.tolist(), length)
+    return value
+
+def to_array(values, length):
+    """ Return an array of the given values, one per row.  Values that
+        NumPy would combine into a multidimensional array are kept as objects.
+    """
+    result = numpy.array(values)
+    if result.shape != (length,):
+        result = numpy.empty(length, dtype=object)
+        for i, value in enumerate(values):
+            result[i] = value
+    return result
+
+def evaluate_rows(expression, columns, globals, length):
+    """ Evaluate *expression* once per row, returning a list of the values.
+        Values are taken from NumPy arrays as Python numbers, so that they
+        behave as they would in a script.
+    """
+    names = columns.keys()
+    columns = [columns[name] for name in names]
+    if numpy is not None:
+        columns = [column.tolist() if isinstance(column, numpy.ndarray)
+                   else column for column in columns]
+    values = []
+    row = dict(globals)
+    for i in xrange(length):
+        for name, column in zip(names, columns):
+            row[name] = column[i]
+        values.append(expression.evaluate(row))
+    return values
+
+def evaluate_columns(expression, columns, globals=None):
+    """ Evaluate *expression* for each row of *columns*, a mapping of names
+        to equally long sequences.  The names in *globals* have the same value
+        in every row.
+
+        If NumPy is installed, an array is returned, and the expression is
+        evaluated once over whole columns when it is vectorizable, giving the
+        same values as it does row by row.  Without NumPy, a list is
+        returned.
+    """
+    globals = globals or {}
+    length = column_length(columns)
+    if numpy is None:
+        return evaluate_rows(expression, columns, globals, length)
+    if expression.vectorizable:
+        value = evaluate_vectorized(expression, columns, globals, length)
+        if value is not None:
+            return value
+    values = evaluate_rows(expression, columns, globals, length)
+    return to_array(values, length)
+
+#==============================================================================#
@@ -7,8 +7,12 @@ import sys
 from . import config
 
 #==============================================================================#
-_local = threading.local()
-_local.key_stack = []
+class _Local(threading.local):
+    # Each thread has its own stack of environment keys.
+    def __init__(self):
+        self.key_stack = []
+
+_local = _Local()
 
 def create_envkey():
     if not _local.key_stack:
@@ -28,11 +32,21 @@ def pop_envkey(key):
 # namespace.
 
 class defname(object):
-    def __init__(self, callable, args=None, kwargs=None, method_on_close=None):
+    """ Defines an object that is constructed, by calling *callable* with the
+        given arguments, for each Environment.
+
+        If *reusable* is True, the object keeps no state from one run to the
+        next, so a single construction may serve consecutive runs, as in
+        :meth:`~ltdexec.script.Script.run_many`.  Otherwise, each run gets a
+        newly constructed object.
+    """
+    def __init__(self, callable, args=None, kwargs=None, method_on_close=None,
+                 reusable=False):
         self.callable = callable
         self.args = args or []
         self.kwargs = kwargs or {}
         self.method_on_close = method_on_close or ''
+        self.reusable = reusable
 
     def construct(self):
         return self.callable(*self.args, **self.kwargs)
@@ -47,7 +61,8 @@ def wrap_function(func):
 
 class deffunc(defname):
     def __init__(self, function):
-        super(deffunc, self).__init__(wrap_function, args=[function])
+        super(deffunc, self).__init__(wrap_function, args=[function],
+                                      reusable=True)
 
 #==============================================================================#
 class definstance(defname):